@@ -1,15 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, JSONResponse
 from pydantic import BaseModel
+import os
 import sys
+import threading
 from pathlib import Path
+from typing import List, Optional
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from src.encryption import EncryptionManager
-from src.embeddings import EmbeddingGenerator
-from src.cyborgdb_sim import CyborgDBClient
-from src.rag import RAGOrchestrator
+from src.metrics import REGISTRY
+from src.jobs import JobQueue, IngestionWorkers, QueueFull, DEFAULT_QUEUE_PATH
+from src.logging_config import configure_logging, get_logger
+
+logger = get_logger('api')
 
 app = FastAPI(title="IntelliVault API")
 
@@ -23,37 +29,226 @@ app.add_middleware(
 )
 
 rag = None
+warmup_error = None
+jobs = None  # ingestion queue, open as soon as the server starts
+workers = None  # started once the model is loaded
+ingestors = {}
+ingestors_lock = threading.Lock()
+dedup_lock = threading.Lock()  # the dedup index journals one ingestion run at a time
+tenant_grants = {}  # API token -> tenants it may use, loaded at startup
 
-@app.on_event("startup")
-async def startup():
-    global rag
+def build_rag():
+    """Load the key, embedding model and vector store (the model takes seconds)"""
+    from src.encryption import EncryptionManager
+    from src.embeddings import EmbeddingGenerator
+    from src.vector_store import DEFAULT_COLLECTION, create_store
+    from src.rag import RAGOrchestrator
+    from src.tenancy import TenantRouter
+    from src.centroids import centroid_store
+    
     enc = EncryptionManager()
     emb = EmbeddingGenerator()
-    db = CyborgDBClient(use_simulated=True)
-    rag = RAGOrchestrator(enc, emb, db)
+    db = create_store()
+    # Uploads write document centroids (creating the collection on first use); hierarchical
+    # queries answer 400 until some exist
+    return RAGOrchestrator(enc.for_collection(DEFAULT_COLLECTION), emb, db, router=TenantRouter(enc),
+                           centroids=centroid_store(db))
+
+def warm_up():
+    """Build the orchestrator off the event loop so /health answers immediately"""
+    global rag, warmup_error
+    try:
+        orchestrator = build_rag()
+        # The first encode pays one-off costs; keep them off the first user query
+        orchestrator.emb.generate_embedding("warm-up")
+        rag = orchestrator
+        start_workers()
+        logger.info("✓ IntelliVault ready")
+    except Exception as e:
+        warmup_error = str(e)
+        logger.exception("Warm-up failed")
+
+def open_job_queue():
+    return JobQueue(os.getenv('INTELLIVAULT_JOBS_DB', DEFAULT_QUEUE_PATH),
+                    max_pending=int(os.getenv('INTELLIVAULT_INGEST_QUEUE_SIZE', '1000')))
+
+def open_dedup_index():
+    """The collection's dedup index if it was ingested with --dedup, else None"""
+    from src.dedup import ChunkDeduplicator, DEFAULT_INDEX_PATH
+    path = Path(os.getenv('INTELLIVAULT_DEDUP_INDEX', DEFAULT_INDEX_PATH))
+    return ChunkDeduplicator(path) if path.exists() else None
+
+def ingest_upload(name: str, text: str, tenant: Optional[str]) -> int:
+    """Worker callback: ingest one queued document into the collection or a tenant shard"""
+    with ingestors_lock:
+        ingestor = ingestors.get(tenant)
+        if ingestor is None:
+            from src.ingest import DocumentIngestor
+            if tenant is None:
+                # Uploads keep a deduplicated collection's index and duplicate lists in step
+                ingestor = DocumentIngestor(rag.enc, rag.emb, rag.db, reducer=rag.reducer,
+                                            dedup=open_dedup_index(), centroids=rag.centroids)
+            else:
+                store = rag.router.store(tenant)
+                if store.stats() is None:
+                    store.create_collection(dimension=rag.emb.get_dimension())
+                ingestor = DocumentIngestor(rag.router.keys(tenant), rag.emb, store)
+            ingestors[tenant] = ingestor
+    if ingestor.dedup is None:
+        return ingestor.ingest_text(name, text)
+    with dedup_lock:
+        return ingestor.ingest_text(name, text)
+
+def start_workers():
+    global workers
+    if jobs is not None and workers is None:
+        workers = IngestionWorkers(jobs, ingest_upload,
+                                   workers=int(os.getenv('INTELLIVAULT_INGEST_WORKERS', '2'))).start()
+
+@app.on_event("startup")
+async def startup():
+    global jobs, tenant_grants
+    configure_logging('server')
+    from src.tenancy import load_tenant_grants
+    tenant_grants = load_tenant_grants()
+    jobs = open_job_queue()
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown():
+    global workers
+    if workers is not None:
+        workers.stop()
+        workers = None
+
+def require_rag():
+    """The orchestrator, or 503 while it is still loading"""
+    if rag is None:
+        detail = f"Warm-up failed: {warmup_error}" if warmup_error else "Warming up"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+    return rag
+
+def authorize_tenants(request: Request, tenants: Optional[List[str]]):
+    """
+    Shards are chosen by the client but granted by the server: every listed
+    tenant must be granted to the caller's bearer token (401 without a
+    known token, 403 for any other tenant).
+    """
+    if not tenants:
+        return
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    allowed = tenant_grants.get(token) if scheme.lower() == 'bearer' else None
+    if allowed is None:
+        raise HTTPException(status_code=401, detail="Tenant access needs a bearer token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    denied = sorted(set(tenants) - allowed)
+    if denied:
+        raise HTTPException(status_code=403, detail=f"No access to tenants: {', '.join(denied)}")
 
 class QueryRequest(BaseModel):
     query: str
     top_k: int = 5
+    debug: bool = False  # include per-stage timings in the response
+    tenants: Optional[List[str]] = None  # restrict to these tenant shards
+    group_by_doc: bool = False  # top_k documents, each with its best chunks
+    aggregate: str = 'max'  # document score: max, sum or mean_top_n of its chunks
+    chunks_per_doc: int = 3
+    hierarchical: bool = False  # pick top_docs documents by centroid, then search their chunks
+    top_docs: int = 20
+
+class DocumentRequest(BaseModel):
+    name: str
+    content: str
+    tenant: Optional[str] = None  # ingest into this tenant's shard
 
 @app.get("/")
 def root():
     return {"message": "IntelliVault API", "status": "running"}
 
 @app.post("/query")
-def query_kb(request: QueryRequest):
-    response = rag.query(request.query, top_k=request.top_k)
+def query_kb(request: QueryRequest, http: Request):
+    authorize_tenants(http, request.tenants)
+    try:
+        response = require_rag().query(request.query, top_k=request.top_k,
+                                       tenants=request.tenants, group_by_doc=request.group_by_doc,
+                                       aggregate=request.aggregate,
+                                       chunks_per_doc=request.chunks_per_doc,
+                                       hierarchical=request.hierarchical, top_docs=request.top_docs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not request.debug:
+        response.pop('timings', None)
     return response
 
+@app.post("/documents", status_code=202)
+async def upload_documents(request: Request):
+    """
+    Queue documents for background ingestion: a JSON {name, content, tenant}
+    body, or a multipart upload of one or more `files` (plus an optional
+    `tenant` field, which the caller's token must grant). Returns at once
+    with the job to poll; 429 with Retry-After when the queue is full.
+    """
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        form = await request.form()
+        documents = [(upload.filename, await upload.read()) for upload in form.getlist('files')]
+        tenant = form.get('tenant') or None
+    else:
+        try:
+            document = DocumentRequest(**await request.json())
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        documents = [(document.name, document.content.encode('utf-8'))]
+        tenant = document.tenant
+    
+    if not documents or not all(name for name, _ in documents):
+        raise HTTPException(status_code=400, detail="No named documents in the request")
+    if tenant is not None:
+        from src.tenancy import tenant_collection
+        try:
+            tenant_collection(tenant)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        authorize_tenants(request, [tenant])
+    
+    try:
+        job_id = await run_in_threadpool(jobs.enqueue, documents, tenant)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return {"job_id": job_id, "documents": len(documents), "status": f"/jobs/{job_id}"}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, request: Request):
+    """Progress of an ingestion job (a tenant's jobs only to tokens granted that tenant)"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    authorize_tenants(request, [job['tenant']] if job['tenant'] is not None else None)
+    return job
+
 @app.get("/stats")
 def get_stats():
-    stats = rag.db.get_stats()
+    stats = require_rag().db.get_stats()
     return stats if stats else {"error": "No stats"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint (per-stage latency histograms)"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 def health():
+    """Liveness: the process is up (the model may still be loading)"""
     return {"status": "healthy", "encryption": "active"}
 
+@app.get("/ready")
+def ready():
+    """Readiness: queries can be served"""
+    if rag is not None:
+        return {"status": "ready"}
+    if warmup_error:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": warmup_error})
+    return JSONResponse(status_code=503, content={"status": "warming_up"})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,63 +1,175 @@
 #!/usr/bin/env python3
+"""
+IntelliVault load-testing benchmark.
+
+Builds synthetic corpora (10k/100k/1M chunks), drives open-loop load at a
+target QPS against the in-process RAGOrchestrator and/or a running FastAPI
+server, and writes throughput, latency percentiles/histograms, recall@k
+against exact search and memory usage as JSON for run-to-run comparison.
+
+Examples:
+    python benchmark.py --sizes 10000 100000 --qps 20 --duration 30
+    python benchmark.py --target api --url http://localhost:8000 --qps 50
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
 import time
+from datetime import datetime, timezone
+from pathlib import Path
+
 import numpy as np
+import requests
+
 from src.encryption import EncryptionManager
-from src.embeddings import EmbeddingGenerator
-from src.cyborgdb_sim import CyborgDBClient
 from src.rag import RAGOrchestrator
+from src.vector_store import SimulatedStore
+from src.logging_config import configure_logging
+from src.loadtest import (SyntheticCorpus, LookupEmbedder, run_open_loop,
+                          recall_at_k, memory_usage_mb)
 
-def benchmark():
-    print("\n" + "="*70)
-    print("INTELLIVAULT PERFORMANCE BENCHMARK")
-    print("="*70)
+API_QUERIES = [
+    "software license terms",
+    "employee benefits",
+    "financial performance",
+    "security requirements",
+    "compliance regulations"
+]
+
+def benchmark_inprocess(size, args, enc, storage_dir):
+    """Load a synthetic corpus into a fresh store and drive the orchestrator"""
+    print(f"\n[in-process] Building corpus of {size:,} chunks...")
+    start = time.perf_counter()
+    corpus = SyntheticCorpus(size, dimension=args.dimension, seed=args.seed)
+    store = SimulatedStore(storage_path=Path(storage_dir) / f"corpus_{size}")
+    store.create_collection(dimension=args.dimension)
+    store.upsert(corpus.documents(enc))
+    build_seconds = time.perf_counter() - start
+    print(f"  ✓ Corpus ready ({build_seconds:.1f}s)")
+    
+    queries = corpus.queries(args.num_queries, seed=args.seed + 1)
+    embedder = LookupEmbedder(queries)
+    rag = RAGOrchestrator(enc, embedder, store)
+    
+    def request(i):
+        rag.query(LookupEmbedder.text(i % len(queries)), top_k=args.top_k)
+    
+    print(f"  → {args.qps} QPS for {args.duration}s...")
+    result = run_open_loop(request, qps=args.qps, duration=args.duration,
+                           max_workers=args.workers)
     
-    enc = EncryptionManager()
-    emb = EmbeddingGenerator()
-    db = CyborgDBClient(use_simulated=True)
-    rag = RAGOrchestrator(enc, emb, db)
-    
-    queries = [
-        "software license terms",
-        "employee benefits",
-        "financial performance",
-        "security requirements",
-        "compliance regulations"
-    ] * 5  # 25 queries
-    
-    print(f"\nRunning {len(queries)} queries...\n")
-    
-    latencies = []
-    for i, query in enumerate(queries, 1):
-        start = time.time()
-        result = rag.query(query, top_k=3)
-        latency = time.time() - start
-        latencies.append(latency)
-        
-        if i % 5 == 0:
-            print(f"  Completed {i}/{len(queries)} queries...")
-    
-    latencies = np.array(latencies)
+    # Recall is measured outside the timed run so ground truth doesn't skew latency
+    recalls = []
+    for i in range(min(args.recall_queries, len(queries))):
+        response = rag.query(LookupEmbedder.text(i), top_k=args.top_k)
+        retrieved = [source['id'] for source in response['sources']]
+        recalls.append(recall_at_k(retrieved, corpus.exact_top_k(queries[i], args.top_k)))
+    
+    result.update({
+        'target': 'inprocess',
+        'corpus_chunks': size,
+        'build_seconds': build_seconds,
+        f"recall_at_{args.top_k}": float(np.mean(recalls)) if recalls else None,
+        'memory': memory_usage_mb()
+    })
+    return result
+
+def benchmark_api(args):
+    """Drive a running FastAPI server over HTTP"""
+    print(f"\n[api] {args.url} at {args.qps} QPS for {args.duration}s...")
+    session = requests.Session()
+    
+    def request(i):
+        response = session.post(f"{args.url}/query", timeout=30, json={
+            'query': API_QUERIES[i % len(API_QUERIES)], 'top_k': args.top_k
+        })
+        response.raise_for_status()
+    
+    result = run_open_loop(request, qps=args.qps, duration=args.duration,
+                           max_workers=args.workers)
+    result.update({'target': 'api', 'url': args.url})
+    return result
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def print_result(result):
+    latency = result.get('latency_ms', {})
+    label = result['target'] + (f" {result['corpus_chunks']:,}" if 'corpus_chunks' in result else '')
+    print(f"\n📊 {label}")
+    print(f"  Throughput: {result['throughput_qps']:.1f} q/s (target {result['target_qps']})")
+    if latency:
+        print(f"  Latency:    p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  "
+              f"p99 {latency['p99']:.1f}ms  p999 {latency['p999']:.1f}ms")
+    print(f"  Errors:     {result['errors']}")
+    for key, value in result.items():
+        if key.startswith('recall_at_') and value is not None:
+            print(f"  Recall@{key.rsplit('_', 1)[1]}:  {value:.3f}")
+    if 'memory' in result:
+        print(f"  Memory:     {result['memory']['rss_mb']:.0f}MB RSS "
+              f"(peak {result['memory']['peak_rss_mb']:.0f}MB)")
+
+def main():
+    parser = argparse.ArgumentParser(description="IntelliVault load-testing benchmark")
+    parser.add_argument('--target', choices=['inprocess', 'api', 'both'], default='inprocess')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000],
+                        help="Synthetic corpus sizes in chunks (e.g. 10000 100000 1000000)")
+    parser.add_argument('--qps', type=float, default=10.0, help="Target arrival rate")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per run")
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--num-queries', type=int, default=200)
+    parser.add_argument('--recall-queries', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=64, help="Max concurrent requests")
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None,
+                        help="JSON results path (default: benchmark_results/<timestamp>.json)")
+    args = parser.parse_args()
+    
+    # No per-query log lines while measuring latency
+    configure_logging('cli', query_sample_rate=0.0)
     
     print("\n" + "="*70)
-    print("BENCHMARK RESULTS")
+    print("INTELLIVAULT LOAD BENCHMARK")
     print("="*70)
-    print(f"\n📊 Query Latency:")
-    print(f"  Mean:   {latencies.mean()*1000:.1f}ms")
-    print(f"  Median: {np.median(latencies)*1000:.1f}ms")
-    print(f"  P95:    {np.percentile(latencies, 95)*1000:.1f}ms")
-    print(f"  P99:    {np.percentile(latencies, 99)*1000:.1f}ms")
     
-    print(f"\n⚡ Throughput:")
-    print(f"  Queries/second: {len(queries)/latencies.sum():.1f}")
+    started = datetime.now(timezone.utc)
+    runs = []
+    
+    if args.target in ('inprocess', 'both'):
+        enc = EncryptionManager()
+        with tempfile.TemporaryDirectory(prefix='intellivault_bench_') as storage_dir:
+            for size in args.sizes:
+                runs.append(benchmark_inprocess(size, args, enc, storage_dir))
+                print_result(runs[-1])
+    
+    if args.target in ('api', 'both'):
+        runs.append(benchmark_api(args))
+        print_result(runs[-1])
     
-    stats = db.get_stats()
-    print(f"\n💾 Database:")
-    print(f"  Total vectors: {stats['count']}")
+    report = {
+        'timestamp': started.isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'config': vars(args),
+        'runs': runs
+    }
     
-    if latencies.mean() < 1.0:
-        print(f"\n✅ EXCELLENT PERFORMANCE (<1s average)")
+    output = Path(args.output or f"benchmark_results/{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
     
+    print(f"\n✓ Results written to {output}")
     print("="*70 + "\n")
 
 if __name__ == "__main__":
-    benchmark()
+    main()
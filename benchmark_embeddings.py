@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Compare embedding backends (PyTorch vs ONNX Runtime fp32/int8).
+
+Reports per-batch latency and throughput at several batch sizes, and the
+cosine agreement of each backend with the PyTorch embeddings.
+
+Examples:
+    python benchmark_embeddings.py
+    python benchmark_embeddings.py --backends torch onnx-int8 --batch-sizes 1 32 --threads 4
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from src.embeddings import EmbeddingGenerator
+from src.logging_config import configure_logging
+from src.onnx_embeddings import MIN_COSINE
+from generate_large_dataset import categories, generate_document
+
+BACKENDS = {
+    'torch': {'backend': 'torch'},
+    'onnx': {'backend': 'onnx'},
+    'onnx-int8': {'backend': 'onnx', 'quantize': True},
+}
+
+def sample_texts(n, seed=0):
+    """Chunk-sized passages cut from the synthetic document templates"""
+    random.seed(seed)
+    doc_types = [(c, t) for c, types in categories.items() for t in types]
+    words = " ".join(generate_document(c, t, i) for i, (c, t) in enumerate(doc_types)).split()
+    texts = []
+    for _ in range(n):
+        start = random.randrange(len(words))
+        texts.append(" ".join(words[start:start + random.randint(20, 120)]))
+    return texts
+
+def time_batches(generator, texts, batch_size, repeats):
+    """Latency of encoding batch_size texts at once, plus throughput"""
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    batches = [b for b in batches if len(b) == batch_size][:max(1, repeats)]
+    generator.model.encode(batches[0], batch_size=batch_size)  # warm-up
+    
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        generator.model.encode(batch, batch_size=batch_size)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return {
+        'batch_size': batch_size,
+        'batches': len(latencies),
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p95_ms': float(np.percentile(latencies, 95)),
+        'texts_per_sec': batch_size * len(latencies) / (latencies.sum() / 1000)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend benchmark")
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 256])
+    parser.add_argument('--repeats', type=int, default=20, help="Timed batches per size")
+    parser.add_argument('--threads', type=int, default=None, help="ONNX intra-op threads")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+    
+    configure_logging('cli')
+    print("\n" + "="*70)
+    print("EMBEDDING BACKEND BENCHMARK")
+    print("="*70)
+    
+    texts = sample_texts(max(args.batch_sizes) * args.repeats)
+    reference = None
+    runs = []
+    
+    for name in args.backends:
+        options = dict(BACKENDS[name])
+        if options['backend'] == 'onnx':
+            options['intra_op_threads'] = args.threads
+        generator = EmbeddingGenerator(args.model, **options)
+        
+        result = {'backend': name, 'sizes': []}
+        for batch_size in args.batch_sizes:
+            result['sizes'].append(time_batches(generator, texts, batch_size, args.repeats))
+        
+        # Agreement with PyTorch on the same texts
+        embeddings = generator.model.encode(texts[:256], batch_size=32)
+        if name == 'torch':
+            reference = embeddings
+        elif reference is not None:
+            cosine = (embeddings * reference).sum(axis=1) / (
+                np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1))
+            result['min_cosine_vs_torch'] = float(cosine.min())
+            result['mean_cosine_vs_torch'] = float(cosine.mean())
+            result['tolerance'] = MIN_COSINE['int8' if options.get('quantize') else 'fp32']
+        runs.append(result)
+        
+        print(f"\n📊 {name}")
+        for size in result['sizes']:
+            print(f"  batch {size['batch_size']:>4}: p50 {size['latency_p50_ms']:8.1f}ms  "
+                  f"p95 {size['latency_p95_ms']:8.1f}ms  {size['texts_per_sec']:8.0f} texts/s")
+        if 'min_cosine_vs_torch' in result:
+            status = "✓" if result['min_cosine_vs_torch'] >= result['tolerance'] else "✗"
+            print(f"  {status} cosine vs torch: min {result['min_cosine_vs_torch']:.5f} "
+                  f"(tolerance {result['tolerance']})")
+    
+    started = datetime.now(timezone.utc)
+    output = Path(args.output or f"benchmark_results/embeddings_{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'timestamp': started.isoformat(), 'config': vars(args), 'runs': runs}, f, indent=2)
+    
+    print(f"\n✓ Results written to {output}")
+    print("="*70 + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Latency/recall report for hierarchical (two-level) retrieval.
+
+A synthetic corpus of documents is generated: documents drawn around
+topics, chunks around their document. Flat search scores every chunk;
+hierarchical search scores the document centroids, keeps the best
+top_docs documents and scores only their chunks. For each top_docs the
+report gives recall@k against flat exact search, the share of chunks
+scored and per-query latency.
+
+Examples:
+    python benchmark_hierarchical.py                           # 1M chunks
+    python benchmark_hierarchical.py --chunks 200000 --top-docs 10 50
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from src.centroids import document_centroids
+from src.logging_config import configure_logging
+from src.loadtest import recall_at_k
+
+def clustered_corpus(args):
+    """(unit chunk vectors, chunks per document), each document's chunks contiguous"""
+    rng = np.random.default_rng(args.seed)
+    lengths = 1 + rng.poisson(args.chunks_per_doc - 1, 2 * args.chunks // args.chunks_per_doc + 10)
+    ends = np.cumsum(lengths)
+    num_docs = int(np.searchsorted(ends, args.chunks)) + 1
+    lengths = lengths[:num_docs]
+    lengths[-1] -= ends[num_docs - 1] - args.chunks
+    
+    centers = rng.standard_normal((args.topics, args.dimension), dtype=np.float32)
+    documents = centers[rng.integers(0, args.topics, num_docs)] + args.doc_spread * rng.standard_normal(
+        (num_docs, args.dimension), dtype=np.float32)
+    owner = np.repeat(np.arange(num_docs), lengths)
+    
+    vectors = np.empty((args.chunks, args.dimension), dtype=np.float32)
+    for start in range(0, args.chunks, 100000):
+        block = documents[owner[start:start + 100000]]
+        block += args.chunk_spread * rng.standard_normal(block.shape, dtype=np.float32)
+        vectors[start:start + len(block)] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return vectors, lengths
+
+def queries_near_chunks(vectors, args):
+    """Held-out style queries: random chunks with noise"""
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.choice(len(vectors), args.num_queries, replace=False)]
+    noise = rng.standard_normal(queries.shape, dtype=np.float32)
+    queries = queries + np.float32(args.query_noise / np.sqrt(vectors.shape[1])) * noise
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+def best(scores, k):
+    top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+    return top[np.argsort(-scores[top])]
+
+def flat_search(vectors, query, k):
+    return best(vectors @ query, k)
+
+def hierarchical_search(vectors, centroids, offsets, lengths, query, k, top_docs):
+    """(chunk rows, chunks scored) after scoring only the top_docs best documents' chunks"""
+    documents = best(centroids @ query, top_docs)
+    rows = np.concatenate([np.arange(offsets[d], offsets[d] + lengths[d]) for d in documents])
+    return rows[best(vectors[rows] @ query, k)], len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Hierarchical vs flat retrieval report")
+    parser.add_argument('--chunks', type=int, default=1000000)
+    parser.add_argument('--dimension', type=int, default=128)
+    parser.add_argument('--chunks-per-doc', type=int, default=20, help="Mean chunks per document")
+    parser.add_argument('--topics', type=int, default=1000)
+    parser.add_argument('--doc-spread', type=float, default=0.5, help="Document noise around its topic")
+    parser.add_argument('--chunk-spread', type=float, default=1.5, help="Chunk noise around its document")
+    parser.add_argument('--query-noise', type=float, default=1.0, help="Noise norm added to a unit chunk")
+    parser.add_argument('--top-docs', type=int, nargs='+', default=[10, 50, 100, 200, 500, 1000, 2000])
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--num-queries', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+    
+    configure_logging('cli')
+    print("\n" + "="*70)
+    print("HIERARCHICAL RETRIEVAL REPORT")
+    print("="*70)
+    
+    start = time.perf_counter()
+    vectors, lengths = clustered_corpus(args)
+    centroids = document_centroids(vectors, lengths)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    queries = queries_near_chunks(vectors, args)
+    k = args.top_k
+    print(f"\n{len(vectors):,} chunks in {len(lengths):,} documents x {args.dimension} dims "
+          f"(built in {time.perf_counter() - start:.1f}s), {len(queries)} queries, recall@{k}\n")
+    
+    def timed(search):
+        found, latencies = [], []
+        for query in queries:
+            started = time.perf_counter()
+            found.append(search(query))
+            latencies.append((time.perf_counter() - started) * 1000)
+        return found, np.percentile(latencies, 50), np.percentile(latencies, 95)
+    
+    exact, flat_p50, flat_p95 = timed(lambda query: flat_search(vectors, query, k))
+    print(f"  {'mode':>12} {'recall':>7} {'scored':>8} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+    print(f"  {'flat':>12} {1.0:>7.3f} {1.0:>8.2%} {flat_p50:>8.2f} {flat_p95:>8.2f} {1.0:>7.1f}x")
+    rows = [{'mode': 'flat', f"recall_at_{k}": 1.0, 'chunks_scored': 1.0,
+             'p50_ms': flat_p50, 'p95_ms': flat_p95}]
+    
+    for top_docs in sorted(set(args.top_docs)):
+        scored = []
+        
+        def search(query):
+            found, count = hierarchical_search(vectors, centroids, offsets, lengths, query, k, top_docs)
+            scored.append(count)
+            return found
+        
+        found, p50, p95 = timed(search)
+        row = {
+            'mode': 'hierarchical',
+            'top_docs': top_docs,
+            f"recall_at_{k}": float(np.mean([recall_at_k(list(f), list(e)) for f, e in zip(found, exact)])),
+            'chunks_scored': float(np.mean(scored) / len(vectors)),
+            'p50_ms': p50,
+            'p95_ms': p95
+        }
+        rows.append(row)
+        print(f"  {f'docs={top_docs}':>12} {row[f'recall_at_{k}']:>7.3f} {row['chunks_scored']:>8.2%} "
+              f"{p50:>8.2f} {p95:>8.2f} {flat_p50 / p50:>7.1f}x")
+    
+    started = datetime.now(timezone.utc)
+    output = Path(args.output or f"benchmark_results/hierarchical_{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'timestamp': started.isoformat(), 'config': vars(args),
+                   'documents': len(lengths), 'rows': rows}, f, indent=2)
+    
+    print(f"\n✓ Results written to {output}")
+    print("="*70 + "\n")
+
+if __name__ == "__main__":
+    main()
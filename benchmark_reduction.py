@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-dimension report for PCA-reduced embeddings.
+
+For each output dimension: recall@k of exact search in the reduced space
+against exact search on the full vectors, the share of variance retained,
+encrypted payload bytes per vector, vector memory and scoring time.
+
+Examples:
+    python benchmark_reduction.py                      # synthetic corpus
+    python benchmark_reduction.py --source store       # vectors already ingested
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from src.encryption import EncryptionManager
+from src.logging_config import configure_logging
+from src.loadtest import SyntheticCorpus, recall_at_k
+from src.reduction import PCAReducer
+
+def top_k(matrix, queries, k):
+    scores = queries @ matrix.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [row[np.argsort(-scores[i, row])] for i, row in enumerate(top)]
+
+def load_vectors(args, enc):
+    """(corpus vectors, query vectors), unit-normalized"""
+    if args.source == 'synthetic':
+        corpus = SyntheticCorpus(args.size, dimension=args.dimension, seed=args.seed)
+        return corpus.vectors, corpus.queries(args.num_queries, seed=args.seed + 1)
+    
+    from src.vector_store import DEFAULT_COLLECTION, create_store
+    store = create_store()
+    keys = enc.for_collection(DEFAULT_COLLECTION)
+    vectors = np.concatenate([keys.decrypt_vectors([r['vector'] for r in batch])
+                              for batch in store.scan(batch_size=1000)])
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Held-out style queries: stored chunks with a little noise
+    rng = np.random.default_rng(args.seed)
+    queries = vectors[rng.choice(len(vectors), min(args.num_queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    return vectors, queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="PCA recall-vs-dimension report")
+    parser.add_argument('--source', choices=['synthetic', 'store'], default='synthetic')
+    parser.add_argument('--size', type=int, default=20000, help="Synthetic corpus chunks")
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--dims', type=int, nargs='+', default=[32, 64, 96, 128, 192, 256, 384])
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--num-queries', type=int, default=200)
+    parser.add_argument('--sample-size', type=int, default=10000, help="Vectors used to fit PCA")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+    
+    configure_logging('cli')
+    print("\n" + "="*70)
+    print("PCA DIMENSION REDUCTION REPORT")
+    print("="*70)
+    
+    enc = EncryptionManager()
+    vectors, queries = load_vectors(args, enc)
+    k = min(args.top_k, len(vectors) - 1)
+    exact = top_k(vectors, queries, k)
+    print(f"\n{len(vectors):,} vectors x {vectors.shape[1]} dims, {len(queries)} queries, recall@{k}\n")
+    print(f"  {'dim':>5} {'recall':>7} {'variance':>9} {'payload B':>10} {'memory MB':>10} {'score ms':>9}")
+    
+    rows = []
+    for dimension in sorted(d for d in args.dims if d <= min(vectors.shape)):
+        if dimension == vectors.shape[1]:
+            reducer, reduced, reduced_queries = None, vectors, queries
+        else:
+            reducer = PCAReducer.fit(vectors, dimension, sample_size=args.sample_size, seed=args.seed)
+            reduced, reduced_queries = reducer.transform(vectors), reducer.transform(queries)
+        
+        start = time.perf_counter()
+        found = top_k(reduced, reduced_queries, k)
+        score_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        
+        row = {
+            'dimension': dimension,
+            f"recall_at_{k}": float(np.mean([recall_at_k(list(f), list(e))
+                                              for f, e in zip(found, exact)])),
+            'retained_variance': reducer.retained_variance if reducer else 1.0,
+            'encrypted_payload_bytes': len(json.dumps(enc.encrypt_vector(reduced[0]))),
+            'vector_memory_mb': reduced.nbytes / 2**20,
+            'score_ms_per_query': score_ms
+        }
+        rows.append(row)
+        print(f"  {dimension:>5} {row[f'recall_at_{k}']:>7.3f} {row['retained_variance']:>9.1%} "
+              f"{row['encrypted_payload_bytes']:>10} {row['vector_memory_mb']:>10.1f} {score_ms:>9.3f}")
+    
+    started = datetime.now(timezone.utc)
+    output = Path(args.output or f"benchmark_results/reduction_{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'timestamp': started.isoformat(), 'config': vars(args), 'rows': rows}, f, indent=2)
+    
+    print(f"\n✓ Results written to {output}")
+    print("="*70 + "\n")
+
+if __name__ == "__main__":
+    main()
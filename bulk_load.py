@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Load precomputed embeddings into IntelliVault without re-embedding.
+
+    python bulk_load.py embeddings.npy --metadata chunks.jsonl
+    python bulk_load.py corpus.npz --key vectors --metadata chunks.jsonl --tenant hr
+
+Each line of the metadata file is a JSON object for the vector in the same
+row: its 'id' becomes the record id, and 'content' the text RAG answers show.
+"""
+
+from src.encryption import EncryptionManager
+from src.vector_store import DEFAULT_COLLECTION, create_store
+from src.bulk_load import bulk_load
+from src.tenancy import TenantRouter
+from src.logging_config import configure_logging
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load precomputed embeddings")
+    parser.add_argument('embeddings', help=".npy matrix or .npz archive (one row per vector)")
+    parser.add_argument('--metadata', default=None, help="JSON Lines file, one object per row")
+    parser.add_argument('--key', default=None, help="Array to read from a .npz holding several")
+    parser.add_argument('--tenant', default=None, help="Load into this tenant's shard")
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+    
+    configure_logging('cli')
+    enc_manager = EncryptionManager()
+    db_client = create_store()
+    store, keys = db_client, enc_manager.for_collection(DEFAULT_COLLECTION)
+    if args.tenant:
+        router = TenantRouter(enc_manager, store_factory=lambda collection: create_store(
+            collection=collection, **({'db': db_client.db} if hasattr(db_client, 'db') else {})))
+        store, keys = router.store(args.tenant), router.keys(args.tenant)
+    
+    stats = bulk_load(store, keys, args.embeddings, metadata_path=args.metadata, key=args.key,
+                      batch_size=args.batch_size)
+    print(f"✓ Loaded {stats['records']} vectors ({stats['dimension']} dims) in "
+          f"{stats['seconds']:.1f}s, {stats['records_per_sec']:.0f} vectors/s")
+
+if __name__ == "__main__":
+    main()
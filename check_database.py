@@ -1,8 +1,11 @@
-from src.cyborgdb_sim import CyborgDBClient
+from src.vector_store import create_store
+from src.logging_config import configure_logging
 from pathlib import Path
 
+configure_logging('cli')
+
 # Check database
-db = CyborgDBClient(use_simulated=True)
+db = create_store()
 stats = db.get_stats()
 
 print("="*60)
@@ -46,29 +46,33 @@ Contains proprietary methodologies and confidential analysis.
 Not for external distribution without proper authorization.
 """
 
-# Generate 100 documents
-data_dir = Path('data/raw')
-data_dir.mkdir(parents=True, exist_ok=True)
-
-count = 0
-for category, doc_types in categories.items():
-    for doc_type in doc_types:
-        for i in range(3):  # 3 docs per type
-            filename = f"{category}_{doc_type.replace(' ', '_').lower()}_{i+1}.txt"
-            filepath = data_dir / filename
-            
-            content = generate_document(category, doc_type, count)
-            
-            with open(filepath, 'w') as f:
-                f.write(content)
-            
-            count += 1
+def main():
+    """Write 100 sample documents to data/raw"""
+    data_dir = Path('data/raw')
+    data_dir.mkdir(parents=True, exist_ok=True)
+    
+    count = 0
+    for category, doc_types in categories.items():
+        for doc_type in doc_types:
+            for i in range(3):  # 3 docs per type
+                filename = f"{category}_{doc_type.replace(' ', '_').lower()}_{i+1}.txt"
+                filepath = data_dir / filename
+                
+                content = generate_document(category, doc_type, count)
+                
+                with open(filepath, 'w') as f:
+                    f.write(content)
+                
+                count += 1
+                if count >= 100:
+                    break
             if count >= 100:
                 break
         if count >= 100:
             break
-    if count >= 100:
-        break
+    
+    print(f"✓ Generated {count} confidential documents")
+    print(f"✓ Location: {data_dir.absolute()}")
 
-print(f"✓ Generated {count} confidential documents")
-print(f"✓ Location: {data_dir.absolute()}")
+if __name__ == "__main__":
+    main()
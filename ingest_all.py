@@ -6,11 +6,46 @@ Processes all documents in data/raw/ directory.
 
 from src.encryption import EncryptionManager
 from src.embeddings import EmbeddingGenerator
-from src.cyborgdb_sim import CyborgDBClient
+from src.vector_store import DEFAULT_COLLECTION, create_store
 from src.ingest import DocumentIngestor
+from src.logging_config import configure_logging
+from src.tenancy import TenantRouter, department_of
+from src.watch import DirectoryWatcher
+from src.dedup import ChunkDeduplicator, DEFAULT_INDEX_PATH
+from src.centroids import centroid_store
+from pathlib import Path
+import argparse
 import time
 
+ARCHIVE_STATE = 'data/archive_state.json'
+
 def main():
+    parser = argparse.ArgumentParser(description="Ingest data/raw into IntelliVault")
+    parser.add_argument('--dimension', type=int, default=None,
+                        help="Store PCA-reduced vectors of this dimension (default: full)")
+    parser.add_argument('--shard-by-department', action='store_true',
+                        help="One collection and data key per department (file name prefix)")
+    parser.add_argument('--archive', action='append', default=[],
+                        help="Ingest .txt members of this zip/tar(.gz) archive instead of data/raw "
+                             "(repeatable; unchanged members are skipped on later runs)")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Store near-duplicate chunks as references instead of re-embedding them")
+    parser.add_argument('--watch', action='store_true',
+                        help="After the initial pass, keep ingesting new or changed files in data/raw")
+    parser.add_argument('--centroids', action='store_true',
+                        help="Also store each document's mean chunk vector, for hierarchical queries")
+    args = parser.parse_args()
+    if args.archive and args.shard_by_department:
+        parser.error("--archive cannot be combined with --shard-by-department")
+    if args.watch and args.shard_by_department:
+        parser.error("--watch cannot be combined with --shard-by-department")
+    if args.dedup and args.shard_by_department:
+        parser.error("--dedup cannot be combined with --shard-by-department")
+    if args.centroids and args.shard_by_department:
+        parser.error("--centroids cannot be combined with --shard-by-department")
+    
+    configure_logging('cli')
+    
     print("\n" + "="*70)
     print("INTELLIVAULT - DOCUMENT INGESTION")
     print("="*70)
@@ -21,20 +56,42 @@ def main():
     print("\nInitializing components...")
     enc_manager = EncryptionManager()
     emb_generator = EmbeddingGenerator()
-    db_client = CyborgDBClient(use_simulated=True)
+    db_client = create_store()
     
-    # Create collection
-    db_client.create_collection(dimension=emb_generator.get_dimension())
+    # Create collection (sharded ingestion creates one per department instead)
+    if not args.shard_by_department:
+        db_client.create_collection(dimension=args.dimension or emb_generator.get_dimension())
     
     # Create ingestor
-    ingestor = DocumentIngestor(enc_manager, emb_generator, db_client)
+    keys = enc_manager.for_collection(DEFAULT_COLLECTION)
+    ingestor = DocumentIngestor(keys, emb_generator, db_client,
+                                dedup=ChunkDeduplicator(DEFAULT_INDEX_PATH) if args.dedup else None,
+                                centroids=centroid_store(db_client) if args.centroids else None)
     
     print("\n✓ All components ready!")
-    input("\nPress ENTER to start ingestion...")
+    if not args.watch:
+        input("\nPress ENTER to start ingestion...")
     
     # *** THIS IS THE CRITICAL LINE - IT ACTUALLY INGESTS ***
     print("\nStarting document ingestion...\n")
-    ingestor.ingest_directory('data/raw', pattern='*.txt')
+    shard_stats = []
+    if args.shard_by_department:
+        router = TenantRouter(enc_manager, store_factory=lambda collection: create_store(
+            collection=collection, **({'db': db_client.db} if hasattr(db_client, 'db') else {})))
+        departments = sorted({department_of(f) for f in Path('data/raw').glob('*.txt')})
+        for department in departments:
+            shard = router.create_tenant(department, args.dimension or emb_generator.get_dimension())
+            DocumentIngestor(router.keys(department), emb_generator, shard).ingest_directory(
+                'data/raw', pattern=f"{department}_*.txt", reduce_to=args.dimension)
+            shard_stats.append(shard.get_stats())
+            print(f"  ✓ {department}: {shard_stats[-1]['count']} vectors")
+    elif args.archive:
+        for archive in args.archive:
+            counts = ingestor.ingest_archive(archive, state_path=ARCHIVE_STATE)
+            print(f"  ✓ {archive}: {counts['ingested']} ingested, {counts['unchanged']} unchanged, "
+                  f"{counts['failed']} failed")
+    else:
+        ingestor.ingest_directory('data/raw', pattern='*.txt', reduce_to=args.dimension)
     
     # Show final stats
     total_time = time.time() - start_time
@@ -43,13 +100,20 @@ def main():
     print("FINAL STATISTICS")
     print(f"{'='*70}")
     
-    stats = db_client.get_stats()
+    if shard_stats:
+        stats = {'count': sum(s['count'] for s in shard_stats), 'dimension': shard_stats[0]['dimension']}
+    else:
+        stats = db_client.get_stats()
     if stats:
         print(f"Total vectors in database: {stats['count']}")
         print(f"Vector dimension: {stats['dimension']}")
     else:
         print("⚠️  No stats available")
     
+    if args.dedup:
+        print(f"Near-duplicate chunks: {ingestor.stats['duplicate_chunks']} "
+              f"(saved ~{ingestor.stats['embedding_seconds_saved']:.1f}s of embedding, "
+              f"{ingestor.stats['bytes_saved'] / 1024:.1f} KB of storage)")
     print(f"Total pipeline time: {total_time:.2f}s")
     print(f"{'='*70}")
     
@@ -60,6 +124,16 @@ def main():
     else:
         print("\n⚠️  WARNING: No documents were processed!")
         print("Check that .txt files exist in data/raw/")
+    
+    if args.watch:
+        watcher = DirectoryWatcher(ingestor, 'data/raw').start()
+        print("\n👀 Watching data/raw for new files (Ctrl+C to stop)...")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            watcher.stop()
+            print("\n✓ Stopped watching")
 
 if __name__ == "__main__":
     main()
@@ -13,18 +13,23 @@ from src.encryption import EncryptionManager
 from src.embeddings import EmbeddingGenerator
 from src.cyborgdb_service_client import CyborgDBServiceClient
 from src.ingest import DocumentIngestor
+from src.vector_store import DEFAULT_COLLECTION
+from src.logging_config import configure_logging
 
 def main():
+    configure_logging('cli')
+    
     print("\n" + "="*70)
     print("INTELLIVAULT - REAL CYBORGDB INGESTION")
     print("="*70)
     
     # Initialize with REAL CyborgDB
     print("\n[1/4] Initializing components...")
-    enc_manager = EncryptionManager()
+    enc_manager = EncryptionManager().for_collection(DEFAULT_COLLECTION)
     emb_generator = EmbeddingGenerator()
     db_client = CyborgDBServiceClient(
-        api_key=os.getenv("CYBORGDB_API_KEY")
+        api_key=os.getenv("CYBORGDB_API_KEY"),
+        encryption_manager=enc_manager
     )
     
     # Create collection
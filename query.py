@@ -1,22 +1,31 @@
 #!/usr/bin/env python3
-from src.encryption import EncryptionManager
-from src.embeddings import EmbeddingGenerator
-from src.cyborgdb_sim import CyborgDBClient
-from src.rag import RAGOrchestrator
+from concurrent.futures import ThreadPoolExecutor
+from src.logging_config import configure_logging
+
+def build_rag():
+    """Heavy imports and model loading, run while the user types"""
+    from src.encryption import EncryptionManager
+    from src.embeddings import EmbeddingGenerator
+    from src.vector_store import DEFAULT_COLLECTION, create_store
+    from src.rag import RAGOrchestrator
+    
+    enc = EncryptionManager().for_collection(DEFAULT_COLLECTION)
+    emb = EmbeddingGenerator()
+    db = create_store()
+    return RAGOrchestrator(enc, emb, db)
 
 def main():
+    configure_logging('cli')
+    
     print("\n" + "="*70)
     print("INTELLIVAULT - KNOWLEDGE QUERY SYSTEM")
     print("="*70)
     print("Type your question or 'quit' to exit\n")
     
-    # Initialize
-    enc = EncryptionManager()
-    emb = EmbeddingGenerator()
-    db = CyborgDBClient(use_simulated=True)
-    rag = RAGOrchestrator(enc, emb, db)
-    
-    print("\n✓ Ready!\n")
+    # Initialize in the background; only the first query waits for it
+    loader = ThreadPoolExecutor(max_workers=1)
+    pending = loader.submit(build_rag)
+    rag = None
     
     # Query loop
     while True:
@@ -30,6 +39,11 @@ def main():
             continue
         
         try:
+            if rag is None:
+                if not pending.done():
+                    print("⏳ Loading model...")
+                rag = pending.result()
+                loader.shutdown()
             response = rag.query(query, top_k=3)
             
             print("\n" + "="*70)
@@ -0,0 +1,61 @@
+"""
+Rotate the master encryption key without re-embedding.
+    
+    python rotate_key.py --new-key          # new key, then re-encrypt
+    python rotate_key.py                    # resume an interrupted re-encryption
+    python rotate_key.py --rate 2000 --tenants hr,finance
+
+Restart (or roll) API workers after --new-key so they load both keys;
+searches keep working while records are re-encrypted. Records of the
+default collection still sealed with the master key itself (written
+before collections had data keys) are moved to its data key as well, and
+so are the document centroids stored beside it (`<collection>.docs`).
+"""
+
+from src.encryption import EncryptionManager
+from src.vector_store import DEFAULT_COLLECTION, create_store
+from src.rotation import KeyRotationJob
+from src.tenancy import TenantRouter
+from src.centroids import centroid_store
+from src.logging_config import configure_logging
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(description="Rotate the IntelliVault master key")
+    parser.add_argument('--new-key', action='store_true',
+                        help="Generate a new master key (the current one is retired)")
+    parser.add_argument('--tenants', default='',
+                        help="Comma-separated tenant shards to rotate as well")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=None,
+                        help="Max records re-encrypted per second (default: unthrottled)")
+    args = parser.parse_args()
+    
+    configure_logging('cli')
+    enc_manager = EncryptionManager()
+    if args.new_key:
+        enc_manager.rotate_master_key()
+    
+    db_client = create_store()
+    keys = enc_manager.for_collection(DEFAULT_COLLECTION)
+    jobs = [KeyRotationJob(db_client, keys, batch_size=args.batch_size,
+                           max_records_per_sec=args.rate)]
+    centroids = centroid_store(db_client)
+    if centroids.stats() is not None:
+        # Centroids are sealed with their chunk collection's key
+        jobs.append(KeyRotationJob(centroids, keys, batch_size=args.batch_size,
+                                   max_records_per_sec=args.rate))
+    
+    tenants = [t.strip() for t in args.tenants.split(',') if t.strip()]
+    if tenants:
+        router = TenantRouter(enc_manager, store_factory=lambda collection: create_store(
+            collection=collection, **({'db': db_client.db} if hasattr(db_client, 'db') else {})))
+        jobs += [KeyRotationJob(router.store(t), router.keys(t), batch_size=args.batch_size,
+                                max_records_per_sec=args.rate) for t in tenants]
+    
+    for job in jobs:
+        progress = job.run()
+        print(f"✓ {job.collection}: {progress['reencrypted']} records under key {progress['key_id']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from src.encryption import EncryptionManager
+from src.logging_config import configure_logging
 import json
 from pathlib import Path
 
@@ -55,5 +56,6 @@ def load_key():
     return em
 
 if __name__ == "__main__":
+    configure_logging('cli')
     print("Generating and saving encryption key...\n")
     save_key()
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Bulk loading of precomputed embeddings, bypassing the embedding model.
+
+Vectors come from a .npy file (memory-mapped) or an array inside a .npz
+archive (streamed out of the zip), metadata from a JSON Lines file with
+one object per row. Both are read in batches, so neither input file is
+loaded whole; each batch is encrypted with EncryptionManager.encrypt_vectors
+and the stream of records goes to the store's bulk_upsert. The simulated
+backend collects them into a single new collection version, which it
+holds in memory like every version, so its memory grows with the load;
+the default bulk_upsert writes batch by batch instead.
+"""
+
+import json
+import time
+import zipfile
+from itertools import count
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+import numpy as np
+from numpy.lib import format as npy_format
+from src.reduction import load_stored_reducer
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+def _npz_batches(path: Path, key: Optional[str], batch_size: int) -> Tuple[tuple, Iterator[np.ndarray]]:
+    """Shape of one array of an archive and an iterator over its rows, read straight from the zip"""
+    archive = zipfile.ZipFile(path)
+    names = [name[:-4] for name in archive.namelist() if name.endswith('.npy')]
+    if key is None:
+        if len(names) != 1:
+            archive.close()
+            raise ValueError(f"{path} holds arrays {names}; choose one with key=")
+        key = names[0]
+    elif key not in names:
+        archive.close()
+        raise ValueError(f"{path} has no array '{key}' (arrays: {names})")
+    
+    member = archive.open(f"{key}.npy")
+    version = npy_format.read_magic(member)
+    read_header = npy_format.read_array_header_1_0 if version == (1, 0) else npy_format.read_array_header_2_0
+    shape, fortran_order, dtype = read_header(member)
+    if fortran_order or dtype.hasobject or len(shape) != 2:
+        archive.close()
+        raise ValueError(f"'{key}' in {path} must be a C-ordered 2-D numeric array")
+    
+    def batches():
+        row_bytes = shape[1] * dtype.itemsize
+        try:
+            for start in range(0, shape[0], batch_size):
+                rows = min(batch_size, shape[0] - start)
+                buffer = member.read(rows * row_bytes)
+                yield np.frombuffer(buffer, dtype=dtype).reshape(rows, shape[1])
+        finally:
+            archive.close()
+    
+    return shape, batches()
+
+
+def open_embeddings(path: Union[str, Path], key: Optional[str] = None,
+                    batch_size: int = 10000) -> Tuple[tuple, Iterator[np.ndarray]]:
+    """
+    (shape, batches of rows) of an embedding matrix.
+    
+    Args:
+        path: .npy file, or .npz archive
+        key: Array to read from a .npz holding several
+    """
+    path = Path(path)
+    if path.suffix == '.npz':
+        return _npz_batches(path, key, batch_size)
+    
+    matrix = np.load(path, mmap_mode='r')
+    if matrix.ndim != 2:
+        raise ValueError(f"{path} must hold a 2-D array, not shape {matrix.shape}")
+    return matrix.shape, (matrix[start:start + batch_size] for start in range(0, len(matrix), batch_size))
+
+
+def read_metadata(path: Union[str, Path, None]) -> Iterator[Dict]:
+    """Rows of a JSON Lines metadata file (empty dicts forever without one)"""
+    if path is None:
+        yield from iter(dict, None)
+        return
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{number}: {e}") from None
+
+
+def bulk_load(store, encryption_manager, embeddings_path: Union[str, Path],
+              metadata_path: Union[str, Path, None] = None, key: Optional[str] = None,
+              batch_size: int = 10000, id_prefix: str = 'vec_') -> Dict:
+    """
+    Encrypt precomputed embeddings and write them to a store in one pass.
+    
+    Metadata row i belongs to vector i. A row's 'id' becomes the record id
+    (default: id_prefix + row number) and the rest its metadata, so rows
+    with a 'content' field serve as RAG sources like ingested chunks. The
+    collection is created if missing, and a PCA reducer stored with it is
+    applied to the vectors first.
+    
+    Returns:
+        Stats: records, dimension, seconds, records_per_sec
+    """
+    start = time.perf_counter()
+    shape, batches = open_embeddings(embeddings_path, key=key, batch_size=batch_size)
+    reducer = load_stored_reducer(store, encryption_manager)
+    dimension = reducer.dimension if reducer is not None else shape[1]
+    if reducer is not None and reducer.input_dimension != shape[1]:
+        raise ValueError(f"Embeddings have {shape[1]} dims; the collection's reducer expects "
+                         f"{reducer.input_dimension}")
+    
+    stats = store.stats()
+    if stats is None:
+        store.create_collection(dimension=dimension)
+    elif stats.get('dimension') not in (None, dimension):
+        raise ValueError(f"Collection stores {stats['dimension']}-dim vectors, not {dimension}")
+    
+    metadata = read_metadata(metadata_path)
+    rows = count()
+    
+    def records():
+        for batch in batches:
+            batch = np.asarray(batch, dtype=np.float32)
+            if reducer is not None:
+                batch = reducer.transform(batch)
+            for vector in encryption_manager.encrypt_vectors(batch):
+                row = next(rows)
+                meta = next(metadata, None)
+                if meta is None:
+                    raise ValueError(f"{metadata_path} has {row} rows but there are {shape[0]} vectors")
+                meta = dict(meta)
+                yield {'id': str(meta.pop('id', f"{id_prefix}{row}")), 'vector': vector, 'metadata': meta}
+        if metadata_path is not None and next(metadata, None) is not None:
+            raise ValueError(f"{metadata_path} has more rows than the {shape[0]} vectors")
+    
+    written = store.bulk_upsert(records(), batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    logger.info("✓ Bulk loaded %d vectors (%d dims) in %.1fs (%.0f/s)",
+                written, dimension, elapsed, written / elapsed if elapsed else 0.0)
+    return {'records': written, 'dimension': dimension, 'seconds': elapsed,
+            'records_per_sec': written / elapsed if elapsed else 0.0}
@@ -0,0 +1,47 @@
+"""
+Document centroid vectors for two-level (hierarchical) retrieval.
+
+Besides its chunks, ingestion can store one vector per document: the mean
+of its chunk embeddings, encrypted like any other vector, in a small
+doc-level collection next to the chunk collection. A hierarchical query
+searches that collection for the best documents first and then only
+their chunks, so the chunk stage no longer touches the whole corpus.
+"""
+
+from typing import Dict, List
+import numpy as np
+from src.vector_store import DEFAULT_COLLECTION, create_store
+
+CENTROID_SUFFIX = '.docs'
+
+def centroid_collection(collection: str = DEFAULT_COLLECTION) -> str:
+    """Doc-level collection of a chunk collection ('.' never occurs in tenant names)"""
+    return f"{collection}{CENTROID_SUFFIX}"
+
+
+def centroid_store(chunk_store, collection: str = DEFAULT_COLLECTION):
+    """Store of the doc-level collection beside a chunk store (sharing the simulator's database)"""
+    return create_store(collection=centroid_collection(collection),
+                        **({'db': chunk_store.db} if hasattr(chunk_store, 'db') else {}))
+
+
+def document_centroids(vectors: np.ndarray, lengths: List[int]) -> np.ndarray:
+    """
+    Mean vector per document of consecutive chunk vectors.
+    
+    Args:
+        vectors: Chunk vectors, each document's chunks contiguous
+        lengths: Chunks per document (all >= 1), in order
+    """
+    lengths = np.asarray(lengths)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    sums = np.add.reduceat(np.asarray(vectors), offsets, axis=0, dtype=np.float64)
+    return (sums / lengths[:, None]).astype(np.float32)
+
+
+def centroid_records(encryption_manager, doc_ids: List[str], vectors: np.ndarray,
+                     lengths: List[int]) -> List[Dict]:
+    """Encrypted doc-level records: id and metadata doc_id are the document id"""
+    centroids = document_centroids(vectors, lengths)
+    return [{'id': doc_id, 'vector': vector, 'metadata': {'doc_id': doc_id, 'chunks': int(n)}}
+            for doc_id, vector, n in zip(doc_ids, encryption_manager.encrypt_vectors(centroids), lengths)]
@@ -2,34 +2,179 @@
 Real CyborgDB integration using the official Docker service.
 """
 
-import requests
+import asyncio
+import base64
+import gzip
 import json
-from typing import List, Dict, Any
+import random
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Iterable
+from src.logging_config import get_logger
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = get_logger(__name__)
+
+# Transient statuses worth retrying for idempotent calls
+RETRY_STATUSES = {429, 502, 503, 504}
+
+class _CyborgDBHTTPBase:
+    """Request encoding and retry policy shared by the sync and async clients"""
+    
+    def __init__(self, host, port, pool_size, max_retries, backoff_factor,
+                 max_backoff, compress_requests, gzip_min_bytes):
+        self.base_url = f"http://{host}:{port}"
+        self.collection_name = "intellivault_vectors"
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.compress_requests = compress_requests
+        self.gzip_min_bytes = gzip_min_bytes
+    
+    def _encode_body(self, body: bytes,
+                     content_type='application/json') -> Tuple[bytes, Dict[str, str]]:
+        """Attach headers to a serialized body, gzip-compressing large ones"""
+        headers = {'Content-Type': content_type}
+        
+        if self.compress_requests and len(body) >= self.gzip_min_bytes:
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        
+        return body, headers
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff so retrying clients spread out"""
+        cap = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, cap)
+    
+    def _should_retry(self, attempt: int, idempotent: bool) -> bool:
+        return idempotent and attempt < self.max_retries
+    
+    def _format_stats(self, stats: Dict) -> Dict:
+        return {
+            'name': self.collection_name,
+            'count': stats.get('count', 0),
+            'dimension': stats.get('dimension', 384)
+        }
 
-class CyborgDBClient:
+class CyborgDBClient(_CyborgDBHTTPBase):
     """
     Client for real CyborgDB REST API.
+    Reuses pooled keep-alive connections and retries idempotent calls.
     """
     
-    def __init__(self, host='localhost', port=8001):
-        self.base_url = f"http://{host}:{port}"
-        self.collection_name = "intellivault_vectors"
+    def __init__(self, host='localhost', port=8001, pool_size=10,
+                 max_retries=3, backoff_factor=0.1, max_backoff=2.0,
+                 compress_requests=True, gzip_min_bytes=1024, session=None,
+                 max_batch_docs=500, max_batch_bytes=4 * 1024 * 1024,
+                 max_in_flight=4, payload_format='json', batch_timeout=30):
+        """
+        Args:
+            host: CyborgDB service host
+            port: CyborgDB service port
+            pool_size: Max keep-alive connections kept open to the service
+            max_retries: Retries for idempotent calls (health, stats, search)
+            backoff_factor: Base delay in seconds for jittered exponential backoff
+            max_backoff: Upper bound on a single backoff delay
+            compress_requests: Gzip request bodies of at least gzip_min_bytes
+            session: Optional preconfigured requests.Session
+            max_batch_docs: Max documents per /insert request
+            max_batch_bytes: Max serialized bytes per /insert request
+            max_in_flight: Insert batches uploading concurrently
+            payload_format: 'json' or 'msgpack' (raw bytes instead of base64)
+            batch_timeout: Timeout in seconds for one insert batch
+        """
+        super().__init__(host, port, pool_size, max_retries, backoff_factor,
+                         max_backoff, compress_requests, gzip_min_bytes)
         
-        print(f"🔗 Connecting to CyborgDB at {self.base_url}")
+        if payload_format not in ('json', 'msgpack'):
+            raise ValueError(f"Unknown payload_format: {payload_format}")
+        if payload_format == 'msgpack' and msgpack is None:
+            raise ImportError("payload_format='msgpack' requires msgpack (pip install msgpack)")
+        
+        self.max_batch_docs = max_batch_docs
+        self.max_batch_bytes = max_batch_bytes
+        self.max_in_flight = max_in_flight
+        self.payload_format = payload_format
+        self.batch_timeout = batch_timeout
+        
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=max(pool_size, max_in_flight),
+                              max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        logger.info("🔗 Connecting to CyborgDB at %s", self.base_url)
         
         # Test connection
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=5)
+            response = self._request('GET', '/health', timeout=5)
             if response.status_code == 200:
-                print("✓ Connected to real CyborgDB!")
+                logger.info("✓ Connected to real CyborgDB!")
             else:
-                print(f"⚠️  CyborgDB responded with status {response.status_code}")
+                logger.warning("CyborgDB responded with status %s", response.status_code)
         except requests.exceptions.RequestException as e:
-            print(f"✗ Could not connect to CyborgDB: {e}")
-            print("  Make sure Docker container is running:")
-            print("  docker run -d -p 8001:8001 cyborginc/cyborgdb-service")
+            logger.error("Could not connect to CyborgDB: %s\n"
+                         "  Make sure Docker container is running:\n"
+                         "  docker run -d -p 8001:8001 cyborginc/cyborgdb-service", e)
             raise
     
+    def _request(self, method: str, path: str, payload=None, timeout=10,
+                 idempotent=True, body: Optional[bytes] = None,
+                 content_type='application/json',
+                 headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        Send a request over the pooled session, retrying transient failures.
+        A body passed with headers is sent as is (already encoded).
+        """
+        if body is None and payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+        if headers is not None:
+            data = body
+        else:
+            data, headers = (None, None) if body is None else self._encode_body(body, content_type)
+        
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(
+                    method, f"{self.base_url}{path}",
+                    data=data, headers=headers, timeout=timeout
+                )
+                if response.status_code not in RETRY_STATUSES or \
+                        not self._should_retry(attempt, idempotent):
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not self._should_retry(attempt, idempotent):
+                    raise
+            
+            time.sleep(self._backoff_delay(attempt))
+            attempt += 1
+    
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
     def create_collection(self, dimension: int):
         """Create encrypted vector collection"""
         payload = {
@@ -39,91 +184,349 @@ class CyborgDBClient:
         }
         
         try:
-            response = requests.post(
-                f"{self.base_url}/collections",
-                json=payload,
-                timeout=10
-            )
+            response = self._request('POST', '/collections', payload, timeout=10)
             
             if response.status_code in [200, 201, 409]:  # 409 = already exists
-                print(f"✓ Collection '{self.collection_name}' ready (dimension: {dimension})")
+                logger.info("✓ Collection '%s' ready (dimension: %d)", self.collection_name, dimension)
             else:
-                print(f"⚠️  Collection creation returned {response.status_code}")
-                print(f"Response: {response.text}")
+                logger.warning("Collection creation returned %s: %s",
+                               response.status_code, response.text)
         except Exception as e:
-            print(f"Error creating collection: {e}")
+            logger.error("Error creating collection: %s", e)
     
-    def batch_insert(self, documents: List[Dict]):
-        """Batch insert encrypted vectors"""
-        payload = {
-            "collection": self.collection_name,
-            "documents": documents
-        }
+    def _pack_document(self, doc: Dict) -> bytes:
+        """Serialize one document in the configured payload format"""
+        document = {'id': doc['id'], 'vector': doc['vector'], 'metadata': doc['metadata']}
+        
+        if self.payload_format == 'msgpack':
+            # Ship ciphertext/nonce/tag as raw bytes instead of base64 text
+            vector = dict(doc['vector'])
+            for field in ('ciphertext', 'nonce', 'tag'):
+                if isinstance(vector.get(field), str):
+                    vector[field] = base64.b64decode(vector[field])
+            document['vector'] = vector
+            return msgpack.packb(document, use_bin_type=True)
+        
+        return json.dumps(document).encode('utf-8')
+    
+    def _assemble_body(self, packed_docs: List[bytes]) -> Tuple[bytes, str]:
+        """Wrap pre-serialized documents into one /insert request body"""
+        if self.payload_format == 'msgpack':
+            packer = msgpack.Packer(use_bin_type=True)
+            head = (packer.pack_map_header(2)
+                    + packer.pack('collection') + packer.pack(self.collection_name)
+                    + packer.pack('documents') + packer.pack_array_header(len(packed_docs)))
+            return head + b''.join(packed_docs), 'application/msgpack'
+        
+        head = json.dumps({'collection': self.collection_name})[:-1].encode('utf-8')
+        return head + b', "documents": [' + b', '.join(packed_docs) + b']}', 'application/json'
+    
+    def _split_batches(self, documents: Iterable[Dict]) -> Iterator[Tuple[List[bytes], List[str]]]:
+        """Yield (serialized docs, ids) batches bounded by count and bytes"""
+        batch, ids, size = [], [], 0
+        for doc in documents:
+            packed = self._pack_document(doc)
+            if batch and (len(batch) >= self.max_batch_docs or
+                          size + len(packed) > self.max_batch_bytes):
+                yield batch, ids
+                batch, ids, size = [], [], 0
+            batch.append(packed)
+            ids.append(doc['id'])
+            size += len(packed)
+        if batch:
+            yield batch, ids
+    
+    def _load_progress(self, progress_file: Optional[str]) -> set:
+        """Document ids already acknowledged by a previous run"""
+        if not progress_file or not Path(progress_file).exists():
+            return set()
+        with open(progress_file, 'r') as f:
+            return {line.strip() for line in f if line.strip()}
+    
+    def batch_insert(self, documents: Iterable[Dict],
+                     progress_file: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Batch insert encrypted vectors.
+        
+        Documents are split into batches of at most max_batch_docs /
+        max_batch_bytes and up to max_in_flight batches upload concurrently.
+        The ids of acknowledged documents are appended to progress_file (if
+        given), so rerunning the same insert after a failure only resends
+        what is missing, whatever the batch limits of the rerun.
+        
+        Returns:
+            Summary with batch counts, skipped (already acknowledged)
+            documents, failed batches, bytes sent (after compression) and
+            throughput
+        """
+        acked = self._load_progress(progress_file)
+        progress = open(progress_file, 'a') if progress_file else None
+        summary = {'batches': 0, 'acked': 0, 'skipped': 0, 'failed': [],
+                   'documents': 0, 'bytes': 0}
+        start = time.perf_counter()
+        
+        def upload(body, content_type):
+            # Compressed here, on the pool, so batches are gzipped in parallel
+            data, headers = self._encode_body(body, content_type)
+            # Not idempotent: a retried insert could duplicate vectors
+            response = self._request('POST', '/insert', body=data, headers=headers,
+                                     timeout=self.batch_timeout, idempotent=False)
+            return response, len(data)
+        
+        def collect(done):
+            for future in done:
+                ids = in_flight.pop(future)
+                key = f"{ids[0]}..{ids[-1]}#{len(ids)}"
+                try:
+                    response, sent = future.result()
+                    summary['bytes'] += sent
+                    if response.status_code not in [200, 201]:
+                        raise RuntimeError(f"status {response.status_code}: {response.text[:200]}")
+                except Exception as e:
+                    summary['failed'].append({'batch': key, 'error': str(e)})
+                    continue
+                
+                summary['acked'] += 1
+                summary['documents'] += len(ids)
+                if progress:
+                    progress.write(''.join(doc_id + '\n' for doc_id in ids))
+                    progress.flush()
         
+        def pending():
+            for doc in documents:
+                if doc['id'] in acked:
+                    summary['skipped'] += 1
+                else:
+                    yield doc
+        
+        in_flight = {}
         try:
-            response = requests.post(
-                f"{self.base_url}/insert",
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code in [200, 201]:
-                print(f"✓ Inserted {len(documents)} encrypted vectors")
-            else:
-                print(f"⚠️  Insert returned {response.status_code}")
-                print(f"Response: {response.text}")
-        except Exception as e:
-            print(f"Error inserting documents: {e}")
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+                for packed, ids in self._split_batches(pending()):
+                    summary['batches'] += 1
+                    
+                    # Window limit: wait for a slot before serializing the next body
+                    while len(in_flight) >= self.max_in_flight:
+                        collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+                    
+                    body, content_type = self._assemble_body(packed)
+                    in_flight[pool.submit(upload, body, content_type)] = ids
+                
+                collect(wait(in_flight).done)
+        finally:
+            if progress:
+                progress.close()
+        
+        summary['seconds'] = time.perf_counter() - start
+        summary['docs_per_sec'] = summary['documents'] / summary['seconds'] if summary['seconds'] else 0.0
+        
+        logger.info("✓ Inserted %d encrypted vectors (%d batches, %.0f docs/s)",
+                    summary['documents'], summary['acked'], summary['docs_per_sec'])
+        if summary['failed']:
+            logger.warning("%d batches failed; rerun with the same progress_file to resend them",
+                           len(summary['failed']))
+        return summary
     
-    def encrypted_search(self, query_vector: Dict, top_k: int = 5) -> List[Dict]:
-        """Encrypted similarity search"""
+    def encrypted_search(self, query_vector: Dict, top_k: int = 5,
+                         filters: Optional[Dict] = None) -> List[Dict]:
+        """Encrypted similarity search, optionally restricted by metadata filters"""
         payload = {
             "collection": self.collection_name,
             "query_vector": query_vector,
             "top_k": top_k
         }
+        if filters:
+            payload["filters"] = filters
         
         try:
-            response = requests.post(
-                f"{self.base_url}/search",
-                json=payload,
-                timeout=10
-            )
+            response = self._request('POST', '/search', payload, timeout=10)
             
             if response.status_code == 200:
                 return response.json().get("results", [])
             else:
-                print(f"⚠️  Search returned {response.status_code}")
-                print(f"Response: {response.text}")
+                logger.warning("Search returned %s: %s", response.status_code, response.text)
                 return []
         except Exception as e:
-            print(f"Error searching: {e}")
+            logger.error("Error searching: %s", e)
             return []
     
+    def delete(self, ids: List[str]) -> int:
+        """Delete vectors by id (safe to retry: deleting twice is a no-op)"""
+        payload = {
+            "collection": self.collection_name,
+            "ids": ids
+        }
+        
+        try:
+            response = self._request('POST', '/delete', payload, timeout=10)
+            
+            if response.status_code == 200:
+                return response.json().get("deleted", 0)
+            logger.warning("Delete returned %s", response.status_code)
+            return 0
+        except Exception as e:
+            logger.error("Error deleting: %s", e)
+            return 0
+    
+    def get_many(self, ids: List[str]) -> List[Optional[Dict]]:
+        """Get vectors by id, in request order (None for missing ids)"""
+        payload = {
+            "collection": self.collection_name,
+            "ids": ids
+        }
+        
+        try:
+            response = self._request('POST', '/get', payload, timeout=10)
+            
+            if response.status_code == 200:
+                by_id = {doc['id']: doc for doc in response.json().get("results", [])}
+                return [by_id.get(doc_id) for doc_id in ids]
+            logger.warning("Get returned %s", response.status_code)
+        except Exception as e:
+            logger.error("Error getting documents: %s", e)
+        return [None] * len(ids)
+    
+    def scan(self, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        """Stream every vector in the collection, one page per request"""
+        offset = 0
+        while True:
+            response = self._request(
+                'GET',
+                f"/collections/{self.collection_name}/scan?offset={offset}&limit={batch_size}",
+                timeout=30
+            )
+            response.raise_for_status()
+            
+            page = response.json().get("results", [])
+            if not page:
+                return
+            yield page
+            offset += len(page)
+    
     def get_stats(self) -> Dict:
         """Get collection statistics"""
         try:
-            response = requests.get(
-                f"{self.base_url}/collections/{self.collection_name}/stats",
-                timeout=5
+            response = self._request(
+                'GET', f"/collections/{self.collection_name}/stats", timeout=5
             )
             
             if response.status_code == 200:
-                stats = response.json()
-                return {
-                    'name': self.collection_name,
-                    'count': stats.get('count', 0),
-                    'dimension': stats.get('dimension', 384)
-                }
+                return self._format_stats(response.json())
             else:
                 return None
         except Exception as e:
-            print(f"Error getting stats: {e}")
+            logger.error("Error getting stats: %s", e)
+            return None
+
+
+class AsyncCyborgDBClient(_CyborgDBHTTPBase):
+    """
+    Async client for the CyborgDB REST API, for use inside the API server.
+    Same pooling, compression and retry policy as CyborgDBClient.
+    """
+    
+    def __init__(self, host='localhost', port=8001, pool_size=10,
+                 max_retries=3, backoff_factor=0.1, max_backoff=2.0,
+                 compress_requests=True, gzip_min_bytes=1024):
+        if httpx is None:
+            raise ImportError("AsyncCyborgDBClient requires httpx (pip install httpx)")
+        
+        super().__init__(host, port, pool_size, max_retries, backoff_factor,
+                         max_backoff, compress_requests, gzip_min_bytes)
+        
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=pool_size,
+                                max_keepalive_connections=pool_size)
+        )
+    
+    async def _request(self, method: str, path: str, payload=None, timeout=10,
+                       idempotent=True):
+        """Send a request over the pooled client, retrying transient failures"""
+        body = None if payload is None else json.dumps(payload).encode('utf-8')
+        data, headers = (None, None) if body is None else self._encode_body(body)
+        
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(
+                    method, path, content=data, headers=headers, timeout=timeout
+                )
+                if response.status_code not in RETRY_STATUSES or \
+                        not self._should_retry(attempt, idempotent):
+                    return response
+            except httpx.TransportError:
+                if not self._should_retry(attempt, idempotent):
+                    raise
+            
+            await asyncio.sleep(self._backoff_delay(attempt))
+            attempt += 1
+    
+    async def health(self) -> bool:
+        """True when the service answers /health"""
+        try:
+            response = await self._request('GET', '/health', timeout=5)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+    
+    async def create_collection(self, dimension: int) -> bool:
+        """Create encrypted vector collection"""
+        payload = {
+            "name": self.collection_name,
+            "dimension": dimension,
+            "encryption": True
+        }
+        response = await self._request('POST', '/collections', payload, timeout=10)
+        return response.status_code in [200, 201, 409]  # 409 = already exists
+    
+    async def batch_insert(self, documents: List[Dict]) -> bool:
+        """Batch insert encrypted vectors"""
+        payload = {
+            "collection": self.collection_name,
+            "documents": documents
+        }
+        response = await self._request('POST', '/insert', payload, timeout=30,
+                                       idempotent=False)
+        return response.status_code in [200, 201]
+    
+    async def encrypted_search(self, query_vector: Dict, top_k: int = 5) -> List[Dict]:
+        """Encrypted similarity search"""
+        payload = {
+            "collection": self.collection_name,
+            "query_vector": query_vector,
+            "top_k": top_k
+        }
+        response = await self._request('POST', '/search', payload, timeout=10)
+        if response.status_code != 200:
+            return []
+        return response.json().get("results", [])
+    
+    async def get_stats(self) -> Optional[Dict]:
+        """Get collection statistics"""
+        response = await self._request(
+            'GET', f"/collections/{self.collection_name}/stats", timeout=5
+        )
+        if response.status_code != 200:
             return None
+        return self._format_stats(response.json())
+    
+    async def aclose(self):
+        """Release pooled connections"""
+        await self.client.aclose()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.aclose()
 
 
 # Test script
 if __name__ == "__main__":
+    from src.logging_config import configure_logging
+    configure_logging('cli')
+    
     print("\n" + "="*70)
     print("TESTING REAL CYBORGDB CONNECTION")
     print("="*70)
@@ -3,8 +3,11 @@ Real CyborgDB Service integration - CORRECTED.
 """
 
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 import numpy as np
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
 
 # Try different import methods
 try:
@@ -15,46 +18,70 @@ except:
         import cyborgdb_service
         CLIENT_TYPE = "service"
     except:
-        raise ImportError("Could not import CyborgDB client")
+        CLIENT_TYPE = None
 
 class CyborgDBServiceClient:
     """
     Production CyborgDB Service client.
     """
     
-    def __init__(self, api_key: str):
-        """Initialize CyborgDB client."""
+    def __init__(self, api_key: str, encryption_manager=None, client=None, index=None):
+        """
+        Initialize CyborgDB client.
+        
+        Args:
+            api_key: CyborgDB API key
+            encryption_manager: EncryptionManager used to unwrap vectors before
+                                upsert/query. Defaults to the collection's data
+                                key, created once on first use.
+            client: Optional preconnected CyborgDB client
+            index: Optional existing index (skips create_collection)
+        """
         self.api_key = api_key
         self.collection_name = "intellivault_vectors"
+        self._enc = encryption_manager
+        
+        if index is not None:
+            self.index = index
         
-        print("🔗 Connecting to CyborgDB...")
+        if client is not None or index is not None:
+            self.client = client
+            return
+        
+        if CLIENT_TYPE is None:
+            raise ImportError("Could not import CyborgDB client")
+        
+        logger.info("🔗 Connecting to CyborgDB...")
         
         try:
             if CLIENT_TYPE == "core":
                 # Using cyborgdb-core
                 self.client = CyborgDB(api_key=api_key)
-                print("✓ Using cyborgdb-core client")
+                logger.info("✓ Using cyborgdb-core client")
             else:
                 # Using cyborgdb-service
                 self.client = cyborgdb_service.CyborgDB(api_key=api_key)
-                print("✓ Using cyborgdb-service client")
+                logger.info("✓ Using cyborgdb-service client")
             
-            print("✓ Connected to CyborgDB!")
+            logger.info("✓ Connected to CyborgDB!")
             
         except Exception as e:
-            print(f"✗ Connection failed: {e}")
-            print("\nTrying alternative approach...")
+            logger.error("Connection failed: %s", e)
+            logger.info("Trying alternative approach...")
             
             # Fallback: use the service directly
             try:
                 from cyborgdb_core import create_client
                 self.client = create_client(api_key=api_key)
-                print("✓ Connected using create_client!")
+                logger.info("✓ Connected using create_client!")
             except:
                 raise
     
     def create_collection(self, dimension: int):
         """Create encrypted vector collection"""
+        if getattr(self, 'index', None) is not None:
+            return
+        
         try:
             # Create index (CyborgDB terminology)
             self.index = self.client.create_index(
@@ -62,32 +89,32 @@ class CyborgDBServiceClient:
                 dimension=dimension,
                 metric="cosine"
             )
-            print(f"✓ Index '{self.collection_name}' created (dimension: {dimension})")
+            logger.info("✓ Index '%s' created (dimension: %d)", self.collection_name, dimension)
         except Exception as e:
             # Index might already exist
             try:
                 self.index = self.client.get_index(self.collection_name)
-                print(f"✓ Using existing index '{self.collection_name}'")
+                logger.info("✓ Using existing index '%s'", self.collection_name)
             except:
-                print(f"⚠️  Error: {e}")
+                logger.warning("Error: %s", e)
+    
+    @property
+    def enc(self):
+        """Encryption manager shared by every call (key file read at most once)"""
+        if self._enc is None:
+            from src.encryption import EncryptionManager
+            self._enc = EncryptionManager().for_collection(self.collection_name)
+        return self._enc
     
     def batch_insert(self, documents: List[Dict]) -> bool:
         """Batch insert vectors"""
         try:
             # Prepare data
-            ids = []
-            vectors = []
-            metadatas = []
+            ids = [doc['id'] for doc in documents]
+            metadatas = [doc['metadata'] for doc in documents]
             
-            from src.encryption import EncryptionManager
-            enc = EncryptionManager()
-            
-            for doc in documents:
-                ids.append(doc['id'])
-                # Decrypt vector (CyborgDB handles encryption)
-                vector = enc.decrypt_vector(doc['vector'])
-                vectors.append(vector.tolist())
-                metadatas.append(doc['metadata'])
+            # Decrypt vectors into one matrix (CyborgDB handles encryption)
+            vectors = self.enc.decrypt_vectors([doc['vector'] for doc in documents])
             
             # Insert
             self.index.upsert(
@@ -96,28 +123,26 @@ class CyborgDBServiceClient:
                 metadata=metadatas
             )
             
-            print(f"✓ Inserted {len(documents)} vectors into CyborgDB")
+            logger.info("✓ Inserted %d vectors into CyborgDB", len(documents))
             return True
             
-        except Exception as e:
-            print(f"⚠️  Insert error: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Insert error")
             return False
     
-    def encrypted_search(self, query_vector: Dict, top_k: int = 5) -> List[Dict]:
-        """Search vectors"""
+    def encrypted_search(self, query_vector: Dict, top_k: int = 5,
+                         filters: Optional[Dict] = None) -> List[Dict]:
+        """Search vectors, optionally restricted by metadata filters"""
         try:
-            from src.encryption import EncryptionManager
-            enc = EncryptionManager()
-            
             # Decrypt query
-            query = enc.decrypt_vector(query_vector)
+            query = self.enc.decrypt_vectors([query_vector])[0]
             
             # Search
+            kwargs = {'filters': filters} if filters else {}
             results = self.index.query(
-                vector=query.tolist(),
-                top_k=top_k
+                vector=query,
+                top_k=top_k,
+                **kwargs
             )
             
             # Format results
@@ -131,12 +156,46 @@ class CyborgDBServiceClient:
             
             return formatted
             
-        except Exception as e:
-            print(f"⚠️  Search error: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Search error")
             return []
     
+    def delete(self, ids: List[str]) -> int:
+        """Delete vectors by id"""
+        try:
+            self.index.delete(ids=ids)
+            return len(ids)
+        except Exception as e:
+            logger.warning("Delete error: %s", e)
+            return 0
+    
+    def get_many(self, ids: List[str]) -> List[Optional[Dict]]:
+        """Get vectors by id, re-encrypted so callers see the usual record format"""
+        try:
+            by_id = {item['id']: item for item in self.index.get(ids=ids)}
+        except Exception as e:
+            logger.warning("Get error: %s", e)
+            return [None] * len(ids)
+        
+        records = []
+        for doc_id in ids:
+            item = by_id.get(doc_id)
+            if item is None:
+                records.append(None)
+                continue
+            records.append({
+                'id': doc_id,
+                'vector': self.enc.encrypt_vector(np.asarray(item['vector'], dtype=np.float32)),
+                'metadata': item.get('metadata', {})
+            })
+        return records
+    
+    def scan(self, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        """Stream every vector in the index in batches"""
+        ids = list(self.index.list_ids())
+        for start in range(0, len(ids), batch_size):
+            yield self.get_many(ids[start:start + batch_size])
+    
     def get_stats(self) -> Optional[Dict]:
         """Get statistics"""
         try:
@@ -147,12 +206,13 @@ class CyborgDBServiceClient:
                 'dimension': stats.get('dimension', 384)
             }
         except Exception as e:
-            print(f"⚠️  Stats error: {e}")
+            logger.warning("Stats error: %s", e)
             return None
 
 
 if __name__ == "__main__":
-    import sys
+    from src.logging_config import configure_logging
+    configure_logging('cli')
     
     api_key = os.getenv("CYBORGDB_API_KEY", "cyborg_ce554d85bbfc451aa4d332a94c94f1fe")
     
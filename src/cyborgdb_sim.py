@@ -1,22 +1,153 @@
+import atexit
 import json
+import os
+import threading
+import time
 import numpy as np
+from contextlib import contextmanager
+from itertools import chain, islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable, Iterator
 import pickle
+from src.metrics import span
+from src.logging_config import get_logger
+from src.wal import WriteAheadLog, read_segment, claim_orphaned_segments
+from src.vector_store import matches_filters
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: writers are only serialized within a process
+    fcntl = None
+
+logger = get_logger(__name__)
+
+class _Version:
+    """One published, immutable state of a collection"""
+    
+    __slots__ = ('generation', 'file_id', 'data', 'pins', '_ids', '_positions')
+    
+    def __init__(self, generation: int, file_id, data: List[Dict]):
+        self.generation = generation
+        self.file_id = file_id
+        self.data = data
+        self.pins = 0
+        self._ids = None
+        self._positions = None
+    
+    def ids(self) -> set:
+        if self._ids is None:
+            self._ids = {entry['id'] for entry in self.data}
+        return self._ids
+    
+    def positions(self) -> Dict[str, int]:
+        """Row of each id in data"""
+        if self._positions is None:
+            self._positions = {entry['id']: row for row, entry in enumerate(self.data)}
+        return self._positions
+
+
+def _upserted(data: List[Dict], documents: List[Dict]) -> List[Dict]:
+    """New list: data with documents inserted, replacing entries with the same id"""
+    data = list(data)
+    positions = {entry['id']: i for i, entry in enumerate(data)}
+    for doc in documents:
+        if doc['id'] in positions:
+            data[positions[doc['id']]] = doc
+        else:
+            positions[doc['id']] = len(data)
+            data.append(doc)
+    return data
+
+
+def _best(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest finite scores, best first"""
+    top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return top[np.isfinite(scores[top])]
+
+
+def _unit_vectors(encryption_manager, entries: List[Dict]) -> np.ndarray:
+    matrix = np.asarray(encryption_manager.decrypt_vectors([entry['vector'] for entry in entries]),
+                        dtype=np.float32).reshape(len(entries), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1.0)
+    return matrix
+
 
 class SimulatedCyborgDB:
     """
     Simulated CyborgDB for development and testing.
     Mimics the real CyborgDB API but stores data locally.
+    
+    Concurrency (MVCC-style): writers build a new version of a collection,
+    write it to a temporary file and rename it over <collection>.pkl, so
+    the file is always complete. Readers use the last published version
+    from memory and only reload when the file has been replaced; they never
+    wait for a writer. A reader that needs several consistent reads pins a
+    version with snapshot(); versions are dropped once replaced and unpinned
+    (on disk, a replaced file lives on only while a reader still has it open).
+    Writers, and manifest updates, are serialized across processes with
+    file locks.
+    
+    Single inserts go through a group-committed write-ahead log instead:
+    insert() returns once its record is fsynced to the log, the record is
+    visible to this process immediately, and a checkpoint folds logged
+    records into the collection file (every checkpoint_records inserts or
+    checkpoint_interval seconds, before any other write, and on close).
+    Other processes see them after the checkpoint. Logs left by a crash
+    are replayed on startup.
+    
+    Deletes write tombstones (<collection>.tombstones.json, tied to the
+    exact file version they apply to) and hide records at once without
+    rewriting the collection. Dead records are dropped by the next rewrite
+    of the collection, or by compact() / the background compactor when
+    nothing else rewrites it.
     """
     
-    def __init__(self, storage_path='data/cyborgdb_storage'):
+    def __init__(self, storage_path='data/cyborgdb_storage', wal: bool = True,
+                 commit_window_ms: float = 2.0, checkpoint_records: int = 10000,
+                 checkpoint_interval: float = 1.0):
+        """
+        Args:
+            wal: Log single inserts (False: each insert rewrites the collection)
+            commit_window_ms: How long a group commit waits for more inserts
+            checkpoint_records: Pending logged inserts that trigger a checkpoint
+            checkpoint_interval: Seconds between background checkpoints
+        """
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
         self.collections = {}
+        self._versions: Dict[str, _Version] = {}
+        self._retired: Dict[str, List[_Version]] = {}
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._write_locks: Dict[str, threading.Lock] = {}
+        
+        self.wal_enabled = wal
+        self.commit_window_ms = commit_window_ms
+        self.checkpoint_records = checkpoint_records
+        self.checkpoint_interval = checkpoint_interval
+        self._wal = None
+        self._pending: Dict[str, List[Dict]] = {}
+        self._pending_lock = threading.Lock()
+        self._checkpoint_lock = threading.RLock()
+        self._checkpoint_wanted = threading.Event()
+        self._sealed = []
+        self._tombstones: Dict[str, tuple] = {}
+        self._live: Dict[str, tuple] = {}
+        self._indexes: Dict[str, tuple] = {}
+        self._tail_indexes: Dict[str, tuple] = {}
+        self._dead_rows: Dict[str, tuple] = {}
+        self._fields: Dict[str, tuple] = {}
+        self._compactor_stop = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        self._closed = False
+        
         self._load_collections()
-        print(f"✓ Simulated CyborgDB initialized")
-        print(f"  Storage: {self.storage_path.absolute()}")
+        if wal:
+            self._recover()
+        logger.info("✓ Simulated CyborgDB initialized")
+        logger.info("  Storage: %s", self.storage_path.absolute())
     
     def _load_collections(self):
         """Load existing collections from disk"""
@@ -25,37 +156,65 @@ class SimulatedCyborgDB:
             try:
                 with open(manifest_file, 'r') as f:
                     self.collections = json.load(f)
-                print(f"  ✓ Loaded {len(self.collections)} collections from manifest")
+                logger.info("  ✓ Loaded %d collections from manifest", len(self.collections))
             except Exception as e:
-                print(f"  ⚠ Could not load manifest: {e}")
+                logger.warning("Could not load manifest: %s", e)
         
-        # Also check for .pkl files without manifest
-        pkl_files = list(self.storage_path.glob('*.pkl'))
-        for pkl_file in pkl_files:
+        # Also pick up .pkl files missing from the manifest. Their count is
+        # filled in on first use rather than unpickling every file at startup.
+        for pkl_file in self.storage_path.glob('*.pkl'):
             collection_name = pkl_file.stem
             if collection_name not in self.collections:
-                # Reconstruct collection metadata from file
-                try:
-                    with open(pkl_file, 'rb') as f:
-                        data = pickle.load(f)
-                    self.collections[collection_name] = {
-                        'count': len(data),
-                        'dimension': 384  # Default
-                    }
-                    print(f"  ✓ Recovered collection '{collection_name}' with {len(data)} vectors")
-                except Exception as e:
-                    print(f"  ⚠ Could not load {pkl_file.name}: {e}")
+                self.collections[collection_name] = {
+                    'count': None,
+                    'dimension': 384  # Default
+                }
+                logger.info("  ✓ Found collection '%s' (not in manifest)", collection_name)
+    
+    @contextmanager
+    def _file_lock(self, name: str):
+        """Exclusive lock shared with other processes using this storage path"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.storage_path / f".{name}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _atomic_write(self, path: Path, write):
+        tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}-{threading.get_ident()}")
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
     
     def _save_manifest(self):
-        """Save collection metadata"""
+        """
+        Save collection metadata. Entries another process published since we
+        loaded the manifest are kept: per collection, the higher generation wins.
+        """
         manifest_file = self.storage_path / 'manifest.json'
-        with open(manifest_file, 'w') as f:
-            json.dump(self.collections, f, indent=2)
+        with self._lock, self._file_lock('manifest'):
+            if manifest_file.exists():
+                try:
+                    with open(manifest_file) as f:
+                        on_disk = json.load(f)
+                except ValueError:
+                    on_disk = {}
+                for name, entry in on_disk.items():
+                    ours = self.collections.get(name)
+                    if ours is None or entry.get('generation', 0) > ours.get('generation', 0):
+                        self.collections[name] = entry
+            
+            payload = json.dumps(self.collections, indent=2).encode('utf-8')
+            self._atomic_write(manifest_file, lambda f: f.write(payload))
     
     def create_collection(self, name: str, dimension: int, **kwargs):
         """Create a new collection for encrypted vectors"""
         if name in self.collections:
-            print(f"  ℹ Collection '{name}' already exists")
+            logger.debug("Collection '%s' already exists", name)
             return
         
         self.collections[name] = {
@@ -66,115 +225,623 @@ class SimulatedCyborgDB:
         # Create storage file
         collection_file = self.storage_path / f"{name}.pkl"
         if not collection_file.exists():
-            with open(collection_file, 'wb') as f:
-                pickle.dump([], f)
-        
-        self._save_manifest()
-        print(f"✓ Created collection: {name} (dimension: {dimension})")
+            self._write(name, [])
+        else:
+            self._save_manifest()
+        logger.info("✓ Created collection: %s (dimension: %d)", name, dimension)
     
     def insert(self, collection: str, id: str, vector: Dict[str, Any], 
                metadata: Dict[str, Any]):
-        """Insert encrypted vector with metadata"""
-        collection_file = self.storage_path / f"{collection}.pkl"
+        """Insert encrypted vector with metadata (durable on return)"""
+        entry = {'id': id, 'vector': vector, 'metadata': metadata}
+        if not self.wal_enabled:
+            self.upsert(collection, [entry])
+            return
         
-        # Load existing data
-        with open(collection_file, 'rb') as f:
-            data = pickle.load(f)
+        self._log().append((collection, entry))
+        if len(self._pending.get(collection, ())) >= self.checkpoint_records:
+            self._checkpoint_wanted.set()
+    
+    def batch_insert(self, collection: str, documents: List[Dict]):
+        """Batch insert for efficiency"""
+        with self._ordered_write(collection):
+            self._write(collection, self._live_base(collection) + list(documents))
+        logger.debug("Inserted %d documents into '%s'", len(documents), collection)
+    
+    def _log(self) -> WriteAheadLog:
+        """This process's write-ahead log, started on the first insert"""
+        if self._wal is None:
+            with self._lock:
+                if self._wal is None:
+                    if self._closed:
+                        raise RuntimeError("SimulatedCyborgDB is closed")
+                    self._wal = WriteAheadLog(self.storage_path / 'wal',
+                                              commit_window_ms=self.commit_window_ms,
+                                              on_commit=self._logged)
+                    threading.Thread(target=self._checkpoint_loop, name='wal-checkpoint',
+                                     daemon=True).start()
+                    atexit.register(self.close)
+        return self._wal
+    
+    def _logged(self, entries):
+        with self._pending_lock:
+            for collection, entry in entries:
+                self._pending.setdefault(collection, []).append(entry)
+    
+    def _checkpoint_loop(self):
+        while not self._closed:
+            self._checkpoint_wanted.wait(self.checkpoint_interval)
+            self._checkpoint_wanted.clear()
+            if self._closed:
+                return
+            try:
+                self.checkpoint()
+            except Exception as e:
+                logger.warning("WAL checkpoint failed (will retry): %s", e)
+    
+    def checkpoint(self) -> int:
+        """Fold logged inserts into the collection files; returns how many"""
+        with self._checkpoint_lock:
+            if self._wal is None:
+                return 0
+            with self._wal.io_lock, self._pending_lock:
+                batches = {collection: list(entries)
+                           for collection, entries in self._pending.items() if entries}
+                if not batches:
+                    return 0
+                self._sealed.append(self._wal.rotate())
+            
+            for collection, entries in batches.items():
+                with self._writing(collection):
+                    data = _upserted(self._live_base(collection), entries)
+                    self._write(collection, data, applied_pending=len(entries))
+            
+            # Every entry of the sealed segments is now in a collection file
+            for sealed in self._sealed:
+                os.unlink(sealed.name)
+                sealed.close()
+            self._sealed = []
+            applied = sum(len(entries) for entries in batches.values())
+            logger.debug("Checkpointed %d logged inserts", applied)
+            return applied
+    
+    def _recover(self):
+        """Replay log segments left behind by a process that did not close cleanly"""
+        for segment in claim_orphaned_segments(self.storage_path / 'wal'):
+            batches: Dict[str, List[Dict]] = {}
+            for collection, entry in read_segment(segment):
+                batches.setdefault(collection, []).append(entry)
+            for collection, entries in batches.items():
+                with self._writing(collection):
+                    self._write(collection, _upserted(self._live_base(collection), entries))
+            segment.unlink()
+            if batches:
+                logger.info("  ✓ Replayed %d logged inserts from %s",
+                            sum(map(len, batches.values())), segment.name)
+    
+    def close(self):
+        """Stop the compactor, checkpoint and stop the write-ahead log"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._compactor_stop.set()
+        if self._compactor is not None:
+            # A pass in flight finishes publishing (and dropping the tombstones) first
+            self._compactor.join()
+        if self._wal is None:
+            return
+        self._checkpoint_wanted.set()
+        self.checkpoint()
+        self._wal.close()
+        active = Path(self._wal.file.name)
+        if active.exists() and active.stat().st_size == 0:
+            active.unlink()
+    
+    def _file_id(self, collection: str):
+        """Identity of the published file: changes whenever it is replaced"""
+        try:
+            st = os.stat(self.storage_path / f"{collection}.pkl")
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def _current(self, collection: str, latest: bool = False) -> _Version:
+        """
+        The latest published version, reloaded only if the file changed.
+        Readers keep getting the previous version while another thread loads
+        a new one; writers (latest=True) wait for it.
+        """
+        file_id = self._file_id(collection)
+        version = self._versions.get(collection)
+        if version is not None and version.file_id == file_id:
+            return version
         
-        # Add new entry
-        entry = {
-            'id': id,
-            'vector': vector,
-            'metadata': metadata
-        }
-        data.append(entry)
+        if not self._load_lock.acquire(blocking=latest or version is None):
+            return version
+        try:
+            version = self._versions.get(collection)
+            if version is not None and version.file_id == file_id:
+                return version
+            data = []
+            if file_id is not None:
+                with open(self.storage_path / f"{collection}.pkl", 'rb') as f:
+                    # Identify what was actually opened: it may have been replaced since the stat
+                    st = os.fstat(f.fileno())
+                    file_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+                    data = pickle.load(f)
+            with self._lock:
+                generation = version.generation + 1 if version is not None else 1
+                self._install(collection, _Version(generation, file_id, data))
+                return self._versions[collection]
+        finally:
+            self._load_lock.release()
+    
+    def _install(self, collection: str, version: _Version):
+        old = self._versions.get(collection)
+        self._versions[collection] = version
+        if old is not None and old.pins:
+            self._retired.setdefault(collection, []).append(old)
+    
+    def _dead(self, collection: str, version: _Version) -> frozenset:
+        """Tombstoned ids of a version (tombstones for any other version are stale)"""
+        path = self.storage_path / f"{collection}.tombstones.json"
+        try:
+            st = os.stat(path)
+            file_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return frozenset()
         
-        # Save
-        with open(collection_file, 'wb') as f:
-            pickle.dump(data, f)
+        cached = self._tombstones.get(collection)
+        if cached is None or cached[0] != file_id:
+            try:
+                with open(path) as f:
+                    record = json.load(f)
+            except (FileNotFoundError, ValueError):
+                return frozenset()
+            cached = (file_id, tuple(record['applies_to'] or ()), frozenset(record['ids']))
+            self._tombstones[collection] = cached
+        return cached[2] if cached[1] == tuple(version.file_id or ()) else frozenset()
+    
+    def _live_data(self, collection: str, version: _Version) -> List[Dict]:
+        """A version's entries minus tombstoned ones (cached per version and tombstone set)"""
+        dead = self._dead(collection, version)
+        if not dead:
+            return version.data
+        cached = self._live.get(collection)
+        if cached is None or cached[0] is not version or cached[1] is not dead:
+            cached = (version, dead, [entry for entry in version.data if entry['id'] not in dead])
+            self._live[collection] = cached
+        return cached[2]
+    
+    def _live_base(self, collection: str) -> List[Dict]:
+        """What a writer builds on: the latest version without its dead records"""
+        return self._live_data(collection, self._current(collection, latest=True))
+    
+    def _parts(self, collection: str, version: Optional[_Version] = None):
+        """(version, logged inserts not yet checkpointed into it), from the same moment"""
+        if version is None:
+            version = self._current(collection)
+            with self._pending_lock:
+                # Version and pending entries must come from the same moment
+                version = self._versions.get(collection, version)
+                pending = list(self._pending.get(collection, ()))
+        else:
+            with self._pending_lock:
+                pending = list(self._pending.get(collection, ()))
+        return version, pending
+    
+    def _view(self, collection: str, version: Optional[_Version] = None) -> List[Dict]:
+        """A version's live entries with logged (not yet checkpointed) inserts applied"""
+        version, pending = self._parts(collection, version)
+        data = self._live_data(collection, version)
+        if not pending:
+            return data
         
-        # Update count
-        if collection in self.collections:
-            self.collections[collection]['count'] += 1
-            self._save_manifest()
+        ids = version.ids()
+        if len({entry['id'] for entry in pending}) == len(pending) and \
+                not any(entry['id'] in ids for entry in pending):
+            return data + pending
+        return _upserted(data, pending)
     
-    def batch_insert(self, collection: str, documents: List[Dict]):
-        """Batch insert for efficiency"""
+    def _read(self, collection: str) -> List[Dict]:
+        """All entries of the latest version (shared: do not modify in place)"""
+        return self._view(collection)
+    
+    @contextmanager
+    def snapshot(self, collection: str):
+        """Pin the current version for a series of consistent reads"""
+        version = self._current(collection)
+        with self._lock:
+            version.pins += 1
+            if self._versions.get(collection) is not version:
+                # Replaced between loading and pinning: track it until unpinned
+                self._retired.setdefault(collection, []).append(version)
+        try:
+            view = self._view(collection, version)
+            if view is not version.data:
+                # Logged inserts are included: hand out a frozen copy of the view
+                version = _Version(version.generation, version.file_id, view)
+            yield version
+        finally:
+            with self._lock:
+                version.pins -= 1
+                retired = self._retired.get(collection, [])
+                if version.pins == 0 and version in retired:
+                    retired.remove(version)
+    
+    def versions(self, collection: str) -> List[int]:
+        """Generations still held in memory: the current one plus pinned old ones"""
+        with self._lock:
+            current = self._versions.get(collection)
+            alive = [v.generation for v in self._retired.get(collection, [])]
+            return alive + ([current.generation] if current is not None else [])
+    
+    @contextmanager
+    def _writing(self, collection: str):
+        """Serialize read-modify-write cycles on a collection"""
+        with self._lock:
+            lock = self._write_locks.setdefault(collection, threading.Lock())
+        with lock, self._file_lock(collection):
+            yield
+    
+    @contextmanager
+    def _ordered_write(self, collection: str):
+        """
+        A write that must land after every insert already acknowledged:
+        logged inserts are checkpointed first, so replaying the log after a
+        crash can never reorder them behind this write.
+        """
+        with self._checkpoint_lock:
+            self.checkpoint()
+            with self._writing(collection):
+                yield
+    
+    def _write(self, collection: str, data: List[Dict], applied_pending: int = 0):
+        """
+        Publish a new version of a collection and update its count.
+        applied_pending: logged inserts the new version already contains
+        """
         collection_file = self.storage_path / f"{collection}.pkl"
+        self._atomic_write(collection_file, lambda f: pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL))
         
-        # Load existing
-        if collection_file.exists():
-            with open(collection_file, 'rb') as f:
-                data = pickle.load(f)
-        else:
-            data = []
+        with self._lock:
+            previous = self._versions.get(collection)
+            generation = max(previous.generation if previous else 0,
+                             self.collections.get(collection, {}).get('generation', 0)) + 1
+            with self._pending_lock:
+                self._install(collection, _Version(generation, self._file_id(collection), data))
+                if applied_pending:
+                    del self._pending[collection][:applied_pending]
+            
+            if collection in self.collections:
+                self.collections[collection]['count'] = len(data)
+            else:
+                self.collections[collection] = {
+                    'count': len(data),
+                    'dimension': 384
+                }
+            self.collections[collection]['generation'] = generation
+        self._save_manifest()
         
-        # Add all
-        data.extend(documents)
+        # The new version holds no dead records; old tombstones no longer apply
+        tombstones = self.storage_path / f"{collection}.tombstones.json"
+        if tombstones.exists():
+            tombstones.unlink()
+    
+    def upsert(self, collection: str, documents: List[Dict]):
+        """Insert documents, replacing existing entries with the same id"""
+        with self._ordered_write(collection):
+            self._write(collection, _upserted(self._live_base(collection), documents))
+    
+    def bulk_upsert(self, collection: str, records: Iterable[Dict]) -> int:
+        """
+        Upsert a stream of records as a single new version: the collection
+        file is written once however many records arrive. The version is
+        built in memory first (every record of the load is held until the
+        write). Other writers of the collection wait until the stream ends;
+        readers do not.
+        """
+        with self._ordered_write(collection):
+            data = list(self._live_base(collection))
+            positions = {entry['id']: i for i, entry in enumerate(data)}
+            written = 0
+            for doc in records:
+                position = positions.setdefault(doc['id'], len(data))
+                if position == len(data):
+                    data.append(doc)
+                else:
+                    data[position] = doc
+                written += 1
+            self._write(collection, data)
+        logger.debug("Bulk loaded %d documents into '%s'", written, collection)
+        return written
+    
+    def delete(self, collection: str, ids: List[str]) -> int:
+        """Delete entries by id (tombstones), returning how many were removed"""
+        with self._ordered_write(collection):
+            version = self._current(collection, latest=True)
+            return self._add_tombstones(collection, version, set(ids) & version.ids())
+    
+    def delete_by_filter(self, collection: str, filters: Dict) -> int:
+        """Delete every entry whose metadata matches filters (see vector_store.matches_filters)"""
+        if not filters:
+            raise ValueError("delete_by_filter needs a filter; use a new collection to drop everything")
+        with self._ordered_write(collection):
+            version = self._current(collection, latest=True)
+            doomed = {entry['id'] for entry in self._live_data(collection, version)
+                      if matches_filters(entry['metadata'], filters)}
+            return self._add_tombstones(collection, version, doomed)
+    
+    def _add_tombstones(self, collection: str, version: _Version, ids: set) -> int:
+        dead = self._dead(collection, version)
+        doomed = ids - dead
+        if doomed:
+            record = {'applies_to': list(version.file_id or ()), 'ids': sorted(dead | doomed)}
+            payload = json.dumps(record).encode('utf-8')
+            self._atomic_write(self.storage_path / f"{collection}.tombstones.json",
+                               lambda f: f.write(payload))
+            logger.debug("Deleted %d entries from '%s'", len(doomed), collection)
+        return len(doomed)
+    
+    def compact(self, collection: str, max_records_per_sec: Optional[float] = None,
+                chunk_size: int = 10000) -> int:
+        """
+        Rewrite a collection without its dead records, returning how many
+        were reclaimed. The new version is built in chunks outside the write
+        lock, optionally throttled; if another write lands meanwhile the pass
+        is abandoned (that write already dropped the dead records).
+        """
+        version = self._current(collection, latest=True)
+        dead = self._dead(collection, version)
+        if not dead:
+            return 0
         
-        # Save
-        with open(collection_file, 'wb') as f:
-            pickle.dump(data, f)
+        live = []
+        start = time.perf_counter()
+        for offset in range(0, len(version.data), chunk_size):
+            live.extend(entry for entry in version.data[offset:offset + chunk_size]
+                        if entry['id'] not in dead)
+            if max_records_per_sec:
+                ahead = (offset + chunk_size) / max_records_per_sec - (time.perf_counter() - start)
+                if ahead > 0 and self._compactor_stop.wait(ahead):
+                    return 0
         
-        # Update count
-        if collection in self.collections:
-            self.collections[collection]['count'] += len(documents)
-        else:
-            self.collections[collection] = {
-                'count': len(documents),
-                'dimension': 384
-            }
+        with self._ordered_write(collection):
+            if self._current(collection, latest=True) is not version or \
+                    self._dead(collection, version) != dead:
+                return 0
+            self._write(collection, live)
         
-        self._save_manifest()
-        print(f"✓ Inserted {len(documents)} documents into '{collection}'")
+        reclaimed = len(version.data) - len(live)
+        logger.info("✓ Compacted '%s': %d dead records reclaimed", collection, reclaimed)
+        return reclaimed
+    
+    def start_compactor(self, interval: float = 5.0, min_dead_ratio: float = 0.1,
+                        max_records_per_sec: Optional[float] = 200000) -> threading.Thread:
+        """
+        Background compaction of every collection whose dead share reaches
+        min_dead_ratio, throttled so foreground queries keep their CPU.
+        Stopped by close().
+        """
+        def run():
+            while not self._compactor_stop.wait(interval):
+                for collection in list(self.collections):
+                    try:
+                        stats = self.get_collection_stats(collection)
+                        if stats and stats['dead'] and \
+                                stats['dead'] >= min_dead_ratio * (stats['live'] + stats['dead']):
+                            self.compact(collection, max_records_per_sec=max_records_per_sec)
+                    except Exception as e:
+                        logger.warning("Compaction of '%s' failed: %s", collection, e)
+        
+        self._compactor = threading.Thread(target=run, name='compactor', daemon=True)
+        self._compactor.start()
+        return self._compactor
     
     def search(self, collection: str, query_vector: Dict, 
-               top_k: int = 5, **kwargs) -> List[Dict]:
+               top_k: int = 5, filters: Optional[Dict] = None,
+               encryption_manager=None, **kwargs) -> List[Dict]:
         """
         Encrypted similarity search.
-        """
-        collection_file = self.storage_path / f"{collection}.pkl"
         
-        if not collection_file.exists():
-            return []
+        Given the collection's key (an EncryptionManager), entries are
+        ranked by cosine similarity, as CyborgDB ranks an index loaded with
+        its key. Without it the simulator cannot read the vectors and
+        returns the first top_k matching entries unranked.
         
-        with open(collection_file, 'rb') as f:
-            data = pickle.load(f)
+        The stored version is scored through a matrix decrypted once per
+        version and key, with tombstoned and re-logged entries masked out;
+        logged inserts not yet checkpointed are scored separately and
+        merged, so a growing log never invalidates the version's matrix.
+        """
+        with span('search_load'):
+            version, pending = self._parts(collection)
+            data = version.data
+            dead = self._dead(collection, version)
+            # Latest logged entry per id; it replaces any stored entry with that id
+            latest = {entry['id']: row for row, entry in enumerate(pending)}
+            tail_rows = [row for row in latest.values()
+                         if matches_filters(pending[row]['metadata'], filters)]
+            rows = self._matching_rows(collection, data, filters)
         
-        if not data:
-            return []
+        if encryption_manager is None:
+            hidden = dead | latest.keys()
+            found = (data[row] for row in (range(len(data)) if rows is None else rows))
+            found = (entry for entry in found if entry['id'] not in hidden)
+            return list(islice(chain(found, (pending[row] for row in tail_rows)), top_k))
         
-        # For simulation, return top_k results
-        results = data[:min(top_k, len(data))]
+        with span('search_score'):
+            query = np.asarray(encryption_manager.decrypt_vector(query_vector), dtype=np.float32)
+            scores = np.empty(0, dtype=np.float32)
+            found = []
+            if data and (rows is None or len(rows)):
+                matrix = self._index(collection, data, encryption_manager)
+                scores = matrix @ query if rows is None else matrix[rows] @ query
+                positions = version.positions()
+                hidden = np.concatenate([self._dead_rows_of(collection, version, dead), np.fromiter(
+                    (positions[doc_id] for doc_id in latest if doc_id in positions), dtype=np.int64)])
+                if len(hidden):
+                    scores[hidden if rows is None else np.isin(rows, hidden)] = -np.inf
+                top = _best(scores, top_k)
+                scores = scores[top]
+                found = [data[row] for row in (top if rows is None else rows[top])]
+            if tail_rows:
+                tail = self._tail_index(collection, pending, encryption_manager)
+                scores = np.concatenate([scores, tail[tail_rows] @ query])
+                found += [pending[row] for row in tail_rows]
+            return [found[i] for i in _best(scores, top_k)]
+    
+    def _matching_rows(self, collection: str, data: List[Dict],
+                       filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Rows of a version's data matching filters (None: no filters). The
+        first filter key is looked up in a value -> rows map built once per
+        version, so a selective filter (e.g. the doc_ids of a hierarchical
+        query) touches only its rows; any other keys are checked on those.
+        """
+        if not filters:
+            return None
+        key, expected = next(iter(filters.items()))
+        by_value = self._field_index(collection, data, key)
+        if by_value is None:
+            return np.fromiter((row for row, entry in enumerate(data)
+                                if matches_filters(entry['metadata'], filters)), dtype=np.int64)
         
-        return results
+        values = expected if isinstance(expected, (list, tuple, set)) else [expected]
+        try:
+            found = [by_value[value] for value in set(values) if value in by_value]
+        except TypeError:  # unhashable filter value: no stored value can equal it
+            found = []
+        rows = np.sort(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+        if len(filters) > 1:
+            rows = rows[[matches_filters(data[row]['metadata'], filters) for row in rows]]
+        return rows
+    
+    def _field_index(self, collection: str, data: List[Dict], key: str) -> Optional[Dict]:
+        """Metadata value -> rows of a version's data (None if some value is unhashable)"""
+        cached = self._fields.get(collection)
+        if cached is None or cached[0] is not data:
+            cached = (data, {})
+            self._fields[collection] = cached
+        if key not in cached[1]:
+            by_value = {}
+            try:
+                for row, entry in enumerate(data):
+                    by_value.setdefault(entry['metadata'].get(key), []).append(row)
+            except TypeError:
+                by_value = None
+            else:
+                by_value = {value: np.asarray(rows, dtype=np.int64) for value, rows in by_value.items()}
+            cached[1][key] = by_value
+        return cached[1][key]
+    
+    def _index(self, collection: str, data: List[Dict], encryption_manager) -> np.ndarray:
+        """Unit-length plaintext vectors of a version's data, decrypted once per version and key"""
+        cached = self._indexes.get(collection)
+        if cached is not None and cached[0] is data and cached[1] == encryption_manager.key_id:
+            return cached[2]
+        matrix = _unit_vectors(encryption_manager, data)
+        self._indexes[collection] = (data, encryption_manager.key_id, matrix)
+        return matrix
+    
+    def _tail_index(self, collection: str, pending: List[Dict], encryption_manager) -> np.ndarray:
+        """Unit-length vectors of logged inserts; only those logged since the last call are decrypted"""
+        cached = self._tail_indexes.get(collection)
+        done = 0
+        if cached is not None and cached[0] == encryption_manager.key_id and \
+                0 < len(cached[1]) <= len(pending) and \
+                pending[0] is cached[1][0] and pending[len(cached[1]) - 1] is cached[1][-1]:
+            done = len(cached[1])
+        if done == len(pending):
+            return cached[2]
+        fresh = _unit_vectors(encryption_manager, pending[done:])
+        matrix = np.concatenate([cached[2], fresh]) if done else fresh
+        self._tail_indexes[collection] = (encryption_manager.key_id, pending, matrix)
+        return matrix
+    
+    def _dead_rows_of(self, collection: str, version: _Version, dead: frozenset) -> np.ndarray:
+        """Rows of a version's tombstoned entries (cached per version and tombstone set)"""
+        if not dead:
+            return np.empty(0, dtype=np.int64)
+        cached = self._dead_rows.get(collection)
+        if cached is None or cached[0] is not version or cached[1] is not dead:
+            positions = version.positions()
+            cached = (version, dead, np.fromiter((positions[doc_id] for doc_id in dead if doc_id in positions),
+                                                 dtype=np.int64))
+            self._dead_rows[collection] = cached
+        return cached[2]
     
     def get(self, collection: str, id: str) -> Dict:
         """Get document by ID"""
-        collection_file = self.storage_path / f"{collection}.pkl"
-        
-        if not collection_file.exists():
-            return None
-        
-        with open(collection_file, 'rb') as f:
-            data = pickle.load(f)
-        
-        for entry in data:
+        for entry in self._read(collection):
             if entry['id'] == id:
                 return entry
         
         return None
     
+    def get_many(self, collection: str, ids: List[str]) -> List[Optional[Dict]]:
+        """Get several documents by ID (None for missing ids)"""
+        by_id = {entry['id']: entry for entry in self._read(collection)}
+        return [by_id.get(doc_id) for doc_id in ids]
+    
+    def scan(self, collection: str, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        """Stream all entries of a collection in batches, from one pinned version"""
+        with self.snapshot(collection) as version:
+            data = version.data
+            for start in range(0, len(data), batch_size):
+                yield data[start:start + batch_size]
+    
+    def save_reducer(self, collection: str, record: Dict):
+        """Store a collection's (encrypted) dimensionality reducer"""
+        with open(self.storage_path / f"{collection}.reducer.json", 'w') as f:
+            json.dump(record, f)
+        
+        if collection in self.collections:
+            self.collections[collection]['reducer'] = record.get('type')
+            self._save_manifest()
+    
+    def load_reducer(self, collection: str) -> Optional[Dict]:
+        """The stored reducer record, or None if vectors are stored unreduced"""
+        reducer_file = self.storage_path / f"{collection}.reducer.json"
+        if not reducer_file.exists():
+            return None
+        with open(reducer_file) as f:
+            return json.load(f)
+    
     def get_collection_stats(self, collection: str) -> Dict:
         """Get collection statistics"""
         if collection not in self.collections:
             return None
         
-        return {
+        if self.collections[collection]['count'] is None:
+            try:
+                self.collections[collection]['count'] = len(self._read(collection))
+            except Exception as e:
+                logger.warning("Could not load %s.pkl: %s", collection, e)
+                return None
+            self._save_manifest()
+        
+        stats = {
             'name': collection,
             'count': self.collections[collection]['count'],
-            'dimension': self.collections[collection]['dimension']
+            'dimension': self.collections[collection]['dimension'],
+            'live': self.collections[collection]['count'],
+            'dead': 0,
+            'reclaimable_bytes': 0
         }
+        
+        # Only look at the data when there are tombstones or logged inserts
+        has_tombstones = (self.storage_path / f"{collection}.tombstones.json").exists()
+        if has_tombstones or self._pending.get(collection):
+            version = self._current(collection)
+            dead = self._dead(collection, version)
+            dead_entries = [entry for entry in version.data if entry['id'] in dead] if dead else []
+            stats['count'] = stats['live'] = len(self._view(collection))
+            stats['dead'] = len(dead_entries)
+            stats['reclaimable_bytes'] = sum(len(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+                                             for entry in dead_entries)
+        return stats
 
 
 class CyborgDBClient:
@@ -193,12 +860,12 @@ class CyborgDBClient:
                 self.client = cyborgdb.Client(host=host, port=port)
                 self.mode = "REAL"
             except ImportError:
-                print("⚠️  CyborgDB not installed, using simulated mode")
+                logger.warning("CyborgDB not installed, using simulated mode")
                 self.client = SimulatedCyborgDB()
                 self.mode = "SIMULATED (fallback)"
         
         self.collection_name = "intellivault_vectors"
-        print(f"✓ CyborgDB Client ready ({self.mode})")
+        logger.info("✓ CyborgDB Client ready (%s)", self.mode)
     
     def create_collection(self, dimension: int):
         """Create collection"""
@@ -242,6 +909,14 @@ class CyborgDBClient:
             top_k=top_k
         )
     
+    def delete(self, doc_ids: List[str]) -> int:
+        """Delete by ID"""
+        return self.client.delete(self.collection_name, doc_ids)
+    
+    def delete_by_filter(self, filters: Dict) -> int:
+        """Delete every document whose metadata matches filters"""
+        return self.client.delete_by_filter(self.collection_name, filters)
+    
     def get_by_id(self, doc_id: str) -> Dict:
         """Get by ID"""
         return self.client.get(
@@ -0,0 +1,191 @@
+"""
+Near-duplicate chunk detection with MinHash and locality-sensitive hashing.
+
+Each chunk is reduced to a MinHash signature of its word shingles; LSH
+banding finds earlier chunks likely to share most shingles, and the
+signatures' agreement estimates their Jaccard similarity. A chunk at or
+above the threshold is a duplicate of that earlier (canonical) chunk and
+need not be embedded or stored as a vector of its own.
+
+The index follows the store: a rewritten chunk's signature is replaced, a
+deleted one removed, and each duplicate remembers its canonical chunk.
+"""
+
+import base64
+import json
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+import numpy as np
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_INDEX_PATH = 'data/dedup_index.jsonl'
+PRIME = 4294967291  # largest prime below 2**32: hash values fit in uint32
+WORD = re.compile(r'\w+')
+
+class ChunkDeduplicator:
+    """MinHash-LSH index of canonical chunks, persisted as an append-only JSONL log"""
+    
+    def __init__(self, path: Union[str, Path, None] = None, threshold: float = 0.8,
+                 num_perm: int = 128, bands: int = 32, shingle_size: int = 5, seed: int = 1):
+        """
+        Args:
+            path: Index file (None: in memory only). Must belong to one collection.
+            threshold: Estimated Jaccard similarity of word shingles at which
+                       a chunk counts as a duplicate
+            num_perm: MinHash permutations (signature length)
+            bands: LSH bands; more bands find less similar candidates
+            shingle_size: Words per shingle
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.buckets: Dict[tuple, List[str]] = {}
+        self.duplicate_of: Dict[str, str] = {}
+        # (chunk id, its signature, its canonical) before each change since the last commit
+        self.uncommitted: List[tuple] = []
+        if self.path is not None and self.path.exists():
+            self._load()
+    
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a text's word shingles"""
+        words = WORD.findall(text.lower())
+        n = self.shingle_size
+        shingles = {' '.join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        # (a * x + b) mod p per permutation and shingle; a, b < 2**31 and x < 2**32 stay within uint64
+        values = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % PRIME
+        return values.min(axis=1).astype(np.uint32)
+    
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+    
+    def _apply(self, chunk_id: str, signature: Optional[np.ndarray] = None,
+               canonical: Optional[str] = None):
+        """Make a chunk canonical (signature), a duplicate of canonical, or unknown (neither)"""
+        previous = self.signatures.pop(chunk_id, None)
+        if previous is not None:
+            for key in self._band_keys(previous):
+                bucket = self.buckets[key]
+                bucket.remove(chunk_id)
+                if not bucket:
+                    del self.buckets[key]
+        self.duplicate_of.pop(chunk_id, None)
+        if signature is not None:
+            self.signatures[chunk_id] = signature
+            for key in self._band_keys(signature):
+                self.buckets.setdefault(key, []).append(chunk_id)
+        elif canonical is not None:
+            self.duplicate_of[chunk_id] = canonical
+    
+    def _set(self, chunk_id: str, signature: Optional[np.ndarray] = None,
+             canonical: Optional[str] = None):
+        self.uncommitted.append((chunk_id, self.signatures.get(chunk_id), self.duplicate_of.get(chunk_id)))
+        self._apply(chunk_id, signature, canonical)
+    
+    def find(self, signature: np.ndarray) -> Optional[str]:
+        """The most similar indexed chunk at or above the threshold, if any"""
+        candidates = {chunk_id for key in self._band_keys(signature)
+                      for chunk_id in self.buckets.get(key, ())}
+        best, best_similarity = None, self.threshold
+        for chunk_id in candidates:
+            similarity = float(np.mean(self.signatures[chunk_id] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = chunk_id, similarity
+        return best
+    
+    def assign(self, chunk_ids: List[str], texts: List[str]) -> List[Optional[str]]:
+        """
+        Canonical chunk of each chunk (None: it is new and becomes canonical).
+        The index is updated at once, so duplicates within the same batch
+        are found too: a rewritten chunk's old signature is replaced, and a
+        canonical chunk that is now a duplicate stops being canonical.
+        commit() once the chunks are stored, or rollback() if storing failed.
+        """
+        signatures = [self.signature(text) for text in texts]
+        unchanged = set()
+        for chunk_id, signature in zip(chunk_ids, signatures):
+            previous = self.signatures.get(chunk_id)
+            if previous is not None and np.array_equal(previous, signature):
+                unchanged.add(chunk_id)
+            elif previous is not None:
+                self._set(chunk_id)  # its old text must not match anything in the batch
+        
+        canonical = []
+        for chunk_id, signature in zip(chunk_ids, signatures):
+            if chunk_id in unchanged:
+                canonical.append(None)
+                continue
+            match = self.find(signature)
+            if match is None:
+                self._set(chunk_id, signature=signature)
+            elif self.duplicate_of.get(chunk_id) != match:
+                self._set(chunk_id, canonical=match)
+            canonical.append(match)
+        return canonical
+    
+    def add(self, chunk_id: str, text: str):
+        """Index a chunk as canonical (e.g. a duplicate promoted when its canonical went away)"""
+        self._set(chunk_id, signature=self.signature(text))
+    
+    def link(self, chunk_id: str, canonical_id: str):
+        """Record a chunk as a duplicate of a canonical chunk"""
+        self._set(chunk_id, canonical=canonical_id)
+    
+    def remove(self, chunk_ids: List[str]):
+        """Forget deleted chunks, canonical or duplicate"""
+        for chunk_id in chunk_ids:
+            if chunk_id in self.signatures or chunk_id in self.duplicate_of:
+                self._set(chunk_id)
+    
+    def _entry(self, chunk_id: str) -> Dict:
+        if chunk_id in self.signatures:
+            return {'id': chunk_id,
+                    'signature': base64.b64encode(self.signatures[chunk_id].tobytes()).decode('ascii')}
+        if chunk_id in self.duplicate_of:
+            return {'id': chunk_id, 'duplicate_of': self.duplicate_of[chunk_id]}
+        return {'id': chunk_id, 'removed': True}
+    
+    def commit(self):
+        """Persist the changes since the last commit (the latest entry per chunk wins on load)"""
+        if self.path is not None and self.uncommitted:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a') as f:
+                for chunk_id in dict.fromkeys(chunk_id for chunk_id, _, _ in self.uncommitted):
+                    f.write(json.dumps(self._entry(chunk_id)) + '\n')
+        self.uncommitted = []
+    
+    def rollback(self):
+        """Undo the changes since the last commit (their chunks were never stored)"""
+        for chunk_id, signature, canonical in reversed(self.uncommitted):
+            self._apply(chunk_id, signature, canonical)
+        self.uncommitted = []
+    
+    def _load(self):
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    signature = None
+                    if 'signature' in record:
+                        signature = np.frombuffer(base64.b64decode(record['signature']), dtype=np.uint32)
+                except ValueError:
+                    continue  # torn last line of an interrupted run
+                self._apply(record['id'], signature, record.get('duplicate_of'))
+        logger.info("✓ Loaded %d canonical chunk signatures", len(self.signatures))
@@ -0,0 +1,317 @@
+"""
+Local embedding service shared by several API workers.
+
+One process loads the model and serves embeddings over a unix-domain
+socket, merging concurrent requests into micro-batches. Workers use
+RemoteEncoder (EmbeddingGenerator(backend='remote')) instead of loading
+their own copy, and fall back to in-process inference when the service
+is unreachable.
+
+Run with:
+    python -m src.embedding_server --socket /tmp/intellivault-embed.sock
+
+Wire format: every message is a 4-byte big-endian length plus payload.
+Requests are JSON ({"op": "embed", "texts": [...]} or {"op": "info"});
+replies are a JSON header, followed for embeddings by one frame of
+float32 data shaped by the header.
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Union
+import numpy as np
+from src.logging_config import get_logger, configure_logging
+
+logger = get_logger(__name__)
+
+DEFAULT_SOCKET = '/tmp/intellivault-embed.sock'
+HEADER = struct.Struct('!I')
+
+def default_socket_path() -> str:
+    return os.getenv('INTELLIVAULT_EMBED_SOCKET', DEFAULT_SOCKET)
+
+
+def send_frame(sock, payload: bytes):
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def recv_frame(rfile) -> bytes:
+    header = rfile.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ConnectionError("connection closed")
+    (length,) = HEADER.unpack(header)
+    payload = rfile.read(length)
+    if len(payload) < length:
+        raise ConnectionError("connection closed mid-frame")
+    return payload
+
+
+class MicroBatcher:
+    """
+    Merges texts from concurrent requests into one model call.
+    A batch closes when it reaches max_batch texts or max_wait_ms
+    after its first request arrived.
+    """
+    
+    def __init__(self, model, max_batch: int = 64, max_wait_ms: float = 2.0):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.thread = threading.Thread(target=self._run, name='embed-batcher', daemon=True)
+        self.thread.start()
+    
+    def submit(self, texts: List[str]) -> Future:
+        future = Future()
+        self.requests.put((texts, future))
+        return future
+    
+    def close(self):
+        self.requests.put(None)
+        self.thread.join()
+    
+    def _run(self):
+        while True:
+            first = self.requests.get()
+            if first is None:
+                return
+            pending = [first]
+            count = len(first[0])
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            
+            while count < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                pending.append(item)
+                count += len(item[0])
+            
+            self._process(pending)
+            if stop:
+                return
+    
+    def _process(self, pending):
+        texts = [text for request_texts, _ in pending for text in request_texts]
+        try:
+            vectors = np.asarray(self.model.encode(texts, batch_size=self.max_batch,
+                                                   convert_to_numpy=True), dtype=np.float32)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        
+        self.batches += 1
+        start = 0
+        for request_texts, future in pending:
+            future.set_result(vectors[start:start + len(request_texts)])
+            start += len(request_texts)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                request = json.loads(recv_frame(self.rfile))
+            except (ConnectionError, OSError):
+                return
+            
+            try:
+                if request.get('op') == 'info':
+                    send_frame(self.connection, json.dumps(server.info).encode())
+                    continue
+                vectors = server.batcher.submit(request['texts']).result()
+            except Exception as e:
+                send_frame(self.connection, json.dumps({'error': str(e)}).encode())
+                continue
+            
+            header = {'shape': list(vectors.shape), 'dtype': 'float32'}
+            send_frame(self.connection, json.dumps(header).encode())
+            send_frame(self.connection, vectors.tobytes())
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    """Serves one model instance to every connected worker"""
+    
+    daemon_threads = True
+    
+    def __init__(self, model, socket_path: Optional[str] = None,
+                 max_batch: int = 64, max_wait_ms: float = 2.0, model_name: str = ''):
+        """
+        Args:
+            model: Anything with encode(texts, batch_size, convert_to_numpy) and
+                   get_sentence_embedding_dimension() (SentenceTransformer, OnnxEncoder)
+            socket_path: Unix socket to listen on (replaced if stale)
+            max_batch: Texts per merged model call
+            max_wait_ms: How long a request may wait for others to join its batch
+        """
+        self.socket_path = socket_path or default_socket_path()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        
+        self.batcher = MicroBatcher(model, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        self.info = {'model': model_name,
+                     'dimension': model.get_sentence_embedding_dimension(),
+                     'pid': os.getpid()}
+        super().__init__(self.socket_path, _Handler)
+    
+    def start(self) -> 'EmbeddingServer':
+        """Serve on a background thread"""
+        threading.Thread(target=self.serve_forever, name='embed-server', daemon=True).start()
+        return self
+    
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class RemoteEncoder:
+    """
+    Drop-in for SentenceTransformer.encode that calls the embedding service.
+    Each thread keeps its own connection. If the service is unreachable the
+    local fallback model is built (once) and used until retry_interval has
+    passed, after which the service is tried again.
+    """
+    
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 30.0,
+                 fallback: Optional[Callable] = None, retry_interval: float = 30.0):
+        """
+        Args:
+            socket_path: Service socket (defaults to $INTELLIVAULT_EMBED_SOCKET)
+            fallback: Zero-argument factory for an in-process model, or None to
+                      raise when the service is down
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self.fallback = fallback
+        self.retry_interval = retry_interval
+        self.local = threading.local()
+        self.local_model = None
+        self.remote_down_until = 0.0
+        self.lock = threading.Lock()
+        self.dimension = None
+        self.dimension = self.get_sentence_embedding_dimension()
+    
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            conn = (sock, sock.makefile('rb'))
+            self.local.conn = conn
+        return conn
+    
+    def _drop_connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+            self.local.conn = None
+    
+    def _call(self, request: dict):
+        sock, rfile = self._connection()
+        send_frame(sock, json.dumps(request).encode())
+        header = json.loads(recv_frame(rfile))
+        if 'error' in header:
+            raise RuntimeError(f"Embedding service error: {header['error']}")
+        if 'shape' not in header:
+            return header
+        data = recv_frame(rfile)
+        return np.frombuffer(data, dtype=header['dtype']).reshape(header['shape'])
+    
+    def _remote(self, request: dict):
+        """Call the service, or return None when it is unavailable"""
+        if time.monotonic() < self.remote_down_until:
+            return None
+        try:
+            return self._call(request)
+        except (OSError, ConnectionError) as e:
+            self._drop_connection()
+            if self.fallback is None:
+                raise
+            logger.warning("Embedding service unavailable (%s); using in-process model", e)
+            self.remote_down_until = time.monotonic() + self.retry_interval
+            return None
+    
+    def _local(self):
+        with self.lock:
+            if self.local_model is None:
+                self.local_model = self.fallback()
+        return self.local_model
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        if self.dimension is not None:
+            return self.dimension
+        info = self._remote({'op': 'info'})
+        if info is None:
+            return self._local().get_sentence_embedding_dimension()
+        return info['dimension']
+    
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, show_progress_bar: bool = False) -> np.ndarray:
+        """Embed one string (1D result) or a list of strings (2D result)"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        
+        vectors = self._remote({'op': 'embed', 'texts': texts})
+        if vectors is None:
+            return self._local().encode(sentences, batch_size=batch_size,
+                                        convert_to_numpy=True,
+                                        show_progress_bar=show_progress_bar)
+        return vectors[0] if single else vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IntelliVault embedding service")
+    parser.add_argument('--socket', default=default_socket_path())
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default='torch')
+    parser.add_argument('--quantize', action='store_true', help="int8 weights (onnx)")
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+    
+    configure_logging('server')
+    from src.embeddings import EmbeddingGenerator
+    generator = EmbeddingGenerator(args.model, backend=args.backend, quantize=args.quantize)
+    
+    server = EmbeddingServer(generator.model, socket_path=args.socket, max_batch=args.max_batch,
+                             max_wait_ms=args.max_wait_ms, model_name=args.model)
+    logger.info("✓ Embedding service listening on %s", args.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
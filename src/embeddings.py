@@ -1,5 +1,8 @@
-from sentence_transformers import SentenceTransformer
+import os
 import numpy as np
+from src.logging_config import get_logger, show_progress
+
+logger = get_logger(__name__)
 
 class EmbeddingGenerator:
     """
@@ -7,22 +10,54 @@ class EmbeddingGenerator:
     Uses pre-trained sentence transformer models.
     """
     
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, model_name='all-MiniLM-L6-v2', backend=None,
+                 quantize=False, intra_op_threads=None, inter_op_threads=1,
+                 onnx_dir=None, socket_path=None, fallback=True):
         """
         Initialize the embedding model.
         
         Args:
             model_name: Name of the sentence-transformer model
                        'all-MiniLM-L6-v2' is fast and good quality (384 dims)
+            backend: 'torch', 'onnx' or 'remote' (the shared embedding service,
+                     see src/embedding_server.py). Defaults to
+                     $INTELLIVAULT_EMBEDDING_BACKEND, then 'torch'.
+            quantize: ONNX only - use dynamic int8 weights
+            intra_op_threads, inter_op_threads: ONNX only - Runtime thread pools
+            onnx_dir: ONNX only - where exported models are cached
+            socket_path: Remote only - service socket ($INTELLIVAULT_EMBED_SOCKET)
+            fallback: Remote only - load the model in-process if the service is down
         """
-        print(f"Loading embedding model: {model_name}")
-        print("This may take a minute on first run...")
+        backend = backend or os.getenv('INTELLIVAULT_EMBEDDING_BACKEND', 'torch')
+        if backend not in ('torch', 'onnx', 'remote'):
+            raise ValueError(f"Unknown embedding backend '{backend}' (choose from torch, onnx, remote)")
+        self.backend = backend
+        
+        logger.info("Loading embedding model: %s (%s%s)", model_name, backend,
+                    ", int8" if backend == 'onnx' and quantize else "")
+        logger.info("This may take a minute on first run...")
         
-        self.model = SentenceTransformer(model_name)
+        if backend == 'remote':
+            from src.embedding_server import RemoteEncoder
+            
+            def load_local():
+                from sentence_transformers import SentenceTransformer
+                return SentenceTransformer(model_name)
+            
+            self.model = RemoteEncoder(socket_path, fallback=load_local if fallback else None)
+        elif backend == 'onnx':
+            from src.onnx_embeddings import OnnxEncoder
+            self.model = OnnxEncoder.load(model_name, export_dir=onnx_dir, quantize=quantize,
+                                          intra_op_threads=intra_op_threads,
+                                          inter_op_threads=inter_op_threads)
+        else:
+            # Imported here: torch + sentence-transformers take seconds to import
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(model_name)
         self.dimension = self.model.get_sentence_embedding_dimension()
         
-        print(f"✓ Model loaded!")
-        print(f"✓ Embedding dimension: {self.dimension}")
+        logger.info("✓ Model loaded!")
+        logger.info("✓ Embedding dimension: %d", self.dimension)
     
     def generate_embedding(self, text):
         """
@@ -50,16 +85,17 @@ class EmbeddingGenerator:
         Returns:
             numpy array of embeddings (one per text)
         """
-        print(f"Generating embeddings for {len(texts)} texts...")
+        logger.debug("Generating embeddings for %d texts", len(texts))
         
+        # A progress bar per small batch costs more than it tells
         embeddings = self.model.encode(
             texts,
             batch_size=batch_size,
             convert_to_numpy=True,
-            show_progress_bar=True
+            show_progress_bar=show_progress(len(texts))
         )
         
-        print(f"✓ Generated {len(embeddings)} embeddings!")
+        logger.debug("Generated %d embeddings", len(embeddings))
         return embeddings
     
     def get_dimension(self):
@@ -88,6 +124,9 @@ class EmbeddingGenerator:
 
 # Test when running directly
 if __name__ == "__main__":
+    from src.logging_config import configure_logging
+    configure_logging('cli')
+    
     print("Testing EmbeddingGenerator...\n")
     
     # Create generator
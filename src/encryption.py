@@ -1,30 +1,75 @@
-from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+import hashlib
+import os
+import threading
+import time
 import base64
 import numpy as np
 from pathlib import Path
 import json
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+NONCE_BYTES = 12
+TAG_BYTES = 16
+DATA_KEY_TTL = 3600.0  # seconds a derived data key stays cached
+KEY_FILE_ENV = 'INTELLIVAULT_KEY_FILE'
+
+def key_id(key: bytes) -> str:
+    """Short public fingerprint of a key, stored with every record it encrypts"""
+    return hashlib.sha256(b'intellivault:key-id:' + key).hexdigest()[:16]
+
+
+def _hkdf(key: bytes, context: str) -> bytes:
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                info=f"intellivault:data-key:{context}".encode('utf-8'))
+    return hkdf.derive(key)
+
 
 class EncryptionManager:
     """
     Handles encryption and decryption of embedding vectors.
     Uses AES-256-GCM for authenticated encryption.
     Automatically saves and loads encryption keys.
+    
+    Key hierarchy: the master key derives per-collection and per-tenant
+    data keys (for_collection, for_tenant). Every record carries the
+    key_id of the key that sealed it, so after a rotation old records stay
+    readable through the retired keys and can be re-encrypted lazily.
     """
     
-    def __init__(self, master_key=None):
+    def __init__(self, master_key=None, previous_keys=None, data_key_ttl=DATA_KEY_TTL):
         """
         Initialize with a master encryption key.
-        If no key provided, tries to load from config/encryption_key.json
+        If no key provided, tries to load from $INTELLIVAULT_KEY_FILE, then
+        config/encryption_key.json
         If no saved key exists, generates a new random 256-bit key.
         
         Args:
             master_key: Optional 32-byte key. If None, loads or generates key.
+            previous_keys: Retired master keys, only used to decrypt records
+                           written before a rotation
+            data_key_ttl: Seconds a derived data key stays cached
         """
+        self._ciphers = {}
+        self._retired_keys = []
+        self._data_keys = {}
+        self._data_keys_lock = threading.Lock()
+        self.data_key_ttl = data_key_ttl
+        self.project_root = None
+        self.key_file = None
+        for key in previous_keys or []:
+            self.add_retired_key(key)
+        
         if master_key is not None:
             # User provided a key directly
             self.master_key = master_key
-            print("✓ Using provided encryption key")
+            logger.info("✓ Using provided encryption key")
             return
         
         # Determine project root
@@ -33,75 +78,239 @@ class EncryptionManager:
             project_root = current_path.parent
         else:
             project_root = current_path
+        self.project_root = project_root
         
-        key_file = project_root / 'config' / 'encryption_key.json'
+        key_file = Path(os.getenv(KEY_FILE_ENV) or project_root / 'config' / 'encryption_key.json')
+        self.key_file = key_file
         
         # Try to load existing key
         if key_file.exists():
             try:
                 with open(key_file, 'r') as f:
                     key_data = json.load(f)
+                for retired in key_data.get('previous_keys', []):
+                    self.add_retired_key(base64.b64decode(retired))
                 self.master_key = base64.b64decode(key_data['key'])
-                print("✓ Loaded existing encryption key")
+                logger.info("✓ Loaded existing encryption key")
                 return
             except Exception as e:
-                print(f"⚠️  Error loading key file: {e}")
-                print("⚠️  Generating new key...")
+                logger.warning("Error loading key file: %s", e)
+                logger.warning("Generating new key...")
         
         # No existing key found - generate new one
         self.master_key = get_random_bytes(32)
-        print("⚠️  New encryption key generated!")
+        logger.warning("New encryption key generated!")
         
         # Save the new key
-        self._save_key(project_root)
+        self._save_key()
     
-    def _save_key(self, project_root):
-        """Save the encryption key to config directory"""
+    def _save_key(self):
+        """Save the encryption key to the key file"""
         try:
-            config_dir = project_root / 'config'
-            config_dir.mkdir(parents=True, exist_ok=True)
+            self.key_file.parent.mkdir(parents=True, exist_ok=True)
             
             key_data = {
                 'key': base64.b64encode(self.master_key).decode('utf-8'),
                 'algorithm': 'AES-256-GCM',
                 'note': 'IntelliVault master encryption key - KEEP SECURE!'
             }
+            if self._retired_keys:
+                # Kept until every record has been re-encrypted (see src/rotation.py)
+                key_data['previous_keys'] = [base64.b64encode(key).decode('utf-8')
+                                             for key in self._retired_keys]
             
-            key_file = config_dir / 'encryption_key.json'
-            with open(key_file, 'w') as f:
+            with open(self.key_file, 'w') as f:
                 json.dump(key_data, f, indent=2)
             
-            print(f"✓ Key saved to: {key_file.absolute()}")
-            print("⚠️  IMPORTANT: Add 'config/encryption_key.json' to .gitignore")
+            logger.info("✓ Key saved to: %s", self.key_file.absolute())
+            logger.warning("IMPORTANT: Add 'config/encryption_key.json' to .gitignore")
         except Exception as e:
-            print(f"⚠️  Could not save key: {e}")
+            logger.warning("Could not save key: %s", e)
+    
+    @property
+    def master_key(self) -> bytes:
+        return self._master_key
+    
+    @master_key.setter
+    def master_key(self, key: bytes):
+        # Replacing the key retires the old one: still accepted for decryption
+        previous = getattr(self, '_master_key', None)
+        if previous is not None and previous != key:
+            self.add_retired_key(previous)
+        self._master_key = key
+        self.key_id = key_id(key)
+        self._aead = AESGCM(key)
+        self._ciphers[self.key_id] = self._aead
+        self._data_keys = {}
+    
+    def rotate_master_key(self, new_key=None) -> str:
+        """
+        Make new_key (default: a fresh random key) the master key. The old key
+        is retired but still decrypts; the key file, if one is in use, is
+        rewritten with both. Returns the new key id.
+        """
+        self.master_key = new_key or get_random_bytes(32)
+        if self.key_file is not None:
+            self._save_key()
+        logger.info("✓ Rotated master key (now %s, %d retired)", self.key_id, len(self._retired_keys))
+        return self.key_id
+    
+    def add_retired_key(self, key: bytes):
+        """Accept records sealed with an older master key (decryption only)"""
+        if key in self._retired_keys:
+            return
+        self._retired_keys.append(key)
+        self._ciphers[key_id(key)] = AESGCM(key)
     
     def encrypt_vector(self, vector):
         """Encrypt a numpy embedding vector"""
         vector_bytes = vector.tobytes()
-        cipher = AES.new(self.master_key, AES.MODE_GCM)
-        ciphertext, tag = cipher.encrypt_and_digest(vector_bytes)
+        nonce = os.urandom(NONCE_BYTES)
+        sealed = self._aead.encrypt(nonce, vector_bytes, None)
         
         return {
-            'ciphertext': base64.b64encode(ciphertext).decode('utf-8'),
-            'nonce': base64.b64encode(cipher.nonce).decode('utf-8'),
-            'tag': base64.b64encode(tag).decode('utf-8'),
+            'ciphertext': base64.b64encode(sealed[:-TAG_BYTES]).decode('utf-8'),
+            'nonce': base64.b64encode(nonce).decode('utf-8'),
+            'tag': base64.b64encode(sealed[-TAG_BYTES:]).decode('utf-8'),
             'shape': vector.shape,
-            'dtype': str(vector.dtype)
+            'dtype': str(vector.dtype),
+            'key_id': self.key_id
         }
     
-    def decrypt_vector(self, encrypted_data):
-        """Decrypt an encrypted vector back to numpy array"""
-        ciphertext = base64.b64decode(encrypted_data['ciphertext'])
+    def encrypt_vectors(self, matrix):
+        """
+        Encrypt each row of a 2-D array as its own record (the batched
+        counterpart of encrypt_vector): one buffer copy and one urandom
+        call for the whole batch, then one AES-GCM seal per row.
+        """
+        matrix = np.ascontiguousarray(matrix)
+        if len(matrix) == 0:
+            return []
+        shape, dtype = matrix.shape[1:], str(matrix.dtype)
+        row_bytes = matrix[0].nbytes
+        data = memoryview(matrix.tobytes())
+        nonces = os.urandom(NONCE_BYTES * len(matrix))
+        seal, b64 = self._aead.encrypt, base64.b64encode
+        
+        records = []
+        for row in range(len(matrix)):
+            nonce = nonces[row * NONCE_BYTES:(row + 1) * NONCE_BYTES]
+            sealed = seal(nonce, data[row * row_bytes:(row + 1) * row_bytes], None)
+            records.append({
+                'ciphertext': b64(sealed[:-TAG_BYTES]).decode('utf-8'),
+                'nonce': b64(nonce).decode('utf-8'),
+                'tag': b64(sealed[-TAG_BYTES:]).decode('utf-8'),
+                'shape': shape,
+                'dtype': dtype,
+                'key_id': self.key_id
+            })
+        return records
+    
+    def _open(self, encrypted_data) -> bytes:
+        """Authenticated decryption with the key named by the record's key_id"""
         nonce = base64.b64decode(encrypted_data['nonce'])
-        tag = base64.b64decode(encrypted_data['tag'])
+        sealed = (base64.b64decode(encrypted_data['ciphertext'])
+                  + base64.b64decode(encrypted_data['tag']))
         
-        cipher = AES.new(self.master_key, AES.MODE_GCM, nonce=nonce)
-        vector_bytes = cipher.decrypt_and_verify(ciphertext, tag)
+        record_key = encrypted_data.get('key_id')
+        if record_key is not None:
+            cipher = self._ciphers.get(record_key)
+            if cipher is None:
+                raise KeyError(f"Record was encrypted with unknown key {record_key}")
+            return cipher.decrypt(nonce, sealed, None)
         
-        vector = np.frombuffer(vector_bytes, dtype=encrypted_data['dtype'])
+        # Untagged records predate key ids: current key first, then retired ones
+        try:
+            return self._aead.decrypt(nonce, sealed, None)
+        except InvalidTag:
+            for key in reversed(self._retired_keys):
+                try:
+                    return self._ciphers[key_id(key)].decrypt(nonce, sealed, None)
+                except InvalidTag:
+                    continue
+            raise
+    
+    def decrypt_vector(self, encrypted_data):
+        """Decrypt an encrypted vector back to numpy array"""
+        vector = np.frombuffer(self._open(encrypted_data), dtype=encrypted_data['dtype'])
         return vector.reshape(encrypted_data['shape'])
     
+    def needs_reencryption(self, encrypted_data) -> bool:
+        """True when the record was not sealed with the current key"""
+        return encrypted_data.get('key_id') != self.key_id
+    
+    def reencrypt(self, encrypted_data):
+        """Re-seal a record under the current key"""
+        return self.encrypt_vector(self.decrypt_vector(encrypted_data))
+    
+    def decrypt_vectors(self, encrypted_list):
+        """
+        Decrypt many encrypted vectors into one 2-D numpy array.
+        Reuses the cached AES-GCM contexts (each key schedule is computed
+        once) and writes straight into a preallocated matrix.
+        
+        Args:
+            encrypted_list: List of dicts produced by encrypt_vector
+            
+        Returns:
+            numpy array of shape (len(encrypted_list), dimension)
+        """
+        matrix = None
+        for row, encrypted_data in enumerate(encrypted_list):
+            values = np.frombuffer(self._open(encrypted_data), dtype=encrypted_data['dtype'])
+            
+            if matrix is None:
+                matrix = np.empty((len(encrypted_list), values.size), dtype=values.dtype)
+            matrix[row] = values
+        
+        if matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return matrix
+    
+    def derive_key(self, context: str) -> bytes:
+        """
+        Derive a 256-bit data key from the master key (HKDF-SHA256).
+        The same context always yields the same key.
+        """
+        return _hkdf(self.master_key, context)
+    
+    def data_key(self, context: str, legacy: bool = False) -> 'EncryptionManager':
+        """
+        EncryptionManager holding the data key derived for context.
+        Cached for data_key_ttl seconds, so the hot path is one dict lookup
+        and never touches the key file. The derived manager can also read
+        records sealed under keys derived from retired master keys, and
+        with legacy=True records sealed with the master keys themselves.
+        """
+        now = time.monotonic()
+        entry = self._data_keys.get(context)
+        if entry is None or entry[1] <= now:
+            with self._data_keys_lock:
+                entry = self._data_keys.get(context)
+                if entry is None or entry[1] <= now:
+                    manager = EncryptionManager(
+                        master_key=self.derive_key(context),
+                        previous_keys=[_hkdf(key, context) for key in self._retired_keys],
+                        data_key_ttl=self.data_key_ttl)
+                    if legacy:
+                        for key in [self.master_key] + self._retired_keys:
+                            manager.add_retired_key(key)
+                    entry = (manager, now + self.data_key_ttl)
+                    self._data_keys[context] = entry
+        return entry[0]
+    
+    def for_collection(self, collection: str) -> 'EncryptionManager':
+        """
+        The collection's data key. It still opens records sealed with the
+        master key before collections had their own keys; a KeyRotationJob
+        with this manager re-seals them under the data key.
+        """
+        return self.data_key(f"collection:{collection}", legacy=True)
+    
+    def for_tenant(self, tenant: str) -> 'EncryptionManager':
+        """The tenant's data key"""
+        return self.data_key(f"tenant:{tenant}")
+    
     def get_key_base64(self):
         """Export key as base64 string for storage"""
         return base64.b64encode(self.master_key).decode('utf-8')
@@ -114,6 +323,9 @@ class EncryptionManager:
 
 
 if __name__ == "__main__":
+    from src.logging_config import configure_logging
+    configure_logging('cli')
+    
     print("="*70)
     print("TESTING ENCRYPTION MANAGER")
     print("="*70)
@@ -127,7 +339,7 @@ if __name__ == "__main__":
     print(f"\nCurrent directory: {current_path}")
     print(f"Project root: {project_root}")
     
-    key_file = project_root / 'config' / 'encryption_key.json'
+    key_file = Path(os.getenv(KEY_FILE_ENV) or project_root / 'config' / 'encryption_key.json')
     print(f"Key file path: {key_file}")
     print(f"Key file exists: {key_file.exists()}\n")
     
@@ -0,0 +1,88 @@
+"""
+Document-level aggregation of chunk results.
+
+A long document with many matching chunks would otherwise fill every
+top-k slot. group_scored() scores each document from its chunks in one
+streaming pass, keeping per document only running totals and a bounded
+heap of its best chunks, then selects the k best documents with a size-k
+heap; only those k documents' chunks are turned into result dicts.
+"""
+
+import heapq
+from typing import Callable, Dict, Iterable, List, Tuple
+
+AGGREGATES = ('max', 'sum', 'mean_top_n')
+
+def chunk_result(similarity: float, record: Dict) -> Dict:
+    """Result dict of a scored store record"""
+    return {
+        'id': record['id'],
+        'similarity': float(similarity),
+        'metadata': record['metadata'],
+        'content': record['metadata'].get('content', '')
+    }
+
+
+def group_by_document(results: Iterable[Dict], k: int, aggregate: str = 'max',
+                      chunks_per_doc: int = 3, top_n: int = 3) -> List[Dict]:
+    """Best k documents from chunk result dicts with 'id', 'similarity' and 'metadata' (see group_scored)"""
+    return group_scored(((result['similarity'], result) for result in results), k, aggregate=aggregate,
+                        chunks_per_doc=chunks_per_doc, top_n=top_n, as_result=lambda _, result: result)
+
+
+def group_scored(scored: Iterable[Tuple[float, Dict]], k: int, aggregate: str = 'max',
+                 chunks_per_doc: int = 3, top_n: int = 3,
+                 as_result: Callable[[float, Dict], Dict] = chunk_result) -> List[Dict]:
+    """
+    Best k documents from scored chunks (any order), consumed as a stream.
+    
+    Args:
+        scored: (similarity, record) pairs; records have 'id' and 'metadata' (doc_id)
+        aggregate: Document score: 'max' chunk, 'sum' of chunks, or
+                   'mean_top_n' of its top_n chunks
+        chunks_per_doc: Best chunks returned per document
+        as_result: Builds a returned chunk's dict (only called for those)
+    
+    Returns:
+        Up to k dicts, best first: the best chunk's id, metadata and content,
+        plus doc_id, similarity (the document score), chunks (its best
+        chunks, best first) and matched_chunks (how many chunks matched)
+    """
+    if aggregate not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate '{aggregate}' (choose from {', '.join(AGGREGATES)})")
+    keep = max(chunks_per_doc, top_n if aggregate == 'mean_top_n' else 1)
+    
+    # doc_id -> [sum, count, min-heap of (similarity, -arrival, record)]
+    documents = {}
+    for arrival, (similarity, record) in enumerate(scored):
+        doc_id = record['metadata'].get('doc_id', record['id'])
+        state = documents.get(doc_id)
+        if state is None:
+            state = documents[doc_id] = [0.0, 0, []]
+        state[0] += similarity
+        state[1] += 1
+        best = state[2]
+        if len(best) < keep:
+            heapq.heappush(best, (similarity, -arrival, record))
+        elif similarity > best[0][0]:
+            heapq.heapreplace(best, (similarity, -arrival, record))
+    
+    def score(state) -> float:
+        if aggregate == 'sum':
+            return state[0]
+        top = heapq.nlargest(top_n if aggregate == 'mean_top_n' else 1, state[2])
+        return sum(entry[0] for entry in top) / len(top)
+    
+    grouped = []
+    for doc_id, state in heapq.nlargest(k, documents.items(), key=lambda item: score(item[1])):
+        chunks = [as_result(entry[0], entry[2]) for entry in heapq.nlargest(chunks_per_doc, state[2])]
+        grouped.append({
+            'id': chunks[0]['id'],
+            'doc_id': doc_id,
+            'similarity': float(score(state)),
+            'metadata': chunks[0]['metadata'],
+            'content': chunks[0].get('content', chunks[0]['metadata'].get('content', '')),
+            'chunks': chunks,
+            'matched_chunks': state[1]
+        })
+    return grouped
@@ -1,20 +1,158 @@
-from pathlib import Path
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path, PurePosixPath
+from typing import List, Dict, Iterator, Optional, Tuple
+import json
+import queue
+import tarfile
+import threading
 import time
+import zipfile
+import zlib
+import numpy as np
+from src.metrics import Trace
+from src.reduction import load_stored_reducer
+from src.centroids import centroid_records
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+def document_id(name: str) -> str:
+    """
+    Record id prefix of a document named by a relative path (an archive
+    member or upload): the normalized path without its extension, so
+    a/report.txt and b/report.txt stay apart (report.txt -> report).
+    """
+    parts = [part for part in PurePosixPath(name.replace('\\', '/')).parts
+             if part not in ('/', '.', '..')]
+    if not parts:
+        raise ValueError(f"No document name in '{name}'")
+    parts[-1] = PurePosixPath(parts[-1]).stem
+    return '/'.join(parts)
+
+
+def _fingerprint(crc: int, size: int) -> str:
+    return f"crc32:{crc:08x}:{size}"
+
+
+def _zip_members(path, pattern: str, known: Dict[str, str], workers: int):
+    """
+    Zip members are compressed independently: decompress up to 2 * workers
+    ahead on a thread pool. Fingerprints come from the central directory,
+    so unchanged members are never read.
+    """
+    with zipfile.ZipFile(path) as archive, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='unzip') as pool:
+        window = deque()
+        for info in archive.infolist():
+            if info.is_dir() or not fnmatch(PurePosixPath(info.filename).name, pattern):
+                continue
+            fingerprint = _fingerprint(info.CRC, info.file_size)
+            unchanged = known.get(info.filename) == fingerprint
+            window.append((info.filename, fingerprint, None if unchanged else pool.submit(archive.read, info)))
+            if len(window) > 2 * workers:
+                name, fingerprint, future = window.popleft()
+                yield name, fingerprint, future and future.result()
+        while window:
+            name, fingerprint, future = window.popleft()
+            yield name, fingerprint, future and future.result()
+
+
+def _tar_members(path, pattern: str, known: Dict[str, str], depth: int):
+    """
+    A tar stream can only be read in order: one thread decompresses it
+    into a bounded queue while the caller embeds earlier members.
+    """
+    members = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                members.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def read():
+        try:
+            with tarfile.open(path, mode='r|*') as archive:
+                for member in archive:
+                    if stop.is_set():
+                        return
+                    if not member.isfile() or not fnmatch(PurePosixPath(member.name).name, pattern):
+                        continue
+                    data = archive.extractfile(member).read()
+                    fingerprint = _fingerprint(zlib.crc32(data), len(data))
+                    put((member.name, fingerprint, None if known.get(member.name) == fingerprint else data))
+            put(done)
+        except Exception as e:
+            put(e)
+    
+    threading.Thread(target=read, name='untar', daemon=True).start()
+    try:
+        while True:
+            item = members.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_archive(path, pattern: str = '*.txt', known: Optional[Dict[str, str]] = None,
+                 workers: int = 4) -> Iterator[Tuple[str, str, Optional[bytes]]]:
+    """
+    (member name, fingerprint, content) for each file of a zip or
+    tar(.gz/.bz2/.xz) archive whose base name matches pattern, read in
+    memory. content is None when the fingerprint equals known[name].
+    """
+    known = known or {}
+    if zipfile.is_zipfile(path):
+        return _zip_members(path, pattern, known, workers)
+    return _tar_members(path, pattern, known, 2 * workers)
+
 
 class DocumentIngestor:
     """Complete document ingestion pipeline"""
     
-    def __init__(self, encryption_manager, embedding_generator, db_client):
+    def __init__(self, encryption_manager, embedding_generator, db_client, reducer=None,
+                 dedup=None, centroids=None):
+        """
+        Args:
+            reducer: PCAReducer applied to embeddings before encryption.
+                     Defaults to the one stored with the collection, if any.
+            dedup: ChunkDeduplicator of the collection. Near-duplicate chunks
+                   are then not embedded but listed in the 'duplicates'
+                   metadata of the chunk they repeat. Every write to the
+                   collection must then go through this ingestor (or
+                   delete_chunks) to keep the index in step.
+            centroids: Store of the doc-level collection (see centroid_store).
+                       Each document's mean chunk embedding is written there
+                       too, for hierarchical queries, and follows re-ingestion
+                       and delete_chunks.
+        """
         self.enc = encryption_manager
         self.emb = embedding_generator
         self.db = db_client
+        self.reducer = reducer if reducer is not None else load_stored_reducer(db_client, encryption_manager)
+        self.dedup = dedup
+        self.centroids = centroids
         self.stats = {
             'documents_processed': 0,
             'chunks_created': 0,
-            'total_time': 0
+            'total_time': 0,
+            'duplicate_chunks': 0,
+            'embedding_seconds_saved': 0.0,
+            'bytes_saved': 0
         }
-        print("✓ Document Ingestor initialized")
+        self._embed_seconds = 0.0
+        self._embedded = 0
+        logger.info("✓ Document Ingestor initialized")
     
     def parse_document(self, file_path: str) -> Dict:
         """Parse document and extract text"""
@@ -40,77 +178,471 @@ class DocumentIngestor:
         """Process and ingest single document"""
         start_time = time.time()
         
-        print(f"\n[Processing] {Path(file_path).name}")
+        logger.info("[Processing] %s", Path(file_path).name)
         
-        # Parse
-        doc = self.parse_document(file_path)
-        print(f"  ✓ Parsed document ({len(doc['content'])} chars)")
+        with Trace('ingest') as trace:
+            # Parse
+            with trace.span('parse'):
+                doc = self.parse_document(file_path)
+            logger.debug("  ✓ Parsed document (%d chars)", len(doc['content']))
+            self._ingest([doc], trace, start_time)
+        return trace.timings
+    
+    def ingest_files(self, file_paths: List) -> int:
+        """
+        Ingest several documents as one run: their chunks are embedded in
+        one batch and stored in one write.
+        
+        Returns:
+            Number of chunks stored
+        """
+        start_time = time.time()
+        logger.info("[Processing] %d documents", len(file_paths))
+        with Trace('ingest') as trace:
+            with trace.span('parse'):
+                docs = [self.parse_document(path) for path in file_paths]
+            return self._ingest(docs, trace, start_time)
+    
+    def ingest_text(self, name: str, content: str) -> int:
+        """
+        Ingest a document already in memory (e.g. an upload).
         
+        Returns:
+            Number of chunks stored
+        """
+        start_time = time.time()
+        logger.info("[Processing] %s", name)
+        with Trace('ingest') as trace:
+            return self._ingest([{'id': document_id(name), 'content': content}], trace, start_time)
+    
+    def _ingest(self, docs: List[Dict], trace: Trace, start_time: float) -> int:
+        """Chunk, embed, encrypt and store parsed documents"""
         # Chunk
-        chunks = self.chunk_text(doc['content'])
-        print(f"  ✓ Created {len(chunks)} chunks")
+        with trace.span('chunk'):
+            chunked = [(doc, self.chunk_text(doc['content'])) for doc in docs]
+            chunks = [chunk for _, doc_chunks in chunked for chunk in doc_chunks]
+            chunk_ids = [f"{doc['id']}_chunk_{idx}" for doc, doc_chunks in chunked
+                         for idx in range(len(doc_chunks))]
+        logger.debug("  ✓ Created %d chunks", len(chunks))
+        
+        # Near-duplicates of an earlier chunk are stored as references to it
+        canonical = [None] * len(chunks)
+        stored = {}
+        if self.dedup is not None:
+            with trace.span('dedup'):
+                canonical, stored, listed_in = self._find_duplicates(chunk_ids, chunks)
+        unique = [chunk for chunk, original in zip(chunks, canonical) if original is None]
         
         # Generate embeddings
-        print(f"  → Generating embeddings...")
-        embeddings = self.emb.generate_batch_embeddings(chunks)
-        print(f"  ✓ Generated {len(embeddings)} embeddings")
+        with trace.span('embed'):
+            embeddings = self.emb.generate_batch_embeddings(unique) if unique else []
+        logger.debug("  ✓ Generated %d embeddings", len(embeddings))
+        if self.reducer is not None and unique:
+            with trace.span('reduce'):
+                embeddings = self.reducer.transform(embeddings)
         
         # Encrypt and prepare
-        print(f"  → Encrypting and storing...")
+        vectors = embeddings
         batch_docs = []
-        for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            chunk_id = f"{doc['id']}_chunk_{idx}"
-            encrypted_emb = self.enc.encrypt_vector(embedding)
-            
-            metadata = {
-                'doc_id': doc['id'],
-                'chunk_index': idx,
-                'total_chunks': len(chunks),
-                'content': chunk
-            }
-            
-            batch_docs.append({
-                'id': chunk_id,
-                'vector': encrypted_emb,
-                'metadata': metadata
-            })
+        references = {}
+        stale = []
+        with trace.span('encrypt'):
+            embeddings = iter(embeddings)
+            chunk_index = iter(range(len(chunks)))
+            for doc, doc_chunks in chunked:
+                for idx, chunk in enumerate(doc_chunks):
+                    position = next(chunk_index)
+                    if canonical[position] is not None:
+                        references.setdefault(canonical[position], []).append(
+                            {'id': chunk_ids[position], 'doc_id': doc['id'], 'chunk_index': idx,
+                             'total_chunks': len(doc_chunks), 'content': chunk})
+                        continue
+                    
+                    chunk_id = chunk_ids[position]
+                    encrypted_emb = self.enc.encrypt_vector(next(embeddings))
+                    
+                    metadata = {
+                        'doc_id': doc['id'],
+                        'chunk_index': idx,
+                        'total_chunks': len(doc_chunks),
+                        'content': chunk
+                    }
+                    
+                    batch_docs.append({
+                        'id': chunk_id,
+                        'vector': encrypted_emb,
+                        'metadata': metadata
+                    })
+            if self.dedup is not None:
+                batch_docs, stale = self._relink(batch_docs, chunk_ids, stored, references, listed_in)
         
         # Store
-        self.db.batch_insert(batch_docs)
+        with trace.span('store'):
+            try:
+                self.db.batch_insert(batch_docs)
+                if stale:
+                    self.db.delete(stale)
+            except Exception:
+                if self.dedup is not None:
+                    self.dedup.rollback()
+                raise
+        if self.dedup is not None:
+            self.dedup.commit()
+            self._count_savings(batch_docs, chunks, canonical, trace)
+        
+        # Document centroids, once the chunks they lead to are searchable
+        if self.centroids is not None and chunks:
+            with trace.span('centroids'):
+                self._store_centroids(chunked, chunk_ids, canonical, vectors, stored)
         
         elapsed = time.time() - start_time
-        self.stats['documents_processed'] += 1
+        self.stats['documents_processed'] += len(docs)
         self.stats['chunks_created'] += len(chunks)
         self.stats['total_time'] += elapsed
         
-        print(f"  ✓ Stored {len(batch_docs)} encrypted chunks ({elapsed:.2f}s)")
+        logger.info("  ✓ Stored %d encrypted chunks (%.2fs)", len(unique), elapsed)
+        return len(chunks)
+    
+    def _find_duplicates(self, chunk_ids: List[str], chunks: List[str]):
+        """
+        Canonical chunk id per chunk (None: embed it); the stored records the
+        run builds on: canonical chunks from earlier runs, canonicals listing
+        a rewritten chunk as their duplicate, and the rewritten chunks' own
+        records; and the ids of those listing canonicals. A chunk whose
+        canonical is no longer in the store is embedded after all.
+        """
+        new_ids = set(chunk_ids)
+        listed_in = {self.dedup.duplicate_of[chunk_id] for chunk_id in chunk_ids
+                     if chunk_id in self.dedup.duplicate_of} - new_ids
+        canonical = self.dedup.assign(chunk_ids, chunks)
+        earlier = sorted(({original for original in canonical if original is not None} | listed_in) - new_ids)
+        wanted = earlier + list(chunk_ids)
+        stored = {chunk_id: record for chunk_id, record in zip(wanted, self.db.get_many(wanted))
+                  if record is not None}
+        for position, original in enumerate(canonical):
+            if original is not None and original not in new_ids and original not in stored:
+                # Deleted behind the index's back: this chunk becomes canonical
+                self.dedup.remove([original])
+                self.dedup.add(chunk_ids[position], chunks[position])
+                canonical[position] = None
+        return canonical, stored, listed_in
+    
+    def _relink(self, batch_docs: List[Dict], chunk_ids: List[str], stored: Dict[str, Dict],
+                references: Dict[str, List[Dict]], listed_in: set) -> Tuple[List[Dict], List[str]]:
+        """
+        Keep 'duplicates' lists in step with a run that rewrites chunk_ids.
+        A rewritten chunk with unchanged text keeps the duplicates other
+        documents have of it; with new text, or when it is now a duplicate
+        itself (its old record must go), they are promoted instead.
+        
+        Returns:
+            (records to store, ids of stored records to delete)
+        """
+        rewritten = set(chunk_ids)
+        in_batch = {doc['id']: doc for doc in batch_docs}
+        promoted, stale = [], []
+        for chunk_id in chunk_ids:
+            old = stored.get(chunk_id)
+            if old is None:
+                continue
+            new = in_batch.get(chunk_id)
+            if new is None:
+                stale.append(chunk_id)
+            if new is not None and new['metadata']['content'] == old['metadata'].get('content'):
+                kept = [ref for ref in old['metadata'].get('duplicates', []) if ref['id'] not in rewritten]
+                if kept:
+                    new['metadata']['duplicates'] = kept
+            else:
+                promoted += self._promote(old, rewritten)
+        updated = self._attach_references(batch_docs, stored, references, rewritten, listed_in)
+        return batch_docs + promoted + updated, stale
     
-    def ingest_directory(self, directory: str, pattern: str = '*.txt'):
-        """Ingest all documents in directory"""
+    def _promote(self, record: Dict, excluded: set) -> List[Dict]:
+        """
+        Records for the duplicates a rewritten or deleted canonical chunk
+        lists (bar excluded ids): the first becomes canonical, keeping the
+        vector they were all found by, and lists the rest.
+        """
+        refs = [ref for ref in record['metadata'].get('duplicates', []) if ref['id'] not in excluded]
+        if not refs:
+            return []
+        first, rest = refs[0], refs[1:]
+        metadata = {key: value for key, value in first.items() if key != 'id'}
+        # Refs stored before they carried their text fall back to the canonical's
+        metadata.setdefault('content', record['metadata'].get('content', ''))
+        if rest:
+            metadata['duplicates'] = rest
+        self.dedup.add(first['id'], metadata['content'])
+        for ref in rest:
+            self.dedup.link(ref['id'], first['id'])
+        return [{'id': first['id'], 'vector': record['vector'], 'metadata': metadata}]
+    
+    def _attach_references(self, batch_docs: List[Dict], stored: Dict[str, Dict],
+                           references: Dict[str, List[Dict]], rewritten: set,
+                           listed_in: set) -> List[Dict]:
+        """
+        Record duplicates in their canonical chunk's metadata, so search
+        returns one result listing them; refs to chunks rewritten or deleted
+        now are dropped first. Returns the stored canonical records that
+        must be rewritten.
+        """
+        in_batch = {doc['id']: doc for doc in batch_docs}
+        updated = []
+        for canonical_id in sorted(set(references) | listed_in):
+            record = in_batch.get(canonical_id)
+            if record is None:
+                if canonical_id not in stored:
+                    continue
+                record = dict(stored[canonical_id])
+                record['metadata'] = dict(record['metadata'])
+                updated.append(record)
+            duplicates = [ref for ref in record['metadata'].get('duplicates', [])
+                          if ref['id'] not in rewritten] + references.get(canonical_id, [])
+            if duplicates:
+                record['metadata']['duplicates'] = duplicates
+            else:
+                record['metadata'].pop('duplicates', None)
+        return updated
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """
+        Delete chunks from the store, and from the dedup index if there is
+        one: duplicates a deleted chunk listed are promoted, and deleted
+        duplicates leave their canonical's list. The centroids of the
+        documents they belonged to are recomputed, or dropped with their
+        last chunk.
+        """
+        if self.dedup is None:
+            deleted = self.db.delete(chunk_ids)
+        else:
+            deleted = self._delete_deduplicated(chunk_ids)
+        if self.centroids is not None:
+            self._refresh_centroids(chunk_ids)
+        return deleted
+    
+    def _delete_deduplicated(self, chunk_ids: List[str]) -> int:
+        doomed = set(chunk_ids)
+        listed_in = {self.dedup.duplicate_of[chunk_id] for chunk_id in chunk_ids
+                     if chunk_id in self.dedup.duplicate_of} - doomed
+        wanted = list(chunk_ids) + sorted(listed_in)
+        stored = {chunk_id: record for chunk_id, record in zip(wanted, self.db.get_many(wanted))
+                  if record is not None}
+        
+        self.dedup.remove(chunk_ids)
+        records = [promoted for chunk_id in chunk_ids if chunk_id in stored
+                   for promoted in self._promote(stored[chunk_id], doomed)]
+        records += self._attach_references([], stored, {}, doomed, listed_in)
+        try:
+            if records:
+                self.db.upsert(records)
+            deleted = self.db.delete(list(chunk_ids))
+        except Exception:
+            self.dedup.rollback()
+            raise
+        self.dedup.commit()
+        return deleted
+    
+    def _store_centroids(self, chunked: List[Tuple[Dict, List[str]]], chunk_ids: List[str],
+                         canonical: List, vectors, stored_canonicals: Dict[str, Dict]):
+        """Store each document's mean chunk embedding; a duplicate counts with its canonical's vector"""
+        embedded = [chunk_id for chunk_id, original in zip(chunk_ids, canonical) if original is None]
+        by_id = dict(zip(embedded, vectors))
+        earlier = sorted({original for original in canonical if original is not None and original not in by_id})
+        if earlier:
+            by_id.update(zip(earlier, self.enc.decrypt_vectors(
+                [stored_canonicals[chunk_id]['vector'] for chunk_id in earlier])))
+        rows = np.stack([by_id[original or chunk_id] for chunk_id, original in zip(chunk_ids, canonical)])
+        
+        if self.centroids.stats() is None:
+            self.centroids.create_collection(dimension=rows.shape[1])
+        self.centroids.upsert(centroid_records(self.enc, [doc['id'] for doc, _ in chunked], rows,
+                                               [len(doc_chunks) for _, doc_chunks in chunked]))
+    
+    def _refresh_centroids(self, chunk_ids: List[str]):
+        """
+        Recompute the centroid of each document that lost some of its
+        current chunks from the ones it still has (a duplicate counts with
+        its canonical's vector); drop it when none are left. Chunks past a
+        document's length belong to an older, longer version and change
+        nothing.
+        """
+        lost = {}
+        for chunk_id in chunk_ids:
+            doc_id, _, index = chunk_id.rpartition('_chunk_')
+            if doc_id and index.isdigit():
+                lost.setdefault(doc_id, set()).add(int(index))
+        doc_ids = sorted(lost)
+        current = {doc_id: record['metadata']['chunks'] for doc_id, record
+                   in zip(doc_ids, self.centroids.get_many(doc_ids)) if record is not None}
+        remaining = {doc_id: [f"{doc_id}_chunk_{i}" for i in range(n) if i not in lost[doc_id]]
+                     for doc_id, n in current.items() if min(lost[doc_id]) < n}
+        if not remaining:
+            return
+        
+        wanted = [chunk_id for ids in remaining.values() for chunk_id in ids]
+        stored = {chunk_id: record for chunk_id, record in zip(wanted, self.db.get_many(wanted))
+                  if record is not None}
+        duplicate_of = self.dedup.duplicate_of if self.dedup is not None else {}
+        canonicals = sorted({duplicate_of[chunk_id] for chunk_id in wanted
+                             if chunk_id not in stored and chunk_id in duplicate_of} - stored.keys())
+        stored.update((chunk_id, record) for chunk_id, record in zip(canonicals, self.db.get_many(canonicals))
+                      if record is not None)
+        
+        refreshed, emptied = [], []
+        for doc_id, ids in remaining.items():
+            found = [stored.get(chunk_id) or stored.get(duplicate_of.get(chunk_id)) for chunk_id in ids]
+            vectors = [record['vector'] for record in found if record is not None]
+            if not vectors:
+                emptied.append(doc_id)
+                continue
+            centroid = np.mean(self.enc.decrypt_vectors(vectors), axis=0)
+            refreshed.append({'id': doc_id, 'vector': self.enc.encrypt_vector(centroid),
+                              'metadata': {'doc_id': doc_id, 'chunks': current[doc_id]}})
+        if refreshed:
+            self.centroids.upsert(refreshed)
+        if emptied:
+            self.centroids.delete(emptied)
+    
+    def _count_savings(self, batch_docs: List[Dict], chunks: List[str], canonical: List, trace: Trace):
+        """Price skipped chunks at the mean embedding time per chunk and their vector size (refs keep the text)"""
+        duplicates = [chunk for chunk, original in zip(chunks, canonical) if original is not None]
+        if len(duplicates) < len(chunks):
+            self._embed_seconds += trace.timings.get('embed', 0.0) / 1000
+            self._embedded += len(chunks) - len(duplicates)
+        if not duplicates:
+            return
+        
+        vector = batch_docs[0]['vector']
+        vector_bytes = len(vector['ciphertext']) + len(vector['nonce']) + len(vector['tag'])
+        self.stats['duplicate_chunks'] += len(duplicates)
+        if self._embedded:
+            self.stats['embedding_seconds_saved'] += self._embed_seconds / self._embedded * len(duplicates)
+        self.stats['bytes_saved'] += vector_bytes * len(duplicates)
+    
+    def ingest_archive(self, archive_path, pattern: str = '*.txt',
+                       state_path: Optional[str] = None, workers: int = 4) -> Dict:
+        """
+        Ingest matching members of a zip or tar(.gz) archive without
+        extracting it: members are decompressed in memory on worker threads
+        while earlier ones are embedded.
+        
+        Args:
+            state_path: JSON file of member fingerprints (CRC32 and size) from
+                        earlier runs. Unchanged members are skipped (in a zip,
+                        without being decompressed); a changed member replaces
+                        its previous chunks.
+            workers: Zip members decompressed concurrently
+        
+        Returns:
+            Counts: ingested, unchanged, failed
+        """
+        state = {}
+        if state_path and Path(state_path).exists():
+            with open(state_path) as f:
+                state = json.load(f)
+        known = {name: entry['fingerprint'] for name, entry in state.items()}
+        counts = {'ingested': 0, 'unchanged': 0, 'failed': 0}
+        
+        logger.info("Ingesting %s", archive_path)
+        for name, fingerprint, data in iter_archive(archive_path, pattern, known, workers):
+            if data is None:
+                counts['unchanged'] += 1
+                continue
+            try:
+                chunks = self.ingest_text(name, data.decode('utf-8'))
+            except Exception:
+                logger.exception("Error ingesting %s from %s", name, archive_path)
+                counts['failed'] += 1
+                continue
+            
+            # A shorter new version leaves chunks of the old one behind (all
+            # of them if its id changed: states from before ids kept the path)
+            doc_id = document_id(name)
+            previous = state.get(name, {})
+            old_id = previous.get('doc_id', Path(name).stem)
+            stale = range(chunks if old_id == doc_id else 0, previous.get('chunks', 0))
+            if stale:
+                self.delete_chunks([f"{old_id}_chunk_{i}" for i in stale])
+            state[name] = {'fingerprint': fingerprint, 'chunks': chunks, 'doc_id': doc_id}
+            counts['ingested'] += 1
+            if state_path and counts['ingested'] % 100 == 0:
+                self._save_state(state_path, state)
+        
+        if state_path:
+            self._save_state(state_path, state)
+        logger.info("✓ %s: %d ingested, %d unchanged, %d failed", Path(archive_path).name,
+                    counts['ingested'], counts['unchanged'], counts['failed'])
+        return counts
+    
+    def _save_state(self, state_path: str, state: Dict):
+        path = Path(state_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        tmp_path.replace(path)
+    
+    def fit_reducer(self, files: List, dimension: int, sample_size: int = 2000,
+                    seed: int = 0):
+        """
+        Fit a PCA reducer on chunk embeddings from a random sample of files
+        and store it (encrypted) with the collection.
+        """
+        from src.reduction import PCAReducer
+        
+        order = np.random.default_rng(seed).permutation(len(files))
+        sample = []
+        for i in order:
+            sample.extend(self.chunk_text(self.parse_document(files[i])['content']))
+            if len(sample) >= sample_size:
+                break
+        
+        embeddings = self.emb.generate_batch_embeddings(sample[:sample_size])
+        self.reducer = PCAReducer.fit(embeddings, dimension, sample_size=sample_size, seed=seed)
+        self.db.save_reducer(self.reducer.to_encrypted(self.enc))
+        logger.info("✓ Fitted PCA %d → %d dims on %d chunks (%.1f%% variance retained)",
+                    self.reducer.input_dimension, dimension, len(embeddings),
+                    100 * self.reducer.retained_variance)
+        return self.reducer
+    
+    def ingest_directory(self, directory: str, pattern: str = '*.txt',
+                         reduce_to: Optional[int] = None):
+        """
+        Ingest all documents in directory.
+        
+        Args:
+            reduce_to: Store vectors reduced to this many dimensions. The PCA
+                       is fitted on a sample first unless one is already set.
+        """
         files = list(Path(directory).glob(pattern))
         
-        print("="*70)
-        print(f"Found {len(files)} files to process in {directory}")
-        print("="*70)
+        logger.info("="*70)
+        logger.info("Found %d files to process in %s", len(files), directory)
+        logger.info("="*70)
         
         if len(files) == 0:
-            print(f"\n⚠️  No {pattern} files found in {directory}")
-            print(f"Make sure you have .txt files in that directory!")
+            logger.warning("No %s files found in %s", pattern, directory)
+            logger.warning("Make sure you have .txt files in that directory!")
             return
         
+        if reduce_to and self.reducer is None:
+            self.fit_reducer(files, reduce_to)
+        
         for i, file_path in enumerate(files, 1):
-            print(f"\n[{i}/{len(files)}]", end=' ')
+            logger.info("[%d/%d]", i, len(files))
             try:
                 self.ingest_document(str(file_path))
-            except Exception as e:
-                print(f"✗ Error: {e}")
-                import traceback
-                traceback.print_exc()
-        
-        print(f"\n{'='*70}")
-        print(f"INGESTION COMPLETE")
-        print(f"{'='*70}")
-        print(f"Documents processed: {self.stats['documents_processed']}")
-        print(f"Chunks created: {self.stats['chunks_created']}")
-        print(f"Total time: {self.stats['total_time']:.2f}s")
-        print(f"{'='*70}")
+            except Exception:
+                logger.exception("Error ingesting %s", file_path)
+        
+        logger.info("="*70)
+        logger.info("INGESTION COMPLETE")
+        logger.info("="*70)
+        logger.info("Documents processed: %d", self.stats['documents_processed'])
+        logger.info("Chunks created: %d", self.stats['chunks_created'])
+        if self.dedup is not None:
+            logger.info("Near-duplicate chunks: %d (saved ~%.1fs of embedding, %.1f KB)",
+                        self.stats['duplicate_chunks'], self.stats['embedding_seconds_saved'],
+                        self.stats['bytes_saved'] / 1024)
+        logger.info("Total time: %.2fs", self.stats['total_time'])
+        logger.info("="*70)
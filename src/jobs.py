@@ -0,0 +1,296 @@
+"""
+Persistent ingestion job queue.
+
+Uploads are written to a local SQLite database and acknowledged at once;
+IngestionWorkers embed and store them in the background. A job holds one
+or more documents and reports per-document progress. Several processes
+may share the database: a claimed document is leased to its queue, which
+renews the lease while ingesting, and is only reclaimed by another queue
+once that lease has expired (so work a crash interrupted is picked up
+again, but never work a live worker is still ingesting).
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from src.metrics import REGISTRY
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+QUEUE_DEPTH_METRIC = "intellivault_ingest_queue_depth"
+INGESTED_METRIC = "intellivault_ingest_documents_total"
+REGISTRY.describe(QUEUE_DEPTH_METRIC, "Documents waiting in the ingestion queue")
+REGISTRY.describe(INGESTED_METRIC, "Queued documents ingested, by outcome")
+
+DEFAULT_QUEUE_PATH = 'data/jobs.db'
+DEFAULT_LEASE = 60.0  # seconds a claimed document stays reserved without a renewal
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tenant TEXT,
+    created REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    content BLOB,
+    status TEXT NOT NULL DEFAULT 'queued',
+    chunks INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    finished REAL,
+    owner TEXT,
+    claimed_at REAL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS documents_by_status ON documents (status, finished);
+"""
+
+class QueueFull(Exception):
+    """The queue is at capacity; retry after retry_after seconds"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__(f"Ingestion queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """SQLite-backed queue of documents to ingest, grouped into jobs"""
+    
+    def __init__(self, path: Union[str, Path] = DEFAULT_QUEUE_PATH, max_pending: int = 1000,
+                 lease: float = DEFAULT_LEASE):
+        """
+        Args:
+            path: SQLite database file
+            max_pending: Queued documents beyond which enqueue() raises QueueFull
+            lease: Seconds a claimed document stays reserved to this queue
+                   without a renew(); other queues reclaim it after that
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_pending = max_pending
+        self.lease = lease
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.wakeup = threading.Condition()
+        self.enqueued = 0  # bumped under wakeup so idle workers never miss new work
+        
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            # Queues created before claims were leased
+            columns = {row[1] for row in db.execute("PRAGMA table_info(documents)")}
+            for column, kind in (('owner', 'TEXT'), ('claimed_at', 'REAL')):
+                if column not in columns:
+                    db.execute(f"ALTER TABLE documents ADD COLUMN {column} {kind}")
+        self._report_depth()
+    
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("PRAGMA synchronous=FULL")
+            yield db
+        finally:
+            db.close()
+    
+    def pending(self) -> int:
+        """Documents queued or being ingested"""
+        with self._connect() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM documents WHERE status IN ('queued', 'running')").fetchone()[0]
+    
+    def enqueue(self, documents: List[Tuple[str, bytes]], tenant: Optional[str] = None) -> str:
+        """
+        Queue (name, content) documents as one job; durable on return.
+        
+        Raises:
+            QueueFull: Accepting them would exceed max_pending
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                pending = db.execute(
+                    "SELECT COUNT(*) FROM documents WHERE status IN ('queued', 'running')").fetchone()[0]
+                # An empty queue takes any job, so an oversized upload is not refused forever
+                if pending and pending + len(documents) > self.max_pending:
+                    raise QueueFull(self._retry_after(db, pending + len(documents) - self.max_pending, now))
+                db.execute("INSERT INTO jobs (id, tenant, created) VALUES (?, ?, ?)", (job_id, tenant, now))
+                db.executemany("INSERT INTO documents (job_id, seq, name, content) VALUES (?, ?, ?, ?)",
+                               [(job_id, seq, name, content) for seq, (name, content) in enumerate(documents)])
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        
+        self._report_depth(pending + len(documents))
+        with self.wakeup:
+            self.enqueued += 1
+            self.wakeup.notify_all()
+        return job_id
+    
+    def _retry_after(self, db, excess: int, now: float) -> int:
+        """Seconds until the workers should have drained the excess"""
+        recent = db.execute("SELECT COUNT(*) FROM documents WHERE finished > ?", (now - 60,)).fetchone()[0]
+        if not recent:
+            return 5
+        return min(60, max(1, math.ceil(excess / (recent / 60))))
+    
+    def claim(self) -> Optional[Dict]:
+        """
+        Lease the oldest queued document (or one whose lease expired, its
+        worker having died) to this queue and return it (None if idle).
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT d.job_id, d.seq, d.name, d.content, j.tenant, d.owner FROM documents d "
+                "JOIN jobs j ON j.id = d.job_id WHERE d.status = 'queued' OR (d.status = 'running' "
+                "AND (d.claimed_at IS NULL OR d.claimed_at < ?)) "
+                "ORDER BY j.created, d.seq LIMIT 1", (now - self.lease,)).fetchone()
+            if row is not None:
+                db.execute("UPDATE documents SET status = 'running', owner = ?, claimed_at = ? "
+                           "WHERE job_id = ? AND seq = ?", (self.owner, now, *row[:2]))
+            db.execute("COMMIT")
+        if row is None:
+            return None
+        if row[5] is not None:
+            logger.info("Reclaimed %s (job %s) from %s after its lease expired", row[2], row[0], row[5])
+        return dict(zip(('job_id', 'seq', 'name', 'content', 'tenant'), row))
+    
+    def renew(self) -> int:
+        """Extend the lease on every document this queue is ingesting; returns how many"""
+        with self._connect() as db:
+            return db.execute("UPDATE documents SET claimed_at = ? WHERE status = 'running' AND owner = ?",
+                              (time.time(), self.owner)).rowcount
+    
+    def finish(self, document: Dict, chunks: int = 0, error: Optional[str] = None):
+        """Record the outcome of a claimed document, dropping its content"""
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            recorded = db.execute(
+                "UPDATE documents SET status = ?, chunks = ?, error = ?, content = NULL, finished = ? "
+                "WHERE job_id = ? AND seq = ? AND status = 'running' AND owner = ?",
+                ('failed' if error else 'done', chunks, error, now, document['job_id'], document['seq'],
+                 self.owner)).rowcount
+            if not recorded:
+                # The lease lapsed and another queue reclaimed the document; its outcome stands
+                db.execute("COMMIT")
+                logger.warning("%s (job %s) was reclaimed by another worker; result dropped",
+                               document['name'], document['job_id'])
+                return
+            db.execute(
+                "UPDATE jobs SET finished = ? WHERE id = ? AND NOT EXISTS (SELECT 1 FROM documents "
+                "WHERE job_id = ? AND status IN ('queued', 'running'))",
+                (now, document['job_id'], document['job_id']))
+            db.execute("COMMIT")
+        REGISTRY.inc(INGESTED_METRIC, outcome='failed' if error else 'done')
+        self._report_depth()
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Progress of a job, or None if unknown"""
+        with self._connect() as db:
+            job = db.execute("SELECT tenant, created, finished FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            documents = db.execute(
+                "SELECT name, status, chunks, error FROM documents WHERE job_id = ? ORDER BY seq",
+                (job_id,)).fetchall()
+        
+        counts = {status: 0 for status in ('queued', 'running', 'done', 'failed')}
+        for _, status, _, _ in documents:
+            counts[status] += 1
+        if job[2] is not None:
+            status = 'failed' if counts['failed'] else 'done'
+        else:
+            status = 'running' if counts['running'] or counts['done'] or counts['failed'] else 'queued'
+        
+        return {
+            'id': job_id,
+            'status': status,
+            'tenant': job[0],
+            'created': job[1],
+            'finished': job[2],
+            'documents': len(documents),
+            **counts,
+            'chunks': sum(chunks for _, _, chunks, _ in documents),
+            'errors': [{'name': name, 'error': error} for name, _, _, error in documents if error]
+        }
+    
+    def _report_depth(self, depth: Optional[int] = None):
+        REGISTRY.set(QUEUE_DEPTH_METRIC, self.pending() if depth is None else depth)
+
+
+class IngestionWorkers:
+    """Background threads draining a JobQueue"""
+    
+    def __init__(self, job_queue: JobQueue, ingest: Callable[[str, str, Optional[str]], int],
+                 workers: int = 2, poll_interval: float = 5.0):
+        """
+        Args:
+            job_queue: Queue to drain
+            ingest: (name, text, tenant) -> chunks stored
+            workers: Documents ingested concurrently
+            poll_interval: Idle re-check period (for work queued by other processes)
+        """
+        self.queue = job_queue
+        self.ingest = ingest
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self.threads = [threading.Thread(target=self._run, name=f"ingest-{i}", daemon=True)
+                        for i in range(workers)]
+        self.heartbeat = threading.Thread(target=self._renew_leases, name='ingest-heartbeat', daemon=True)
+    
+    def start(self) -> 'IngestionWorkers':
+        for thread in self.threads:
+            thread.start()
+        self.heartbeat.start()
+        return self
+    
+    def stop(self, timeout: Optional[float] = None):
+        """Stop after the documents in progress; unstarted work stays queued"""
+        self.stop_event.set()
+        with self.queue.wakeup:
+            self.queue.wakeup.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.heartbeat.join(timeout)
+    
+    def _renew_leases(self):
+        """Keep the documents in progress leased to this process"""
+        while not self.stop_event.wait(self.queue.lease / 3):
+            try:
+                self.queue.renew()
+            except sqlite3.Error:
+                logger.exception("Could not renew ingestion leases")
+    
+    def _run(self):
+        while not self.stop_event.is_set():
+            seen = self.queue.enqueued
+            document = self.queue.claim()
+            if document is None:
+                with self.queue.wakeup:
+                    if not self.stop_event.is_set() and self.queue.enqueued == seen:
+                        self.queue.wakeup.wait(self.poll_interval)
+                continue
+            
+            try:
+                text = document['content'].decode('utf-8')
+                chunks = self.ingest(document['name'], text, document['tenant'])
+            except Exception as e:
+                logger.exception("Error ingesting %s (job %s)", document['name'], document['job_id'])
+                self.queue.finish(document, error=str(e) or type(e).__name__)
+            else:
+                self.queue.finish(document, chunks=chunks)
@@ -0,0 +1,181 @@
+"""
+Load-testing helpers: synthetic corpora, open-loop load generation,
+latency histograms and recall measurement.
+"""
+
+import os
+import random
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+import numpy as np
+
+PERCENTILES = {'p50': 50, 'p95': 95, 'p99': 99, 'p999': 99.9}
+
+class SyntheticCorpus:
+    """
+    Clustered random embeddings with template text, sized like a real corpus.
+    Vectors are unit-normalized float32 so cosine similarity is a dot product.
+    """
+    
+    def __init__(self, num_chunks: int, dimension: int = 384, num_topics: int = 64,
+                 chunks_per_doc: int = 4, seed: int = 0):
+        from generate_large_dataset import categories, generate_document
+        
+        rng = np.random.default_rng(seed)
+        random.seed(seed)
+        self.dimension = dimension
+        self.centers = rng.standard_normal((num_topics, dimension)).astype(np.float32)
+        self.topics = rng.integers(0, num_topics, num_chunks)
+        
+        vectors = self.centers[self.topics] + 0.6 * rng.standard_normal(
+            (num_chunks, dimension), dtype=np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+        # A handful of template documents, reused across chunks to keep generation cheap
+        doc_types = [(c, t) for c, types in categories.items() for t in types]
+        self.templates = [generate_document(c, t, i) for i, (c, t) in enumerate(doc_types)]
+        self.ids = [f"doc_{i // chunks_per_doc}_chunk_{i % chunks_per_doc}"
+                    for i in range(num_chunks)]
+        self.chunks_per_doc = chunks_per_doc
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def documents(self, enc, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        """Encrypted records for chunks[start:stop], in the ingestion format"""
+        stop = len(self) if stop is None else stop
+        return [{
+            'id': self.ids[i],
+            'vector': enc.encrypt_vector(self.vectors[i]),
+            'metadata': {
+                'doc_id': self.ids[i].rsplit('_chunk_', 1)[0],
+                'chunk_index': i % self.chunks_per_doc,
+                'total_chunks': self.chunks_per_doc,
+                'content': self.templates[i % len(self.templates)]
+            }
+        } for i in range(start, stop)]
+    
+    def queries(self, num_queries: int, noise: float = 0.3, seed: int = 1) -> np.ndarray:
+        """Query vectors near randomly chosen topic centers"""
+        rng = np.random.default_rng(seed)
+        picks = rng.integers(0, len(self.centers), num_queries)
+        queries = self.centers[picks] + noise * rng.standard_normal(
+            (num_queries, self.dimension), dtype=np.float32)
+        return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    
+    def exact_top_k(self, query: np.ndarray, k: int) -> List[str]:
+        """Ground-truth ids by brute-force cosine similarity"""
+        scores = self.vectors @ query
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        return [self.ids[i] for i in top[np.argsort(-scores[top])]]
+
+
+class LookupEmbedder:
+    """Embedder for synthetic queries: maps query text to a precomputed vector"""
+    
+    def __init__(self, queries: np.ndarray):
+        self.table = {self.text(i): q for i, q in enumerate(queries)}
+    
+    @staticmethod
+    def text(i: int) -> str:
+        return f"synthetic query {i}"
+    
+    def generate_embedding(self, text):
+        return self.table[text]
+    
+    def get_dimension(self):
+        return len(next(iter(self.table.values())))
+
+
+class LatencyRecorder:
+    """Thread-safe collection of request latencies and errors"""
+    
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.lock = threading.Lock()
+    
+    def record(self, seconds: float, ok: bool = True):
+        with self.lock:
+            self.latencies.append(seconds)
+            if not ok:
+                self.errors += 1
+    
+    def summary(self, wall_seconds: float) -> Dict[str, Any]:
+        latencies = np.array(self.latencies) * 1000
+        result = {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'throughput_qps': len(latencies) / wall_seconds if wall_seconds else 0.0,
+        }
+        if len(latencies):
+            result['latency_ms'] = {name: float(np.percentile(latencies, p))
+                                    for name, p in PERCENTILES.items()}
+            result['latency_ms']['mean'] = float(latencies.mean())
+            result['latency_ms']['max'] = float(latencies.max())
+            result['histogram'] = latency_histogram(latencies)
+        return result
+
+
+def latency_histogram(latencies_ms: np.ndarray, buckets_per_decade: int = 5) -> Dict[str, int]:
+    """Log-spaced histogram of latencies: {upper bound in ms: count}"""
+    edges = np.logspace(-2, 5, 7 * buckets_per_decade + 1)
+    counts, _ = np.histogram(latencies_ms, bins=np.concatenate([[0.0], edges]))
+    return {f"{edge:.3g}": int(c) for edge, c in zip(edges, counts) if c}
+
+
+def run_open_loop(request: Callable[[int], Any], qps: float, duration: float,
+                  max_workers: int = 64) -> Dict[str, Any]:
+    """
+    Drive request(i) at a fixed arrival rate regardless of how fast responses
+    come back (open loop). Latency is measured from the scheduled arrival
+    time, so queueing delay under overload is included rather than hidden.
+    """
+    recorder = LatencyRecorder()
+    total = max(1, int(qps * duration))
+    interval = 1.0 / qps
+    
+    def timed(i, scheduled):
+        ok = True
+        try:
+            request(i)
+        except Exception:
+            ok = False
+        recorder.record(time.perf_counter() - scheduled, ok)
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(timed, i, scheduled)
+    wall = time.perf_counter() - start
+    
+    result = recorder.summary(wall)
+    result['target_qps'] = qps
+    result['duration_s'] = wall
+    return result
+
+
+def recall_at_k(retrieved: List[str], exact: List[str]) -> float:
+    """Fraction of the exact top-k that was retrieved"""
+    if not exact:
+        return 1.0
+    return len(set(retrieved) & set(exact)) / len(exact)
+
+
+def memory_usage_mb() -> Dict[str, float]:
+    """Current and peak resident set size of this process"""
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    current = 0.0
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        pass
+    return {'rss_mb': current, 'peak_rss_mb': peak_kb / 1024}
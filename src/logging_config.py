@@ -0,0 +1,128 @@
+"""
+Central logging setup for IntelliVault.
+
+Library code logs through get_logger() instead of printing, so nothing
+writes to the console on the query path unless asked to. Scripts call
+configure_logging('cli') for plain console output; the API server calls
+configure_logging('server'), which hands records to a background thread
+through a QueueHandler so request threads never block on I/O.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Optional
+
+ROOT_LOGGER = "intellivault"
+SERVER_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Embedding batches smaller than this run without a tqdm progress bar
+PROGRESS_BAR_MIN_ITEMS = 256
+
+# Defaults for the fraction of queries that get a per-query log line
+QUERY_SAMPLE_RATES = {'cli': 1.0, 'server': 0.01}
+
+_query_sample_rate = 1.0
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class CliFormatter(logging.Formatter):
+    """Bare messages, with the warning/error markers the scripts always used"""
+    
+    PREFIXES = {logging.WARNING: "⚠️  ", logging.ERROR: "✗ ", logging.CRITICAL: "✗ "}
+    
+    def format(self, record):
+        message = super().format(record)
+        return self.PREFIXES.get(record.levelno, "") + message
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the intellivault namespace, e.g. get_logger(__name__)"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name.rsplit('.', 1)[-1]}")
+
+
+def configure_logging(mode: str = 'cli', level: Optional[str] = None,
+                      log_file: Optional[str] = None,
+                      query_sample_rate: Optional[float] = None):
+    """
+    Configure the intellivault loggers. Safe to call more than once.
+    
+    Args:
+        mode: 'cli' (synchronous, plain messages on stdout) or
+              'server' (timestamped, queued to a background writer on stderr)
+        level: Log level name; defaults to $INTELLIVAULT_LOG_LEVEL, then INFO
+        log_file: Also write to this file (server mode)
+        query_sample_rate: Fraction of queries logged individually; defaults to
+                           $INTELLIVAULT_QUERY_LOG_SAMPLE, then 1.0 (cli) / 0.01 (server)
+    """
+    global _query_sample_rate, _listener
+    if mode not in QUERY_SAMPLE_RATES:
+        raise ValueError(f"Unknown logging mode '{mode}' (choose from cli, server)")
+    
+    root = logging.getLogger(ROOT_LOGGER)
+    _stop_listener()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel((level or os.getenv('INTELLIVAULT_LOG_LEVEL', 'INFO')).upper())
+    root.propagate = False
+    
+    if mode == 'cli':
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(CliFormatter())
+        root.addHandler(handler)
+    else:
+        handlers = [logging.StreamHandler(sys.stderr)]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(logging.Formatter(SERVER_FORMAT))
+        
+        records = queue.SimpleQueue()
+        root.addHandler(logging.handlers.QueueHandler(records))
+        _listener = logging.handlers.QueueListener(records, *handlers,
+                                                   respect_handler_level=True)
+        _listener.start()
+    
+    if query_sample_rate is None:
+        env_rate = os.getenv('INTELLIVAULT_QUERY_LOG_SAMPLE')
+        query_sample_rate = float(env_rate) if env_rate else QUERY_SAMPLE_RATES[mode]
+    _query_sample_rate = query_sample_rate
+
+
+def should_log_query() -> bool:
+    """Sampling decision for one per-query log line"""
+    rate = _query_sample_rate
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def show_progress(num_items: int) -> bool:
+    """Whether a batch is large enough to deserve a progress bar"""
+    return num_items >= PROGRESS_BAR_MIN_ITEMS
+
+
+def reset_logging():
+    """Back to the unconfigured state (no handlers, records propagate)"""
+    global _query_sample_rate
+    _stop_listener()
+    root = logging.getLogger(ROOT_LOGGER)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(logging.NOTSET)
+    root.propagate = True
+    _query_sample_rate = 1.0
+
+
+def _stop_listener():
+    """Flush and stop the background writer (registered at exit)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
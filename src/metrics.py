@@ -0,0 +1,198 @@
+"""
+Lightweight per-stage tracing and Prometheus-format metrics.
+
+A Trace times the stages of one operation (a query, an ingested document)
+and feeds every stage duration into a shared histogram. Lower layers can
+add their own stages with span(), which attaches to whatever trace is
+active in the current context and costs nothing when none is.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple, Optional
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus model"""
+    
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+    
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class MetricsRegistry:
+    """Named histograms, counters and gauges, keyed by label values"""
+    
+    def __init__(self):
+        self.enabled = True
+        self.histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self.counters: Dict[str, Dict[Tuple, float]] = {}
+        self.gauges: Dict[str, Dict[Tuple, float]] = {}
+        self.help: Dict[str, str] = {}
+        self.lock = threading.Lock()
+    
+    def describe(self, name: str, text: str):
+        self.help[name] = text
+    
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        series = self.histograms.get(name)
+        if series is None or key not in series:
+            with self.lock:
+                series = self.histograms.setdefault(name, {})
+                series.setdefault(key, Histogram())
+        series[key].observe(value)
+    
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+    
+    def set(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.gauges.setdefault(name, {})[key] = value
+    
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+    
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        
+        def header(name, kind):
+            if name in self.help:
+                help_text = self.help[name].replace('\\', '\\\\').replace('\n', '\\n')
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+        
+        for name, series in sorted(self.counters.items()):
+            header(name, 'counter')
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_labels(key)} {value:g}")
+        
+        for name, series in sorted(self.gauges.items()):
+            header(name, 'gauge')
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_labels(key)} {value:g}")
+        
+        for name, series in sorted(self.histograms.items()):
+            header(name, 'histogram')
+            for key, hist in sorted(series.items()):
+                with hist.lock:
+                    counts, total, count = list(hist.counts), hist.sum, hist.count
+                cumulative = 0
+                for bound, bucket_count in zip(hist.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_labels(key, le=f'{bound:g}')} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(key, le='+Inf')} {count}")
+                lines.append(f"{name}_sum{_labels(key)} {total:.6f}")
+                lines.append(f"{name}_count{_labels(key)} {count}")
+        
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: Tuple, **extra) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value) -> str:
+    """Label value as the exposition format quotes it (backslash, double quote, newline)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REGISTRY = MetricsRegistry()
+STAGE_METRIC = "intellivault_stage_duration_seconds"
+REGISTRY.describe(STAGE_METRIC, "Time spent in each pipeline stage")
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('intellivault_trace', default=None)
+
+
+class Trace:
+    """Stage timings for one operation, e.g. Trace('query')"""
+    
+    def __init__(self, operation: str, registry: MetricsRegistry = REGISTRY):
+        self.operation = operation
+        self.registry = registry
+        self.timings: Dict[str, float] = {}
+        self.start = time.perf_counter()
+        self._token = None
+    
+    def __enter__(self):
+        self._token = _current_trace.set(self)
+        return self
+    
+    def __exit__(self, *exc):
+        self.timings['total'] = (time.perf_counter() - self.start) * 1000
+        self.registry.observe(STAGE_METRIC, self.timings['total'] / 1000,
+                              operation=self.operation, stage='total')
+        _current_trace.reset(self._token)
+    
+    def span(self, stage: str) -> '_Span':
+        return _Span(self, stage)
+    
+    def record(self, stage: str, seconds: float):
+        # Stages hit more than once (e.g. per chunk) accumulate
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds * 1000
+        self.registry.observe(STAGE_METRIC, seconds, operation=self.operation, stage=stage)
+
+
+class _Span:
+    """Times one stage (a plain class: cheaper than a generator context manager)"""
+    
+    __slots__ = ('trace', 'stage', 'start')
+    
+    def __init__(self, trace: Trace, stage: str):
+        self.trace = trace
+        self.stage = stage
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.trace.record(self.stage, time.perf_counter() - self.start)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a stage of the active trace, if any (no-op otherwise)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(stage):
+        yield
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
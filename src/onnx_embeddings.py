@@ -0,0 +1,196 @@
+"""
+ONNX Runtime inference backend for sentence-transformer embeddings.
+
+The transformer is exported once to ONNX (optionally with dynamic int8
+weight quantization) and cached on disk; pooling and normalization are
+done in numpy so the exported graph stays a plain encoder.
+
+Agreement with the PyTorch backend (cosine similarity per embedding):
+    fp32: >= 0.9999   (graph optimizations only reorder float math)
+    int8: >= 0.98     (quantized weights; ranking is rarely affected)
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Union
+import numpy as np
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Minimum cosine similarity to the PyTorch embedding of the same text
+MIN_COSINE = {'fp32': 0.9999, 'int8': 0.98}
+
+DEFAULT_EXPORT_DIR = 'models/onnx'
+INPUT_NAMES = ('input_ids', 'attention_mask', 'token_type_ids')
+
+def export_onnx(model_name: str, output_dir: Union[str, Path],
+                quantize: bool = False, opset: int = 17) -> Path:
+    """
+    Export a sentence-transformers model to ONNX.
+    
+    Writes model.onnx (and model.int8.onnx when quantize=True), the
+    tokenizer files and pooling.json describing the post-processing.
+    
+    Returns:
+        Path to the model file to load
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model_path = output_dir / 'model.onnx'
+    
+    if not model_path.exists():
+        logger.info("Exporting %s to ONNX...", model_name)
+        st_model = SentenceTransformer(model_name, device='cpu')
+        transformer = st_model[0]
+        encoder = transformer.auto_model.eval()
+        tokenizer = transformer.tokenizer
+        
+        sample = tokenizer(["export sample text"], return_tensors='pt')
+        input_names = [name for name in INPUT_NAMES if name in sample]
+        
+        class Encoder(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.encoder = encoder
+            
+            def forward(self, *inputs):
+                return self.encoder(**dict(zip(input_names, inputs))).last_hidden_state
+        
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'}
+                        for name in input_names + ['last_hidden_state']}
+        with torch.no_grad():
+            torch.onnx.export(Encoder(), tuple(sample[name] for name in input_names),
+                              str(model_path), input_names=input_names,
+                              output_names=['last_hidden_state'],
+                              dynamic_axes=dynamic_axes, opset_version=opset)
+        
+        tokenizer.save_pretrained(str(output_dir))
+        pooling = st_model[1]
+        with open(output_dir / 'pooling.json', 'w') as f:
+            json.dump({
+                'mode': 'cls' if pooling.pooling_mode_cls_token else 'mean',
+                'normalize': any(type(m).__name__ == 'Normalize' for m in st_model),
+                'max_length': st_model.max_seq_length,
+                'dimension': st_model.get_sentence_embedding_dimension()
+            }, f, indent=2)
+        logger.info("✓ Exported to %s", model_path)
+    
+    if not quantize:
+        return model_path
+    
+    quantized_path = output_dir / 'model.int8.onnx'
+    if not quantized_path.exists():
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+        logger.info("✓ Quantized to %s", quantized_path)
+    return quantized_path
+
+
+class OnnxEncoder:
+    """
+    Drop-in for SentenceTransformer.encode backed by ONNX Runtime.
+    """
+    
+    def __init__(self, session, tokenizer, pooling: str = 'mean',
+                 normalize: bool = True, max_length: int = 256,
+                 dimension: Optional[int] = None):
+        """
+        Args:
+            session: onnxruntime.InferenceSession returning last_hidden_state
+            tokenizer: Hugging Face tokenizer for the model
+            pooling: 'mean' (attention-masked) or 'cls'
+            normalize: L2-normalize the pooled embeddings
+            max_length: Truncate inputs to this many tokens
+        """
+        self.session = session
+        self.tokenizer = tokenizer
+        self.pooling = pooling
+        self.normalize = normalize
+        self.max_length = max_length
+        self.dimension = dimension
+        self.input_names = {i.name for i in session.get_inputs()}
+    
+    @classmethod
+    def load(cls, model_name: str, export_dir: Union[str, Path, None] = None,
+             quantize: bool = False, intra_op_threads: Optional[int] = None,
+             inter_op_threads: int = 1) -> 'OnnxEncoder':
+        """
+        Load (exporting on first use) an ONNX encoder for model_name.
+        
+        Args:
+            intra_op_threads: Threads used inside one operator; defaults to
+                              the CPU count, which suits one request at a time
+            inter_op_threads: Threads running independent operators; 1 avoids
+                              oversubscription since the encoder graph is sequential
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        
+        export_dir = Path(export_dir or DEFAULT_EXPORT_DIR) / model_name.replace('/', '__')
+        model_path = export_onnx(model_name, export_dir, quantize=quantize)
+        with open(export_dir / 'pooling.json') as f:
+            pooling = json.load(f)
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or os.cpu_count() or 1
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(str(model_path), options,
+                                       providers=['CPUExecutionProvider'])
+        
+        tokenizer = AutoTokenizer.from_pretrained(str(export_dir))
+        return cls(session, tokenizer, pooling=pooling['mode'],
+                   normalize=pooling['normalize'], max_length=pooling['max_length'],
+                   dimension=pooling['dimension'])
+    
+    def get_sentence_embedding_dimension(self) -> Optional[int]:
+        return self.dimension
+    
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, show_progress_bar: bool = False) -> np.ndarray:
+        """Embed one string (1D result) or a list of strings (2D result)"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        
+        # Batch similar lengths together so little compute goes to padding
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        ordered = [texts[i] for i in order]
+        
+        batches = range(0, len(ordered), batch_size)
+        if show_progress_bar:
+            from tqdm import tqdm
+            batches = tqdm(batches, desc="Batches")
+        
+        outputs = [self._encode_batch(ordered[start:start + batch_size]) for start in batches]
+        if not outputs:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        
+        embeddings = np.empty((len(texts), outputs[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(outputs)
+        return embeddings[0] if single else embeddings
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.max_length, return_tensors='np')
+        feed = {name: np.asarray(tokens[name], dtype=np.int64)
+                for name in INPUT_NAMES if name in self.input_names and name in tokens}
+        if 'token_type_ids' in self.input_names and 'token_type_ids' not in feed:
+            feed['token_type_ids'] = np.zeros_like(feed['input_ids'])
+        
+        hidden = self.session.run(None, feed)[0]
+        
+        if self.pooling == 'cls':
+            pooled = hidden[:, 0]
+        else:
+            mask = feed['attention_mask'][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
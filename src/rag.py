@@ -1,54 +1,185 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import time
 import numpy as np
+from src.metrics import Trace
+from src.logging_config import get_logger, should_log_query
+from src.reduction import load_stored_reducer
+from src.grouping import group_by_document, group_scored, AGGREGATES
+
+logger = get_logger(__name__)
 
 class RAGOrchestrator:
     """Complete RAG orchestration system"""
     
-    def __init__(self, encryption_manager, embedding_generator, 
-                 db_client, llm_client=None):
+    def __init__(self, encryption_manager, embedding_generator,
+                 db_client, llm_client=None, reranker=None,
+                 candidate_k: int = 50, latency_budget_ms: Optional[float] = None,
+                 reducer=None, router=None, centroids=None):
+        """
+        Args:
+            reranker: Optional CrossEncoderReranker for a second ranking stage
+            candidate_k: Candidates retrieved for the reranker to rescore
+            latency_budget_ms: Default per-query budget; the rerank stage
+                               gets whatever the earlier stages left over
+            reducer: PCAReducer applied to query embeddings. Defaults to the
+                     one stored with the collection, if any.
+            router: TenantRouter for queries restricted to tenant shards
+            centroids: Store of the doc-level centroid collection, for
+                       hierarchical queries
+        """
         self.enc = encryption_manager
         self.emb = embedding_generator
         self.db = db_client
         self.llm = llm_client
+        self.reranker = reranker
+        self.candidate_k = candidate_k
+        self.latency_budget_ms = latency_budget_ms
+        self.router = router
+        self.centroids = centroids
+        for store in (db_client, centroids):
+            use_key = getattr(store, 'use_key', None)
+            if use_key is not None:
+                use_key(encryption_manager)
+        self.reducer = reducer if reducer is not None else load_stored_reducer(db_client, encryption_manager)
         
-        print("✓ RAG Orchestrator initialized")
+        logger.info("✓ RAG Orchestrator initialized")
     
-    def query(self, query_text: str, top_k: int = 5) -> Dict[str, Any]:
-        """Execute complete RAG query"""
-        print(f"\nQUERY: {query_text}")
-        
-        # Generate and encrypt query
-        query_embedding = self.emb.generate_embedding(query_text)
-        encrypted_query = self.enc.encrypt_vector(query_embedding)
+    def query(self, query_text: str, top_k: int = 5, rerank: Optional[bool] = None,
+              latency_budget_ms: Optional[float] = None,
+              tenants: Optional[List[str]] = None, group_by_doc: bool = False,
+              aggregate: str = 'max', chunks_per_doc: int = 3,
+              hierarchical: bool = False, top_docs: int = 20) -> Dict[str, Any]:
+        """
+        Execute complete RAG query.
         
-        # Search
-        results = self.db.encrypted_search(encrypted_query, top_k=top_k)
+        Args:
+            rerank: Use the reranker (defaults to True when one is configured)
+            latency_budget_ms: Overrides the orchestrator's default budget
+            tenants: Search only these tenants' shards (needs a router)
+            group_by_doc: Return top_k documents rather than chunks, each with
+                          its best chunks_per_doc chunks
+            aggregate: Document score from its chunks: max, sum or mean_top_n
+            hierarchical: Find the top_docs documents closest to the query by
+                          centroid first, then search only their chunks
+        """
+        use_rerank = self.reranker is not None if rerank is None else rerank
+        if use_rerank and self.reranker is None:
+            raise ValueError("Reranking requested but no reranker is configured")
+        if tenants is not None and self.router is None:
+            raise ValueError("Tenant search requested but no router is configured")
+        if group_by_doc and aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{aggregate}' (choose from {', '.join(AGGREGATES)})")
+        if hierarchical and self.centroids is None:
+            raise ValueError("Hierarchical search requested but no centroid collection is configured")
+        if hierarchical and self.centroids.stats() is None:
+            raise ValueError("Hierarchical search requested but no document centroids are stored yet")
+        if hierarchical and tenants is not None:
+            raise ValueError("Hierarchical search is not available for tenant shards")
+        budget_ms = latency_budget_ms if latency_budget_ms is not None else self.latency_budget_ms
         
-        # Decrypt and rank
-        decrypted_results = []
-        for result in results:
-            decrypted_vec = self.enc.decrypt_vector(result['vector'])
-            similarity = self._compute_similarity(query_embedding, decrypted_vec)
+        with Trace('query') as trace:
+            # Generate query embedding
+            with trace.span('embed'):
+                query_embedding = self.emb.generate_embedding(query_text)
+            if self.reducer is not None and tenants is None:
+                # The collection's vectors live in the reduced space
+                with trace.span('reduce'):
+                    query_embedding = self.reducer.transform(query_embedding)
             
-            decrypted_results.append({
-                'id': result['id'],
-                'similarity': float(similarity),
-                'metadata': result['metadata'],
-                'content': result['metadata'].get('content', '')
-            })
-        
-        decrypted_results.sort(key=lambda x: x['similarity'], reverse=True)
-        
-        # Generate answer
-        answer = self._generate_answer(query_text, decrypted_results)
+            # Search (wider candidate pool when a second stage will rescore it)
+            fetch_k = max(top_k, self.candidate_k) if use_rerank else top_k
+            docs_k = fetch_k
+            if group_by_doc:
+                # Enough chunks for fetch_k documents even when some match many times
+                fetch_k = max(self.candidate_k, 4 * fetch_k * chunks_per_doc)
+            if tenants is not None:
+                # Parallel fan-out over tenant shards, each with its own key
+                with trace.span('search'):
+                    decrypted_results = self.router.search(query_embedding, tenants, top_k=fetch_k)
+            else:
+                with trace.span('encrypt'):
+                    encrypted_query = self.enc.encrypt_vector(query_embedding)
+                search_options = {}
+                if hierarchical:
+                    # Best documents by centroid first; only their chunks are searched
+                    with trace.span('select_docs'):
+                        documents = [result['metadata']['doc_id'] for result in
+                                     self.centroids.search(encrypted_query, top_k=top_docs)]
+                    search_options['filters'] = {'doc_id': documents}
+                with trace.span('search'):
+                    results = self.db.encrypted_search(encrypted_query, top_k=fetch_k, **search_options)
+                
+                # Decrypt and rank
+                if group_by_doc:
+                    # Scores stream straight into per-document heaps; only
+                    # the best documents' chunks become result dicts
+                    with trace.span('group'):
+                        decrypted_results = group_scored(self._scored(query_embedding, results), docs_k,
+                                                         aggregate=aggregate, chunks_per_doc=chunks_per_doc)
+                else:
+                    decrypted_results = []
+                    with trace.span('decrypt_rank'):
+                        for result in results:
+                            decrypted_vec = self.enc.decrypt_vector(result['vector'])
+                            similarity = self._compute_similarity(query_embedding, decrypted_vec)
+                            
+                            decrypted_results.append({
+                                'id': result['id'],
+                                'similarity': float(similarity),
+                                'metadata': result['metadata'],
+                                'content': result['metadata'].get('content', '')
+                            })
+                        
+                        decrypted_results.sort(key=lambda x: x['similarity'], reverse=True)
+            
+            if group_by_doc and tenants is not None:
+                with trace.span('group'):
+                    decrypted_results = group_by_document(decrypted_results, docs_k, aggregate=aggregate,
+                                                          chunks_per_doc=chunks_per_doc)
+            
+            rerank_info = None
+            if use_rerank:
+                stage_budget = None
+                if budget_ms is not None:
+                    stage_budget = budget_ms - (time.perf_counter() - trace.start) * 1000
+                with trace.span('rerank'):
+                    decrypted_results, rerank_info = self.reranker.rerank(
+                        query_text, decrypted_results, top_k, budget_ms=stage_budget
+                    )
+            
+            # Generate answer
+            with trace.span('answer'):
+                answer = self._generate_answer(query_text, decrypted_results)
         
-        return {
+        response = {
             'query': query_text,
             'answer': answer,
             'sources': decrypted_results,
             'num_sources': len(decrypted_results),
-            'top_similarity': decrypted_results[0]['similarity'] if decrypted_results else 0.0
+            'top_similarity': decrypted_results[0]['similarity'] if decrypted_results else 0.0,
+            'timings': trace.timings
         }
+        if rerank_info is not None:
+            response['rerank'] = rerank_info
+        if hierarchical:
+            response['documents_searched'] = len(documents)
+        
+        # Sampled: one synchronous log line per query is too costly under load
+        if should_log_query():
+            logger.info("QUERY: %s (%d sources, %.1fms)", query_text,
+                        len(decrypted_results), trace.timings['total'])
+        return response
+    
+    def _scored(self, query_embedding, results: List[Dict], batch_size: int = 256):
+        """(cosine similarity, record) per search result, decrypted and scored a batch at a time"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        for start in range(0, len(results), batch_size):
+            batch = results[start:start + batch_size]
+            vectors = self.enc.decrypt_vectors([result['vector'] for result in batch])
+            norms = np.linalg.norm(vectors, axis=1) * query_norm
+            similarities = (vectors @ query) / np.where(norms > 0, norms, 1.0)
+            yield from zip(similarities.tolist(), batch)
     
     def _compute_similarity(self, vec1, vec2):
         """Cosine similarity"""
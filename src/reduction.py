@@ -0,0 +1,109 @@
+"""
+Dimensionality reduction of embeddings before they are encrypted and stored.
+
+A PCAReducer is fitted on a sample of chunk embeddings at ingest time,
+stored with the collection, and applied to every stored vector and every
+query. Memory, encrypted payload size and scoring time all shrink in
+proportion to the output dimension.
+"""
+
+from typing import Dict, Optional
+import numpy as np
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class PCAReducer:
+    """
+    Linear projection onto the top principal components, followed by
+    re-normalization so cosine similarity stays meaningful.
+    
+    The components are fitted without centering: subtracting the corpus
+    mean would change which vectors are close in cosine terms, whereas the
+    uncentered fit is the rank-k projection that best preserves dot products.
+    """
+    
+    def __init__(self, components: np.ndarray,
+                 explained_variance_ratio: Optional[np.ndarray] = None):
+        """
+        Args:
+            components: (output_dim, input_dim) orthonormal rows
+            explained_variance_ratio: Share of the squared norm on each component
+        """
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.explained_variance_ratio = (np.asarray(explained_variance_ratio, dtype=np.float32)
+                                         if explained_variance_ratio is not None else None)
+    
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dimension: int, sample_size: int = 10000,
+            seed: int = 0) -> 'PCAReducer':
+        """Fit on (a random sample of) vectors, keeping `dimension` components"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if dimension > min(vectors.shape):
+            raise ValueError(f"Cannot keep {dimension} components from "
+                             f"{vectors.shape[0]} vectors of dimension {vectors.shape[1]}")
+        
+        if len(vectors) > sample_size:
+            rows = np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False)
+            vectors = vectors[rows]
+        
+        _, singular_values, vt = np.linalg.svd(vectors, full_matrices=False)
+        energy = singular_values ** 2
+        return cls(vt[:dimension], (energy / energy.sum())[:dimension])
+    
+    @property
+    def dimension(self) -> int:
+        return self.components.shape[0]
+    
+    @property
+    def input_dimension(self) -> int:
+        return self.components.shape[1]
+    
+    @property
+    def retained_variance(self) -> Optional[float]:
+        if self.explained_variance_ratio is None:
+            return None
+        return float(self.explained_variance_ratio.sum())
+    
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """Project one vector (1D) or a matrix of row vectors to unit length"""
+        single = np.ndim(vectors) == 1
+        matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        
+        reduced = matrix @ self.components.T
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        reduced /= np.where(norms > 0, norms, 1.0)
+        return reduced[0] if single else reduced
+    
+    def to_encrypted(self, encryption_manager) -> Dict:
+        """
+        Serializable record for storage next to the collection. The components
+        are derived from plaintext embeddings, so they are encrypted too.
+        """
+        record = {
+            'type': 'pca',
+            'dimension': self.dimension,
+            'input_dimension': self.input_dimension,
+            'components': encryption_manager.encrypt_vector(self.components),
+        }
+        if self.explained_variance_ratio is not None:
+            record['explained_variance_ratio'] = self.explained_variance_ratio.tolist()
+        return record
+    
+    @classmethod
+    def from_encrypted(cls, record: Dict, encryption_manager) -> 'PCAReducer':
+        if record.get('type') != 'pca':
+            raise ValueError(f"Unknown reducer type: {record.get('type')}")
+        return cls(encryption_manager.decrypt_vector(record['components']),
+                   record.get('explained_variance_ratio'))
+
+
+def load_stored_reducer(db, encryption_manager) -> Optional[PCAReducer]:
+    """The reducer stored with db's collection, if the backend keeps one"""
+    load = getattr(db, 'load_reducer', None)
+    record = load() if load else None
+    if record is None:
+        return None
+    reducer = PCAReducer.from_encrypted(record, encryption_manager)
+    logger.info("✓ Vectors reduced to %d dimensions (PCA)", reducer.dimension)
+    return reducer
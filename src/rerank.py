@@ -0,0 +1,93 @@
+from typing import List, Dict, Any, Optional, Tuple
+import time
+
+class CrossEncoderReranker:
+    """
+    Second-stage reranker for RAG results.
+    Rescores (query, chunk) pairs with a small local cross-encoder in a
+    single batched forward pass, truncating the candidate list so the
+    rerank stage fits inside a per-query latency budget.
+    """
+    
+    def __init__(self, model_name='cross-encoder/ms-marco-MiniLM-L-6-v2',
+                 max_length=256, model=None, initial_ms_per_pair=2.0,
+                 min_candidates=10, smoothing=0.2):
+        """
+        Initialize the reranker.
+        
+        Args:
+            model_name: Name of the sentence-transformers cross-encoder
+            max_length: Max tokens per (query, chunk) pair
+            model: Optional preloaded model exposing predict(pairs, ...)
+            initial_ms_per_pair: Cost estimate used until the first batch is timed
+            min_candidates: Never rerank fewer candidates than this
+            smoothing: Weight of the newest observation in the cost estimate
+        """
+        if model is None:
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(model_name, max_length=max_length)
+        
+        self.model = model
+        self.ms_per_pair = initial_ms_per_pair
+        self.min_candidates = min_candidates
+        self.smoothing = smoothing
+    
+    def candidates_for_budget(self, num_candidates: int,
+                              budget_ms: Optional[float]) -> int:
+        """How many candidates can be reranked within budget_ms"""
+        if budget_ms is None:
+            return num_candidates
+        
+        affordable = int(budget_ms / self.ms_per_pair) if budget_ms > 0 else 0
+        return min(num_candidates, max(self.min_candidates, affordable))
+    
+    def rerank(self, query: str, candidates: List[Dict], top_k: int,
+               budget_ms: Optional[float] = None) -> Tuple[List[Dict], Dict[str, Any]]:
+        """
+        Rerank candidates (already sorted by first-stage similarity).
+        
+        Args:
+            query: Query text
+            candidates: Result dicts with a 'content' field
+            top_k: Number of results to return
+            budget_ms: Time available for this stage, or None for no limit
+        
+        Returns:
+            (top_k results, info dict with candidate counts and timing).
+            When the budget leaves fewer than top_k reranked candidates, the
+            rest are filled from the unreranked ones in first-stage order.
+        """
+        limit = self.candidates_for_budget(len(candidates), budget_ms)
+        head = candidates[:limit]
+        
+        info = {
+            'candidates': len(candidates),
+            'reranked': len(head),
+            'truncated': len(head) < len(candidates),
+            'ms': 0.0
+        }
+        
+        if not head:
+            return candidates[:top_k], info
+        
+        pairs = [(query, c.get('content', '')) for c in head]
+        
+        start = time.perf_counter()
+        scores = self.model.predict(
+            pairs,
+            batch_size=len(pairs),
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        # Keep a smoothed per-pair cost so the next budget check is realistic
+        observed = elapsed_ms / len(pairs)
+        self.ms_per_pair += self.smoothing * (observed - self.ms_per_pair)
+        info['ms'] = elapsed_ms
+        
+        for candidate, score in zip(head, scores):
+            candidate['rerank_score'] = float(score)
+        
+        head.sort(key=lambda x: x['rerank_score'], reverse=True)
+        return head[:top_k] + candidates[limit:limit + max(0, top_k - len(head))], info
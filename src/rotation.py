@@ -0,0 +1,185 @@
+"""
+Online key rotation: re-encrypt a collection under the current master key
+in the background, without re-embedding and without taking searches down.
+
+Rotation is two steps:
+  1. EncryptionManager.rotate_master_key() makes a new key current and keeps
+     the old one as retired, so every worker can read both (records carry
+     the key_id that sealed them).
+  2. KeyRotationJob walks the collection in batches and re-seals records
+     still under a retired key, writing them back with one bulk upsert per
+     flush_records re-sealed records (the simulator rewrites its file once
+     per flush, not once per batch). Searches keep working on the mixed-key
+     data throughout; the job checkpoints after each flush and can be
+     stopped and resumed at any point.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from src.metrics import REGISTRY
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+REENCRYPTED_METRIC = "intellivault_rotation_reencrypted_total"
+REGISTRY.describe(REENCRYPTED_METRIC, "Records re-encrypted under the current key")
+
+DEFAULT_CHECKPOINT = 'data/rotation_checkpoint.json'
+
+class KeyRotationJob:
+    """Resumable, throttled re-encryption of one collection"""
+    
+    def __init__(self, store, encryption_manager, batch_size: int = 500,
+                 max_records_per_sec: Optional[float] = None,
+                 checkpoint_path: Union[str, Path, None] = DEFAULT_CHECKPOINT,
+                 flush_records: int = 100000):
+        """
+        Args:
+            store: VectorStore of the collection to rotate
+            encryption_manager: Keys of that collection; its current key is the
+                                rotation target, retired keys decrypt the rest
+            batch_size: Records read and re-sealed per step
+            max_records_per_sec: Throttle on records rewritten (None: unthrottled)
+            checkpoint_path: JSON file recording progress (None: no checkpoint)
+            flush_records: Re-sealed records written (and checkpointed) per bulk upsert
+        """
+        self.store = store
+        self.enc = encryption_manager
+        self.batch_size = batch_size
+        self.flush_records = flush_records
+        self.max_records_per_sec = max_records_per_sec
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.collection = getattr(store, 'collection', store.name)
+        self.stop_event = threading.Event()
+    
+    def load_checkpoint(self) -> Dict:
+        """Progress of the last run towards the current key (empty if none)"""
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return {}
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f).get(self.collection, {})
+        # A checkpoint for an older target key says nothing about this rotation
+        return checkpoint if checkpoint.get('key_id') == self.enc.key_id else {}
+    
+    def _save_checkpoint(self, progress: Dict):
+        if self.checkpoint_path is None:
+            return
+        checkpoints = {}
+        if self.checkpoint_path.exists():
+            with open(self.checkpoint_path) as f:
+                checkpoints = json.load(f)
+        checkpoints[self.collection] = progress
+        
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoints, f, indent=2)
+        tmp_path.replace(self.checkpoint_path)
+    
+    def stop(self):
+        """Ask a running job to stop after its current batch (re-sealed records are written first)"""
+        self.stop_event.set()
+    
+    def start(self) -> threading.Thread:
+        """Run on a background thread"""
+        thread = threading.Thread(target=self.run, name=f"rotate-{self.collection}", daemon=True)
+        thread.start()
+        return thread
+    
+    def run(self, max_batches: Optional[int] = None) -> Dict:
+        """
+        Re-encrypt every record not yet under the current key, resuming from
+        the checkpoint. Records before the checkpointed position are skipped
+        without decrypting; the key_id check makes rescanning them harmless
+        if the store's order has changed since.
+        
+        Returns:
+            Progress: key_id, position, reencrypted, complete
+        """
+        self.stop_event.clear()
+        progress = {'key_id': self.enc.key_id, 'position': 0, 'reencrypted': 0, 'complete': False}
+        progress.update(self.load_checkpoint())
+        if progress['complete']:
+            logger.info("✓ %s already rotated to key %s", self.collection, self.enc.key_id)
+            return progress
+        
+        resume_from = progress['position']
+        scanned = 0
+        batches = 0
+        start = time.perf_counter()
+        resealed_this_run = 0
+        resealed = []
+        
+        for batch in self.store.scan(batch_size=self.batch_size):
+            if self.stop_event.is_set() or (max_batches is not None and batches >= max_batches):
+                self._flush(resealed, progress)
+                logger.info("Rotation of %s paused at %d records", self.collection, progress['position'])
+                return progress
+            
+            scanned += len(batch)
+            if scanned <= resume_from:
+                continue
+            batch = batch[max(0, resume_from - (scanned - len(batch))):]
+            
+            fresh = self._reseal(batch)
+            resealed += fresh
+            batches += 1
+            resealed_this_run += len(fresh)
+            progress['position'] = scanned
+            if len(resealed) >= self.flush_records:
+                self._flush(resealed, progress)
+                resealed = []
+            self._throttle(resealed_this_run, start)
+        
+        progress['complete'] = True
+        self._flush(resealed, progress)
+        logger.info("✓ Rotated %s: %d records re-encrypted under key %s",
+                    self.collection, progress['reencrypted'], self.enc.key_id)
+        self._rotate_reducer()
+        return progress
+    
+    def _reseal(self, batch: List[Dict]) -> List[tuple]:
+        """(nonce the record was read with, record re-sealed under the current key) per stale record"""
+        stale = [record for record in batch if self.enc.needs_reencryption(record['vector'])]
+        if not stale:
+            return []
+        vectors = self.enc.decrypt_vectors([record['vector'] for record in stale])
+        return [(record['vector'].get('nonce'),
+                 {'id': record['id'],
+                  'vector': self.enc.encrypt_vector(vector.reshape(record['vector']['shape'])),
+                  'metadata': record['metadata']})
+                for record, vector in zip(stale, vectors)]
+    
+    def _flush(self, resealed: List[tuple], progress: Dict):
+        """Write re-sealed records in one bulk upsert, then checkpoint the progress it covers"""
+        if resealed:
+            def unchanged():
+                # Read once the write has started: records rewritten (e.g.
+                # re-ingested) or deleted since the scan are left alone
+                current = self.store.get_many([record['id'] for _, record in resealed])
+                for (nonce, record), now in zip(resealed, current):
+                    if now is not None and now['vector'].get('nonce') == nonce:
+                        yield record
+            
+            written = self.store.bulk_upsert(unchanged(), batch_size=self.batch_size)
+            progress['reencrypted'] += written
+            REGISTRY.inc(REENCRYPTED_METRIC, written, collection=self.collection)
+        self._save_checkpoint(progress)
+    
+    def _throttle(self, rewritten: int, start: float):
+        if not self.max_records_per_sec:
+            return
+        ahead = rewritten / self.max_records_per_sec - (time.perf_counter() - start)
+        if ahead > 0:
+            self.stop_event.wait(ahead)
+    
+    def _rotate_reducer(self):
+        load = getattr(self.store, 'load_reducer', None)
+        record = load() if load else None
+        if record is None or not self.enc.needs_reencryption(record['components']):
+            return
+        record = dict(record, components=self.enc.reencrypt(record['components']))
+        self.store.save_reducer(record)
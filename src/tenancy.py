@@ -0,0 +1,173 @@
+"""
+Tenant sharding: one collection and one derived data key per tenant
+(department), and a router that fans a query out to the shards a caller
+may read and merges their results.
+
+A tenant's query only touches that tenant's collection, so its cost
+follows the tenant's data size rather than the whole corpus.
+"""
+
+import heapq
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+from src.vector_store import VectorStore, SimulatedStore, DEFAULT_COLLECTION, create_store
+from src.reduction import load_stored_reducer
+
+TENANT_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+TENANT_GRANTS_ENV = 'INTELLIVAULT_TENANT_GRANTS'
+
+def tenant_collection(tenant: str) -> str:
+    """Collection name of a tenant's shard"""
+    if not TENANT_PATTERN.match(tenant):
+        raise ValueError(f"Invalid tenant name '{tenant}' (lowercase letters, digits, _ and -)")
+    return f"{DEFAULT_COLLECTION}__{tenant}"
+
+
+def load_tenant_grants(path: Optional[str] = None) -> Dict[str, frozenset]:
+    """
+    API token -> tenants its callers may query and ingest into, from a
+    server-side JSON file {token: [tenant, ...]} (default: the
+    INTELLIVAULT_TENANT_GRANTS path; none configured grants nothing).
+    """
+    path = path or os.getenv(TENANT_GRANTS_ENV)
+    if not path:
+        return {}
+    with open(path) as f:
+        grants = json.load(f)
+    for tenants in grants.values():
+        for tenant in tenants:
+            tenant_collection(tenant)
+    return {token: frozenset(tenants) for token, tenants in grants.items()}
+
+
+def department_of(file_path) -> str:
+    """Tenant of a data/raw file, from its name prefix (hr_001.txt -> hr)"""
+    return os.path.basename(str(file_path)).split('_', 1)[0].lower()
+
+
+def default_store_factory(backend: Optional[str] = None, **options) -> Callable[[str], VectorStore]:
+    """
+    Factory building one store per collection from the usual config.
+    Simulated shards share one SimulatedCyborgDB so they share a manifest.
+    """
+    backend = backend or os.getenv('INTELLIVAULT_BACKEND', 'simulated')
+    if backend == 'simulated':
+        db = create_store('simulated', **options).db
+        return lambda collection: SimulatedStore(collection=collection, db=db)
+    return lambda collection: create_store(backend, collection=collection, **options)
+
+
+class TenantRouter:
+    """
+    Routes reads and writes to per-tenant shards, each encrypted with the
+    tenant's own key derived from the master key.
+    """
+    
+    def __init__(self, encryption_manager, store_factory: Optional[Callable[[str], VectorStore]] = None,
+                 max_workers: int = 8):
+        """
+        Args:
+            encryption_manager: Holds the master key tenant keys derive from
+            store_factory: collection name -> VectorStore (default: configured backend)
+            max_workers: Shards searched concurrently
+        """
+        self.enc = encryption_manager
+        self.store_factory = store_factory
+        self.stores: Dict[str, VectorStore] = {}
+        self.reducers: Dict[str, object] = {}
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='shard')
+    
+    def keys(self, tenant: str):
+        """The tenant's EncryptionManager"""
+        return self.enc.for_tenant(tenant)
+    
+    def store(self, tenant: str) -> VectorStore:
+        """The tenant's shard (created on first use)"""
+        store = self.stores.get(tenant)
+        if store is None:
+            collection = tenant_collection(tenant)
+            with self.lock:
+                if self.store_factory is None:
+                    self.store_factory = default_store_factory()
+                store = self.stores.get(tenant)
+                if store is None:
+                    store = self.stores[tenant] = self.store_factory(collection)
+        return store
+    
+    def reducer(self, tenant: str):
+        """The PCA reducer stored with the tenant's shard, if any (cached)"""
+        if tenant not in self.reducers:
+            self.reducers[tenant] = load_stored_reducer(self.store(tenant), self.keys(tenant))
+        return self.reducers[tenant]
+    
+    def create_tenant(self, tenant: str, dimension: int) -> VectorStore:
+        store = self.store(tenant)
+        store.create_collection(dimension=dimension)
+        return store
+    
+    def upsert(self, tenant: str, ids: List[str], embeddings: np.ndarray,
+               metadatas: List[Dict]) -> int:
+        """Encrypt embeddings with the tenant key and write them to its shard"""
+        keys = self.keys(tenant)
+        return self.store(tenant).upsert([
+            {'id': doc_id, 'vector': keys.encrypt_vector(np.asarray(vector, dtype=np.float32)),
+             'metadata': metadata}
+            for doc_id, vector, metadata in zip(ids, embeddings, metadatas)
+        ])
+    
+    def search(self, query_embedding: np.ndarray, tenants: Iterable[str], top_k: int = 5,
+               filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Search every listed shard in parallel and merge their top-k lists.
+        
+        Returns:
+            Up to top_k decrypted results (id, similarity, metadata, content,
+            tenant), best first
+        """
+        tenants = list(dict.fromkeys(tenants))
+        for tenant in tenants:
+            tenant_collection(tenant)  # reject bad names before any work is queued
+        
+        futures = [self.pool.submit(self._search_shard, tenant, query_embedding, top_k, filters)
+                   for tenant in tenants]
+        shard_results = [future.result() for future in futures]
+        
+        # Each list is sorted best-first; a heap merge reads only what it needs
+        merged = heapq.merge(*shard_results, key=lambda result: -result['similarity'])
+        return list(islice(merged, top_k))
+    
+    def _search_shard(self, tenant: str, query_embedding: np.ndarray, top_k: int,
+                      filters: Optional[Dict]) -> List[Dict]:
+        keys = self.keys(tenant)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        reducer = self.reducer(tenant)
+        if reducer is not None:
+            query = reducer.transform(query)
+        store = self.store(tenant)
+        store.use_key(keys)
+        results = store.search(keys.encrypt_vector(query), top_k=top_k, filters=filters)
+        if not results:
+            return []
+        
+        vectors = keys.decrypt_vectors([result['vector'] for result in results])
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        similarities = (vectors @ query) / np.where(norms > 0, norms, 1.0)
+        
+        ranked = sorted(zip(similarities, results), key=lambda pair: -pair[0])
+        return [{
+            'id': result['id'],
+            'similarity': float(similarity),
+            'metadata': result['metadata'],
+            'content': result['metadata'].get('content', ''),
+            'tenant': tenant
+        } for similarity, result in ranked]
+    
+    def close(self):
+        self.pool.shutdown()
@@ -0,0 +1,303 @@
+"""
+One vector store interface over every CyborgDB client in the repo.
+
+Each backend is wrapped in an adapter implementing VectorStore, and
+create_store() picks one from config (argument or INTELLIVAULT_BACKEND),
+so scripts no longer hard-code use_simulated=True.
+"""
+
+import os
+import time
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+import numpy as np
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_COLLECTION = "intellivault_vectors"
+
+def matches_filters(metadata: Dict, filters: Optional[Dict]) -> bool:
+    """
+    Metadata filter: every key must equal the given value,
+    or be one of the values when a list is given.
+    """
+    if not filters:
+        return True
+    for key, expected in filters.items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class VectorStore(ABC):
+    """
+    Backend protocol for encrypted vector storage.
+    Records are dicts with 'id', 'vector' (encrypted dict) and 'metadata'.
+    Filters are {metadata_key: value or list of allowed values}.
+    """
+    
+    name = "base"
+    
+    def create_collection(self, dimension: int):
+        """Create the backing collection (no-op where not needed)"""
+    
+    @abstractmethod
+    def upsert(self, documents: List[Dict]) -> int:
+        """Insert or replace records by id, returning how many were written"""
+    
+    def bulk_upsert(self, records: Iterable[Dict], batch_size: int = 1000) -> int:
+        """Upsert a stream of records (backends with a bulk path write it in one pass)"""
+        records = iter(records)
+        written = 0
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return written
+            written += self.upsert(batch)
+    
+    @abstractmethod
+    def delete(self, ids: List[str]) -> int:
+        """Delete records by id, returning how many were removed"""
+    
+    def delete_by_filter(self, filters: Dict) -> int:
+        """Delete every record whose metadata matches filters"""
+        ids = [record['id'] for batch in self.scan() for record in batch
+               if matches_filters(record['metadata'], filters)]
+        return self.delete(ids) if ids else 0
+    
+    @abstractmethod
+    def search(self, query_vector: Dict, top_k: int = 5,
+               filters: Optional[Dict] = None) -> List[Dict]:
+        """Encrypted similarity search"""
+    
+    @abstractmethod
+    def get_many(self, ids: List[str]) -> List[Optional[Dict]]:
+        """Records for ids, in order (None where missing)"""
+    
+    @abstractmethod
+    def stats(self) -> Optional[Dict]:
+        """Collection statistics: name, count, dimension"""
+    
+    @abstractmethod
+    def scan(self, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        """Stream every record in batches"""
+    
+    def save_reducer(self, record: Dict):
+        """Store an encrypted dimensionality reducer with the collection"""
+        raise NotImplementedError(f"The {self.name} backend cannot store a reducer")
+    
+    def load_reducer(self) -> Optional[Dict]:
+        """The collection's reducer record (None: vectors are unreduced)"""
+        return None
+    
+    def use_key(self, encryption_manager):
+        """Key the collection's index is searched with (no-op where the service holds it)"""
+    
+    # Method names used by RAGOrchestrator, DocumentIngestor and the scripts
+    def batch_insert(self, documents: List[Dict]):
+        return self.upsert(documents)
+    
+    def encrypted_search(self, query_vector: Dict, top_k: int = 5,
+                         filters: Optional[Dict] = None) -> List[Dict]:
+        return self.search(query_vector, top_k=top_k, filters=filters)
+    
+    def get_by_id(self, doc_id: str) -> Optional[Dict]:
+        return self.get_many([doc_id])[0]
+    
+    def get_stats(self) -> Optional[Dict]:
+        return self.stats()
+
+
+class SimulatedStore(VectorStore):
+    """Adapter for the local pickle-backed SimulatedCyborgDB"""
+    
+    name = "simulated"
+    
+    def __init__(self, storage_path='data/cyborgdb_storage', collection=DEFAULT_COLLECTION, db=None,
+                 encryption_manager=None):
+        from src.cyborgdb_sim import SimulatedCyborgDB
+        self.db = db or SimulatedCyborgDB(storage_path=storage_path)
+        self.collection = collection
+        self.encryption_manager = encryption_manager
+    
+    def create_collection(self, dimension: int):
+        self.db.create_collection(name=self.collection, dimension=dimension)
+    
+    def upsert(self, documents: List[Dict]) -> int:
+        self.db.upsert(self.collection, documents)
+        return len(documents)
+    
+    def bulk_upsert(self, records: Iterable[Dict], batch_size: int = 1000) -> int:
+        return self.db.bulk_upsert(self.collection, records)
+    
+    def delete(self, ids: List[str]) -> int:
+        return self.db.delete(self.collection, ids)
+    
+    def delete_by_filter(self, filters: Dict) -> int:
+        return self.db.delete_by_filter(self.collection, filters)
+    
+    def compact(self, max_records_per_sec: Optional[float] = None) -> int:
+        return self.db.compact(self.collection, max_records_per_sec=max_records_per_sec)
+    
+    def search(self, query_vector: Dict, top_k: int = 5,
+               filters: Optional[Dict] = None) -> List[Dict]:
+        return self.db.search(self.collection, query_vector, top_k=top_k, filters=filters,
+                              encryption_manager=self.encryption_manager)
+    
+    def get_many(self, ids: List[str]) -> List[Optional[Dict]]:
+        return self.db.get_many(self.collection, ids)
+    
+    def stats(self) -> Optional[Dict]:
+        return self.db.get_collection_stats(self.collection)
+    
+    def scan(self, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        return self.db.scan(self.collection, batch_size=batch_size)
+    
+    def save_reducer(self, record: Dict):
+        self.db.save_reducer(self.collection, record)
+    
+    def load_reducer(self) -> Optional[Dict]:
+        return self.db.load_reducer(self.collection)
+    
+    def use_key(self, encryption_manager):
+        # Searches rank only when the simulator can read the vectors
+        self.encryption_manager = encryption_manager
+
+
+class RestServiceStore(VectorStore):
+    """Adapter for the CyborgDB REST service client (src/cyborgdb_client.py)"""
+    
+    name = "rest"
+    
+    def __init__(self, client=None, collection=DEFAULT_COLLECTION, **client_options):
+        from src.cyborgdb_client import CyborgDBClient
+        self.client = client or CyborgDBClient(**client_options)
+        self.client.collection_name = collection
+    
+    def create_collection(self, dimension: int):
+        self.client.create_collection(dimension)
+    
+    def upsert(self, documents: List[Dict]) -> int:
+        summary = self.client.batch_insert(documents)
+        return summary['documents']
+    
+    def delete(self, ids: List[str]) -> int:
+        return self.client.delete(ids)
+    
+    def search(self, query_vector: Dict, top_k: int = 5,
+               filters: Optional[Dict] = None) -> List[Dict]:
+        return self.client.encrypted_search(query_vector, top_k=top_k, filters=filters)
+    
+    def get_many(self, ids: List[str]) -> List[Optional[Dict]]:
+        return self.client.get_many(ids)
+    
+    def stats(self) -> Optional[Dict]:
+        return self.client.get_stats()
+    
+    def scan(self, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        return self.client.scan(batch_size=batch_size)
+
+
+class ServiceStore(VectorStore):
+    """Adapter for the CyborgDB SDK client (src/cyborgdb_service_client.py)"""
+    
+    name = "service"
+    
+    def __init__(self, client=None, collection=DEFAULT_COLLECTION, **client_options):
+        from src.cyborgdb_service_client import CyborgDBServiceClient
+        self.client = client or CyborgDBServiceClient(**client_options)
+        self.client.collection_name = collection
+    
+    def create_collection(self, dimension: int):
+        self.client.create_collection(dimension)
+    
+    def upsert(self, documents: List[Dict]) -> int:
+        return len(documents) if self.client.batch_insert(documents) else 0
+    
+    def delete(self, ids: List[str]) -> int:
+        return self.client.delete(ids)
+    
+    def search(self, query_vector: Dict, top_k: int = 5,
+               filters: Optional[Dict] = None) -> List[Dict]:
+        return self.client.encrypted_search(query_vector, top_k=top_k, filters=filters)
+    
+    def get_many(self, ids: List[str]) -> List[Optional[Dict]]:
+        return self.client.get_many(ids)
+    
+    def stats(self) -> Optional[Dict]:
+        return self.client.get_stats()
+    
+    def scan(self, batch_size: int = 1000) -> Iterator[List[Dict]]:
+        return self.client.scan(batch_size=batch_size)
+
+
+BACKENDS = {
+    'simulated': SimulatedStore,
+    'rest': RestServiceStore,
+    'service': ServiceStore,
+}
+
+def create_store(backend: Optional[str] = None, **options) -> VectorStore:
+    """
+    Build the configured vector store.
+    
+    Args:
+        backend: 'simulated', 'rest' or 'service'.
+                 Defaults to $INTELLIVAULT_BACKEND, then 'simulated'.
+        options: Passed to the adapter (e.g. storage_path, host, port, api_key)
+    """
+    backend = backend or os.getenv('INTELLIVAULT_BACKEND', 'simulated')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    
+    if backend == 'rest':
+        options.setdefault('host', os.getenv('CYBORGDB_HOST', 'localhost'))
+        options.setdefault('port', int(os.getenv('CYBORGDB_PORT', '8001')))
+    if backend == 'service':
+        options.setdefault('api_key', os.getenv('CYBORGDB_API_KEY'))
+    if backend == 'simulated':
+        options.setdefault('storage_path', os.getenv('INTELLIVAULT_STORAGE', 'data/cyborgdb_storage'))
+    
+    store = BACKENDS[backend](**options)
+    logger.info("✓ Vector store ready (%s)", store.name)
+    return store
+
+
+def measure_store(store: VectorStore, documents: List[Dict], queries: List[Dict],
+                  top_k: int = 5, batch_size: int = 100) -> Dict[str, Any]:
+    """
+    Record throughput and latency of the core operations of a store,
+    so backends can be compared on the same workload.
+    """
+    results = {'backend': store.name, 'documents': len(documents)}
+    
+    start = time.perf_counter()
+    for i in range(0, len(documents), batch_size):
+        store.upsert(documents[i:i + batch_size])
+    results['upsert_docs_per_sec'] = len(documents) / (time.perf_counter() - start)
+    
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    results['search_p50_ms'] = float(np.percentile(latencies, 50))
+    results['search_p95_ms'] = float(np.percentile(latencies, 95))
+    
+    ids = [doc['id'] for doc in documents[:batch_size]]
+    start = time.perf_counter()
+    store.get_many(ids)
+    results['get_many_ms'] = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    scanned = sum(len(batch) for batch in store.scan(batch_size=batch_size))
+    results['scan_docs_per_sec'] = scanned / (time.perf_counter() - start)
+    
+    return results
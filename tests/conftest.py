@@ -0,0 +1,17 @@
+"""
+Shared test setup: an EncryptionManager without an explicit key reads and
+writes its key file under the test's tmp_path, never the project's config/.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.encryption import KEY_FILE_ENV
+
+@pytest.fixture(autouse=True)
+def isolated_key_file(tmp_path, monkeypatch):
+    monkeypatch.setenv(KEY_FILE_ENV, str(tmp_path / 'config' / 'encryption_key.json'))
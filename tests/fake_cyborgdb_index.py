@@ -0,0 +1,39 @@
+"""
+In-memory stand-in for a CyborgDB SDK index, used by the service client tests.
+"""
+
+import numpy as np
+
+class FakeIndex:
+    """Stores plaintext vectors by id and answers queries by cosine similarity"""
+    
+    def __init__(self):
+        self.items = {}
+        self.last_upsert = None
+    
+    def upsert(self, ids, vectors, metadata):
+        self.last_upsert = vectors
+        for doc_id, vector, meta in zip(ids, vectors, metadata):
+            self.items[doc_id] = {'id': doc_id, 'vector': np.asarray(vector), 'metadata': meta}
+    
+    def query(self, vector, top_k, filters=None):
+        candidates = [item for item in self.items.values() if all(
+            item['metadata'].get(k) in (v if isinstance(v, list) else [v])
+            for k, v in (filters or {}).items()
+        )]
+        candidates.sort(key=lambda item: -float(np.dot(item['vector'], vector)))
+        return [{'id': item['id'], 'metadata': item['metadata']} for item in candidates[:top_k]]
+    
+    def get(self, ids):
+        return [self.items[doc_id] for doc_id in ids if doc_id in self.items]
+    
+    def delete(self, ids):
+        for doc_id in ids:
+            self.items.pop(doc_id, None)
+    
+    def list_ids(self):
+        return list(self.items)
+    
+    def describe(self):
+        dimension = len(next(iter(self.items.values()))['vector']) if self.items else 0
+        return {'vector_count': len(self.items), 'dimension': dimension}
@@ -0,0 +1,179 @@
+"""
+Local stand-in for the CyborgDB REST service, used by the client tests.
+Runs in a background thread on a free port and records what it received.
+"""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+class MockCyborgDBService:
+    """Minimal in-memory CyborgDB REST service"""
+    
+    def __init__(self, fail_first=0, fail_status=503, latency=0.0):
+        """
+        Args:
+            fail_first: Answer this many requests with fail_status before serving
+            fail_status: Status code used for the injected failures
+            latency: Seconds to sleep per request (simulates a remote service)
+        """
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.latency = latency
+        self.collections = {}
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    
+    @property
+    def port(self):
+        return self.server.server_address[1]
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def _make_handler(self):
+        service = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+            
+            def log_message(self, *args):
+                pass
+            
+            def _body(self):
+                raw = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                encoding = self.headers.get('Content-Encoding')
+                size = len(raw)
+                if encoding == 'gzip':
+                    raw = gzip.decompress(raw)
+                if not raw:
+                    payload = None
+                elif self.headers.get('Content-Type') == 'application/msgpack':
+                    payload = msgpack.unpackb(raw, raw=False)
+                else:
+                    payload = json.loads(raw)
+                return payload, size, encoding
+            
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def _handle(self, method):
+                payload, size, encoding = self._body() if method == 'POST' else (None, 0, None)
+                
+                with service.lock:
+                    service.connections.add(self.client_address)
+                    service.requests.append({
+                        'method': method, 'path': self.path,
+                        'bytes': size, 'encoding': encoding
+                    })
+                    failing = service.fail_first > 0
+                    if failing:
+                        service.fail_first -= 1
+                    service.in_flight += 1
+                    service.max_in_flight = max(service.max_in_flight, service.in_flight)
+                
+                if service.latency:
+                    threading.Event().wait(service.latency)
+                
+                with service.lock:
+                    service.in_flight -= 1
+                
+                if failing:
+                    return self._reply(service.fail_status, {'error': 'injected'})
+                
+                self._reply(*service.route(method, self.path, payload))
+            
+            def do_GET(self):
+                self._handle('GET')
+            
+            def do_POST(self):
+                self._handle('POST')
+        
+        return Handler
+    
+    def route(self, method, path, payload):
+        """Dispatch a request, returning (status, response payload)"""
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        
+        if method == 'POST' and path == '/collections':
+            with self.lock:
+                if payload['name'] in self.collections:
+                    return 409, {'error': 'exists'}
+                self.collections[payload['name']] = {
+                    'dimension': payload['dimension'], 'documents': []
+                }
+            return 201, {'name': payload['name']}
+        
+        if method == 'POST' and path == '/insert':
+            with self.lock:
+                collection = self.collections.setdefault(
+                    payload['collection'], {'dimension': 384, 'documents': []}
+                )
+                # Upsert semantics: a document replaces any entry with the same id
+                incoming = {d['id'] for d in payload['documents']}
+                collection['documents'] = [d for d in collection['documents']
+                                           if d['id'] not in incoming] + payload['documents']
+            return 200, {'inserted': len(payload['documents'])}
+        
+        if method == 'POST' and path == '/search':
+            documents = self.collections.get(payload['collection'], {}).get('documents', [])
+            filters = payload.get('filters') or {}
+            documents = [d for d in documents if all(
+                d['metadata'].get(k) in (v if isinstance(v, list) else [v])
+                for k, v in filters.items()
+            )]
+            return 200, {'results': documents[:payload['top_k']]}
+        
+        if method == 'POST' and path == '/delete':
+            with self.lock:
+                collection = self.collections.get(payload['collection'], {'documents': []})
+                doomed = set(payload['ids'])
+                before = len(collection['documents'])
+                collection['documents'] = [d for d in collection['documents'] if d['id'] not in doomed]
+            return 200, {'deleted': before - len(collection['documents'])}
+        
+        if method == 'POST' and path == '/get':
+            documents = self.collections.get(payload['collection'], {}).get('documents', [])
+            wanted = set(payload['ids'])
+            return 200, {'results': [d for d in documents if d['id'] in wanted]}
+        
+        if method == 'GET' and path.startswith('/collections/') and '/scan?' in path:
+            name = path.split('/')[2]
+            query = dict(part.split('=') for part in path.split('?', 1)[1].split('&'))
+            offset, limit = int(query['offset']), int(query['limit'])
+            documents = self.collections.get(name, {}).get('documents', [])
+            return 200, {'results': documents[offset:offset + limit]}
+        
+        if method == 'GET' and path.startswith('/collections/') and path.endswith('/stats'):
+            name = path.split('/')[2]
+            if name not in self.collections:
+                return 404, {'error': 'not found'}
+            collection = self.collections[name]
+            return 200, {'count': len(collection['documents']),
+                         'dimension': collection['dimension']}
+        
+        return 404, {'error': 'not found'}
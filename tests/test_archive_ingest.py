@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test ingestion straight from zip and tar.gz archives: nothing extracted
+to disk, and unchanged members skipped on later runs.
+"""
+
+import io
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from src.encryption import EncryptionManager
+from src.ingest import DocumentIngestor, iter_archive
+from src.vector_store import SimulatedStore
+
+DIM = 8
+
+class FakeEmbedder:
+    def generate_batch_embeddings(self, texts):
+        return np.stack([np.random.default_rng(len(t)).standard_normal(DIM).astype(np.float32)
+                         for t in texts])
+
+DOCS = {'drop/hr_001.txt': 'leave policy', 'drop/legal_002.txt': 'word ' * 1200, 'drop/notes.md': 'skip'}
+
+def write_zip(path, docs):
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, text in docs.items():
+            archive.writestr(name, text)
+
+def write_tar(path, docs):
+    with tarfile.open(path, 'w:gz') as archive:
+        for name, text in docs.items():
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+@pytest.fixture
+def ingestor(tmp_path):
+    store = SimulatedStore(storage_path=tmp_path / 'store')
+    store.create_collection(dimension=DIM)
+    return DocumentIngestor(EncryptionManager(master_key=bytes(32)), FakeEmbedder(), store)
+
+@pytest.mark.parametrize('write', [write_zip, write_tar])
+def test_members_streamed_without_extraction(tmp_path, write):
+    path = tmp_path / ('drop.zip' if write is write_zip else 'drop.tar.gz')
+    write(path, DOCS)
+    before = set(tmp_path.rglob('*'))
+    
+    members = {name: data for name, _, data in iter_archive(path, workers=2)}
+    
+    assert members == {name: text.encode() for name, text in DOCS.items() if name.endswith('.txt')}
+    assert set(tmp_path.rglob('*')) == before
+
+@pytest.mark.parametrize('write', [write_zip, write_tar])
+def test_unchanged_members_are_skipped(tmp_path, ingestor, write):
+    path = tmp_path / ('drop.zip' if write is write_zip else 'drop.tar.gz')
+    state = tmp_path / 'state.json'
+    write(path, DOCS)
+    
+    assert ingestor.ingest_archive(path, state_path=state) == {'ingested': 2, 'unchanged': 0, 'failed': 0}
+    assert ingestor.db.stats()['count'] == 1 + 3
+    
+    # legal_002 shrinks to one chunk; its two stale chunks go with the old version
+    write(path, dict(DOCS, **{'drop/legal_002.txt': 'short now'}))
+    assert ingestor.ingest_archive(path, state_path=state) == {'ingested': 1, 'unchanged': 1, 'failed': 0}
+    assert ingestor.db.stats()['live'] == 2
+    assert ingestor.db.get_many(['drop/legal_002_chunk_0'])[0]['metadata']['content'] == 'short now'
+
+def test_members_with_the_same_file_name_keep_their_own_chunks(tmp_path, ingestor):
+    path = tmp_path / 'drop.zip'
+    state = tmp_path / 'state.json'
+    write_zip(path, {'a/report.txt': 'word ' * 1200, 'b/report.txt': 'quarterly figures'})
+    
+    assert ingestor.ingest_archive(path, state_path=state)['ingested'] == 2
+    assert ingestor.db.stats()['count'] == 3 + 1
+    
+    # Shrinking a/report.txt must not touch b/report.txt's chunk
+    write_zip(path, {'a/report.txt': 'short now', 'b/report.txt': 'quarterly figures'})
+    ingestor.ingest_archive(path, state_path=state)
+    a_0, a_1, b_0 = ingestor.db.get_many(['a/report_chunk_0', 'a/report_chunk_1', 'b/report_chunk_0'])
+    assert a_0['metadata']['content'] == 'short now' and a_1 is None
+    assert b_0['metadata']['content'] == 'quarterly figures'
+
+def test_chunks_under_file_name_ids_are_replaced(tmp_path, ingestor):
+    # State written when ids were the bare file name
+    path = tmp_path / 'drop.zip'
+    state = tmp_path / 'state.json'
+    write_zip(path, {'drop/hr_001.txt': 'leave policy'})
+    ingestor.ingest_text('hr_001.txt', 'old leave policy')
+    state.write_text('{"drop/hr_001.txt": {"fingerprint": "old", "chunks": 1}}')
+    
+    ingestor.ingest_archive(path, state_path=state)
+    old, new = ingestor.db.get_many(['hr_001_chunk_0', 'drop/hr_001_chunk_0'])
+    assert old is None and new['metadata']['content'] == 'leave policy'
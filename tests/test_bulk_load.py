@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test bulk loading of precomputed embeddings from .npy/.npz plus JSONL
+metadata, without an embedding model.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from src.bulk_load import bulk_load, open_embeddings
+from src.encryption import EncryptionManager
+from src.reduction import PCAReducer
+from src.vector_store import SimulatedStore
+
+ENC = EncryptionManager(master_key=bytes(32))
+
+@pytest.fixture
+def corpus(tmp_path):
+    vectors = np.random.default_rng(0).standard_normal((250, 12)).astype(np.float32)
+    with open(tmp_path / 'meta.jsonl', 'w') as f:
+        for i in range(len(vectors)):
+            f.write(json.dumps({'id': f"doc_{i}", 'content': f"text {i}"}) + '\n')
+    return vectors, tmp_path / 'meta.jsonl'
+
+def test_npy_loads_in_one_version(tmp_path, corpus):
+    vectors, metadata = corpus
+    np.save(tmp_path / 'vectors.npy', vectors)
+    store = SimulatedStore(storage_path=tmp_path / 'store')
+    
+    stats = bulk_load(store, ENC, tmp_path / 'vectors.npy', metadata_path=metadata, batch_size=64)
+    
+    assert stats['records'] == 250 and stats['dimension'] == 12
+    assert store.db.versions(store.collection) == [2]  # created, then one write for four batches
+    records = store.get_many(['doc_0', 'doc_249'])
+    assert records[1]['metadata'] == {'content': 'text 249'}
+    assert np.array_equal(ENC.decrypt_vectors([r['vector'] for r in records]), vectors[[0, 249]])
+
+def test_npz_is_streamed_and_reducer_applied(tmp_path, corpus):
+    vectors, metadata = corpus
+    np.savez_compressed(tmp_path / 'corpus.npz', vectors=vectors, other=np.zeros(3))
+    shape, batches = open_embeddings(tmp_path / 'corpus.npz', key='vectors', batch_size=100)
+    assert shape == (250, 12) and [len(b) for b in batches] == [100, 100, 50]
+    
+    store = SimulatedStore(storage_path=tmp_path / 'store')
+    reducer = PCAReducer.fit(vectors, 4)
+    store.create_collection(dimension=4)
+    store.save_reducer(reducer.to_encrypted(ENC))
+    
+    bulk_load(store, ENC, tmp_path / 'corpus.npz', metadata_path=metadata, key='vectors')
+    
+    stored = ENC.decrypt_vector(store.get_many(['doc_7'])[0]['vector'])
+    assert np.allclose(stored, reducer.transform(vectors[7]), atol=1e-5)
+    with pytest.raises(ValueError):
+        open_embeddings(tmp_path / 'corpus.npz')  # two arrays, no key
+
+def test_metadata_row_mismatch_writes_nothing(tmp_path, corpus):
+    vectors, _ = corpus
+    np.save(tmp_path / 'vectors.npy', vectors)
+    (tmp_path / 'short.jsonl').write_text('{"content": "only one"}\n')
+    store = SimulatedStore(storage_path=tmp_path / 'store')
+    
+    with pytest.raises(ValueError):
+        bulk_load(store, ENC, tmp_path / 'vectors.npy', metadata_path=tmp_path / 'short.jsonl')
+    
+    assert store.stats()['count'] == 0
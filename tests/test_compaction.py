@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test tombstone deletes and compaction in SimulatedCyborgDB: deleted records
+disappear at once, stats report live/dead records and reclaimable bytes,
+and compaction (explicit, piggybacked on writes, or in the background)
+reclaims them.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.cyborgdb_sim import SimulatedCyborgDB
+from src.vector_store import SimulatedStore
+
+def docs(count, department=lambda i: 'hr' if i % 2 else 'finance'):
+    return [{'id': f"doc_{i}", 'vector': {'ciphertext': 'x' * 100},
+             'metadata': {'i': i, 'department': department(i)}} for i in range(count)]
+
+def live_ids(db):
+    return {entry['id'] for entry in db.search('c', {}, top_k=10**6)}
+
+def populated(tmp_path, count=100):
+    db = SimulatedCyborgDB(storage_path=tmp_path)
+    db.create_collection('c', dimension=4)
+    db.upsert('c', docs(count))
+    return db
+
+def test_deletes_are_tombstones_hidden_immediately(tmp_path):
+    db = populated(tmp_path)
+    size_before = (tmp_path / 'c.pkl').stat().st_size
+    generation = db.versions('c')[-1]
+    
+    assert db.delete('c', ['doc_0', 'doc_1', 'missing']) == 2
+    assert db.delete('c', ['doc_0']) == 0
+    assert db.delete_by_filter('c', {'department': 'hr', 'i': [3, 5, 7]}) == 3
+    
+    # Nothing was rewritten, yet every read path hides the records
+    assert db.versions('c')[-1] == generation
+    assert (tmp_path / 'c.pkl').stat().st_size == size_before
+    assert len(live_ids(db)) == 95 and 'doc_0' not in live_ids(db)
+    assert db.get('c', 'doc_1') is None and db.get_many('c', ['doc_3', 'doc_4'])[0] is None
+    assert sum(len(batch) for batch in db.scan('c')) == 95
+    assert len(SimulatedCyborgDB(storage_path=tmp_path).search('c', {}, top_k=1000)) == 95
+    
+    stats = db.get_collection_stats('c')
+    assert (stats['live'], stats['dead']) == (95, 5)
+    assert stats['reclaimable_bytes'] > 5 * 100
+
+def test_compaction_reclaims_space_and_deleted_ids_can_return(tmp_path):
+    db = populated(tmp_path, count=1000)
+    db.delete_by_filter('c', {'department': 'hr'})
+    size_before = (tmp_path / 'c.pkl').stat().st_size
+    
+    assert db.compact('c') == 500
+    assert db.compact('c') == 0
+    assert (tmp_path / 'c.pkl').stat().st_size < size_before * 0.6
+    stats = db.get_collection_stats('c')
+    assert (stats['live'], stats['dead'], stats['reclaimable_bytes']) == (500, 0, 0)
+    
+    # Deleting then re-adding an id, before or after compaction
+    db.delete('c', ['doc_0'])
+    db.upsert('c', [docs(2)[1]])
+    db.insert('c', 'doc_0', {'ciphertext': 'again'}, {})
+    assert {'doc_0', 'doc_1'} <= live_ids(db) and len(live_ids(db)) == 501
+    assert db.get('c', 'doc_0')['vector']['ciphertext'] == 'again'
+    db.close()
+
+def test_background_compactor_and_store_api(tmp_path):
+    store = SimulatedStore(storage_path=tmp_path, collection='c')
+    store.create_collection(dimension=4)
+    store.upsert(docs(200))
+    
+    assert store.delete_by_filter({'department': 'finance'}) == 100
+    store.db.start_compactor(interval=0.05, min_dead_ratio=0.25)
+    
+    deadline = time.time() + 5
+    while store.stats()['dead'] and time.time() < deadline:
+        time.sleep(0.05)
+    store.db.close()
+    
+    assert store.stats()['dead'] == 0 and store.stats()['count'] == 100
+    assert not (tmp_path / 'c.tombstones.json').exists()
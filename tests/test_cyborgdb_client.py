@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test the pooled, retrying CyborgDB REST clients against a local stand-in service.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.cyborgdb_client import CyborgDBClient, AsyncCyborgDBClient
+from mock_cyborgdb_service import MockCyborgDBService
+
+def make_documents(n, dimension=384):
+    return [{
+        'id': f"doc_{i}_chunk_0",
+        'vector': {'ciphertext': 'A' * (dimension * 4 // 3), 'nonce': 'A' * 24,
+                   'tag': 'A' * 24, 'shape': [dimension], 'dtype': 'float32'},
+        'metadata': {'doc_id': f"doc_{i}", 'content': 'confidential ' * 20}
+    } for i in range(n)]
+
+def test_connections_are_reused():
+    with MockCyborgDBService() as service:
+        client = CyborgDBClient(port=service.port)
+        client.create_collection(dimension=384)
+        client.batch_insert(make_documents(5))
+        for _ in range(20):
+            assert len(client.encrypted_search({'ciphertext': 'q'}, top_k=3)) == 3
+        assert client.get_stats()['count'] == 5
+        client.close()
+        
+        assert len(service.requests) == 24
+        assert len(service.connections) == 1
+
+def test_large_bodies_are_gzipped():
+    with MockCyborgDBService() as service:
+        with CyborgDBClient(port=service.port, gzip_min_bytes=1024) as client:
+            client.batch_insert(make_documents(50))
+        
+        insert = [r for r in service.requests if r['path'] == '/insert'][0]
+        assert insert['encoding'] == 'gzip'
+        assert service.collections['intellivault_vectors']['documents'][0]['id'] == 'doc_0_chunk_0'
+
+def test_idempotent_calls_retry_with_backoff():
+    with MockCyborgDBService() as service:
+        client = CyborgDBClient(port=service.port, backoff_factor=0.001)
+        service.fail_first = 2
+        
+        assert client.get_stats() is None  # collection missing, but served after retries
+        assert [r['path'] for r in service.requests].count('/collections/intellivault_vectors/stats') == 3
+
+def test_inserts_are_not_retried():
+    with MockCyborgDBService() as service:
+        client = CyborgDBClient(port=service.port, backoff_factor=0.001)
+        service.fail_first = 1
+        
+        client.batch_insert(make_documents(3))
+        
+        assert [r['path'] for r in service.requests].count('/insert') == 1
+        assert 'intellivault_vectors' not in service.collections
+
+def test_async_client():
+    async def run(port):
+        async with AsyncCyborgDBClient(port=port, backoff_factor=0.001) as client:
+            assert await client.health()
+            assert await client.create_collection(384)
+            assert await client.batch_insert(make_documents(10))
+            results = await asyncio.gather(*[
+                client.encrypted_search({'ciphertext': 'q'}, top_k=4) for _ in range(8)
+            ])
+            assert all(len(r) == 4 for r in results)
+            return await client.get_stats()
+    
+    with MockCyborgDBService(fail_first=1) as service:
+        stats = asyncio.run(run(service.port))
+        assert stats == {'name': 'intellivault_vectors', 'count': 10, 'dimension': 384}
+
+def inserted_ids(service):
+    return [d['id'] for d in service.collections['intellivault_vectors']['documents']]
+
+def test_batch_insert_splits_into_bounded_batches():
+    with MockCyborgDBService() as service:
+        client = CyborgDBClient(port=service.port, max_batch_docs=40, max_in_flight=1)
+        summary = client.batch_insert(make_documents(100))
+        
+        inserts = [r for r in service.requests if r['path'] == '/insert']
+        assert summary['batches'] == summary['acked'] == len(inserts) == 3
+        assert inserted_ids(service) == [f"doc_{i}_chunk_0" for i in range(100)]
+        
+        service.collections.clear()
+        small = CyborgDBClient(port=service.port, max_batch_bytes=8 * 1024, max_in_flight=1)
+        summary = small.batch_insert(make_documents(100))
+        assert summary['batches'] > 3
+        assert summary['bytes'] / summary['batches'] <= 8 * 1024 + 64
+        assert len(inserted_ids(service)) == 100
+
+def test_pipelined_uploads_respect_window():
+    with MockCyborgDBService(latency=0.02) as service:
+        client = CyborgDBClient(port=service.port, max_batch_docs=10, max_in_flight=3)
+        summary = client.batch_insert(make_documents(120))
+        
+        assert summary['acked'] == 12
+        assert 1 < service.max_in_flight <= 3
+        assert sorted(inserted_ids(service)) == sorted(f"doc_{i}_chunk_0" for i in range(120))
+
+def test_batch_insert_resumes_from_progress(tmp_path):
+    progress = tmp_path / 'insert.progress'
+    documents = make_documents(50)
+    
+    with MockCyborgDBService() as service:
+        client = CyborgDBClient(port=service.port, max_batch_docs=10, max_in_flight=2)
+        service.fail_first = 2
+        
+        first = client.batch_insert(documents, progress_file=str(progress))
+        assert first['acked'] == 3 and len(first['failed']) == 2
+        
+        second = client.batch_insert(documents, progress_file=str(progress))
+        assert second['skipped'] == 30 and second['acked'] == 2 and not second['failed']
+        assert sorted(inserted_ids(service)) == sorted(d['id'] for d in documents)
+
+def test_resume_survives_a_different_batch_size(tmp_path):
+    progress = tmp_path / 'insert.progress'
+    documents = make_documents(50)
+    
+    with MockCyborgDBService() as service:
+        first = CyborgDBClient(port=service.port, max_batch_docs=10, max_in_flight=1)
+        service.fail_first = 1
+        first.batch_insert(documents, progress_file=str(progress))
+        
+        rerun = CyborgDBClient(port=service.port, max_batch_docs=7, max_in_flight=1).batch_insert(
+            documents, progress_file=str(progress))
+        assert rerun['skipped'] == 40 and rerun['documents'] == 10
+        assert sorted(inserted_ids(service)) == sorted(d['id'] for d in documents)
+
+def test_bytes_count_the_compressed_payload():
+    with MockCyborgDBService() as service:
+        plain = CyborgDBClient(port=service.port, compress_requests=False).batch_insert(make_documents(50))
+        gzipped = CyborgDBClient(port=service.port, gzip_min_bytes=1024).batch_insert(make_documents(50))
+        
+        assert gzipped['bytes'] < plain['bytes'] / 2
+        assert gzipped['bytes'] == sum(r['bytes'] for r in service.requests if r['path'] == '/insert'
+                                       and r['encoding'] == 'gzip')
+
+def test_msgpack_payload_is_smaller():
+    with MockCyborgDBService() as service:
+        as_json = CyborgDBClient(port=service.port, compress_requests=False)
+        as_msgpack = CyborgDBClient(port=service.port, compress_requests=False,
+                                    payload_format='msgpack')
+        
+        json_bytes = as_json.batch_insert(make_documents(20))['bytes']
+        msgpack_bytes = as_msgpack.batch_insert(make_documents(20))['bytes']
+        
+        assert msgpack_bytes < json_bytes
+        stored = service.collections['intellivault_vectors']['documents'][-1]
+        assert isinstance(stored['vector']['ciphertext'], bytes)
+
+def test_pipelined_insert_throughput():
+    """Measure ingestion throughput against a mock service with 10ms per request"""
+    documents = make_documents(400)
+    rates = {}
+    for window in (1, 4):
+        with MockCyborgDBService(latency=0.01) as service:
+            client = CyborgDBClient(port=service.port, max_batch_docs=20, max_in_flight=window)
+            start = time.perf_counter()
+            client.batch_insert(documents)
+            rates[window] = len(documents) / (time.perf_counter() - start)
+    
+    print(f"\n  Insert throughput: window=1 {rates[1]:.0f} docs/s, window=4 {rates[4]:.0f} docs/s")
+    assert rates[4] > rates[1]
+
+if __name__ == "__main__":
+    test_connections_are_reused()
+    test_large_bodies_are_gzipped()
+    test_idempotent_calls_retry_with_backoff()
+    test_inserts_are_not_retried()
+    test_async_client()
+    test_batch_insert_splits_into_bounded_batches()
+    test_pipelined_uploads_respect_window()
+    test_msgpack_payload_is_smaller()
+    test_pipelined_insert_throughput()
+    print("✓ CyborgDB client tests passed")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test near-duplicate chunk detection: templated chunks are stored once,
+listed as duplicates of the canonical chunk, found across runs, and kept
+consistent when chunks are re-ingested or deleted.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.dedup import ChunkDeduplicator
+from src.encryption import EncryptionManager
+from src.ingest import DocumentIngestor
+from src.vector_store import SimulatedStore
+
+DIM = 8
+ENC = EncryptionManager(master_key=bytes(32))
+BOILERPLATE = ' '.join(f"clause{i} contains proprietary methodologies and confidential analysis"
+                       for i in range(40))
+
+class FakeEmbedder:
+    def __init__(self):
+        self.embedded = 0
+    
+    def generate_batch_embeddings(self, texts):
+        self.embedded += len(texts)
+        return np.stack([np.random.default_rng(len(t)).standard_normal(DIM).astype(np.float32)
+                         for t in texts])
+
+def ingestor_for(tmp_path):
+    store = SimulatedStore(storage_path=tmp_path / 'store')
+    if store.stats() is None:
+        store.create_collection(dimension=DIM)
+    return DocumentIngestor(ENC, FakeEmbedder(), store, dedup=ChunkDeduplicator(tmp_path / 'dedup.jsonl'))
+
+def test_signature_similarity_tracks_jaccard():
+    dedup = ChunkDeduplicator()
+    base = dedup.signature(BOILERPLATE + " prepared for acme")
+    assert np.mean(base == dedup.signature(BOILERPLATE + " prepared for globex")) > 0.9
+    assert np.mean(base == dedup.signature("quarterly revenue grew twelve percent in the north region")) < 0.1
+
+def test_duplicates_reference_the_canonical_chunk(tmp_path):
+    ingestor = ingestor_for(tmp_path)
+    ingestor.ingest_text('finance_001.txt', BOILERPLATE + " prepared for acme")
+    ingestor.ingest_text('finance_002.txt', BOILERPLATE + " prepared for globex")
+    ingestor.ingest_text('hr_003.txt', "vacation requests need two weeks notice and manager approval")
+    
+    assert ingestor.emb.embedded == 2
+    assert ingestor.db.stats()['count'] == 2
+    canonical = ingestor.db.get_many(['finance_001_chunk_0'])[0]
+    assert canonical['metadata']['duplicates'] == [
+        {'id': 'finance_002_chunk_0', 'doc_id': 'finance_002', 'chunk_index': 0, 'total_chunks': 1,
+         'content': BOILERPLATE + " prepared for globex"}]
+    assert ingestor.stats['duplicate_chunks'] == 1
+    assert ingestor.stats['bytes_saved'] > 0 and ingestor.stats['embedding_seconds_saved'] > 0
+    
+    # Search returns the template once, however many documents share it
+    results = ingestor.db.search(ENC.encrypt_vector(np.ones(DIM, dtype=np.float32)), top_k=10)
+    assert sorted(r['id'] for r in results) == ['finance_001_chunk_0', 'hr_003_chunk_0']
+
+def test_index_persists_across_runs(tmp_path):
+    ingestor_for(tmp_path).ingest_text('legal_001.txt', BOILERPLATE + " matter 17")
+    
+    later = ingestor_for(tmp_path)
+    later.ingest_text('legal_002.txt', BOILERPLATE + " matter 18")
+    later.ingest_text('legal_002.txt', BOILERPLATE + " matter 18")  # re-ingested: listed once
+    
+    assert later.emb.embedded == 0
+    duplicates = later.db.get_many(['legal_001_chunk_0'])[0]['metadata']['duplicates']
+    assert [d['id'] for d in duplicates] == ['legal_002_chunk_0']
+
+def test_reingested_canonical_keeps_or_promotes_other_documents_duplicates(tmp_path):
+    ingestor = ingestor_for(tmp_path)
+    ingestor.ingest_text('finance_001.txt', BOILERPLATE + " prepared for acme")
+    ingestor.ingest_text('finance_002.txt', BOILERPLATE + " prepared for globex")
+    
+    # Same text again: globex stays listed under the canonical chunk
+    ingestor.ingest_text('finance_001.txt', BOILERPLATE + " prepared for acme")
+    duplicates = ingestor.db.get_many(['finance_001_chunk_0'])[0]['metadata']['duplicates']
+    assert [d['id'] for d in duplicates] == ['finance_002_chunk_0']
+    
+    # New text: globex is promoted with the vector it was found by, and the old
+    # signature no longer matches (a third copy of the template is a duplicate of globex)
+    old_vector = ingestor.db.get_many(['finance_001_chunk_0'])[0]['vector']
+    ingestor.ingest_text('finance_001.txt', "quarterly revenue grew twelve percent in the north region")
+    rewritten, promoted = ingestor.db.get_many(['finance_001_chunk_0', 'finance_002_chunk_0'])
+    assert 'duplicates' not in rewritten['metadata']
+    assert promoted['vector'] == old_vector
+    assert promoted['metadata']['content'] == BOILERPLATE + " prepared for globex"
+    
+    ingestor.ingest_text('finance_003.txt', BOILERPLATE + " prepared for initech")
+    assert ingestor.dedup.duplicate_of['finance_003_chunk_0'] == 'finance_002_chunk_0'
+    assert ingestor_for(tmp_path).dedup.duplicate_of == ingestor.dedup.duplicate_of
+
+def test_rewritten_duplicate_leaves_its_canonical(tmp_path):
+    ingestor = ingestor_for(tmp_path)
+    ingestor.ingest_text('finance_001.txt', BOILERPLATE + " prepared for acme")
+    ingestor.ingest_text('finance_002.txt', BOILERPLATE + " prepared for globex")
+    ingestor.ingest_text('finance_002.txt', "vacation requests need two weeks notice and manager approval")
+    
+    canonical, rewritten = ingestor.db.get_many(['finance_001_chunk_0', 'finance_002_chunk_0'])
+    assert 'duplicates' not in canonical['metadata']
+    assert rewritten['metadata']['content'].startswith('vacation')
+    
+    # And a canonical rewritten into a duplicate loses its own record
+    ingestor.ingest_text('finance_002.txt', BOILERPLATE + " prepared for globex")
+    assert ingestor.db.get_many(['finance_002_chunk_0']) == [None]
+    assert ingestor.db.stats()['live'] == 1
+
+def test_deleted_canonical_promotes_its_duplicates(tmp_path):
+    ingestor = ingestor_for(tmp_path)
+    for i, client in enumerate(['acme', 'globex', 'initech']):
+        ingestor.ingest_text(f"legal_00{i}.txt", BOILERPLATE + f" prepared for {client}")
+    
+    assert ingestor.delete_chunks(['legal_000_chunk_0']) == 1
+    promoted = ingestor.db.get_many(['legal_001_chunk_0'])[0]
+    assert [d['id'] for d in promoted['metadata']['duplicates']] == ['legal_002_chunk_0']
+    
+    # Deleting a duplicate drops it from its canonical's list
+    ingestor.delete_chunks(['legal_002_chunk_0'])
+    assert 'duplicates' not in ingestor.db.get_many(['legal_001_chunk_0'])[0]['metadata']
+    
+    later = ingestor_for(tmp_path)
+    later.ingest_text('legal_003.txt', BOILERPLATE + " prepared for hooli")
+    assert later.emb.embedded == 0
+    assert later.dedup.duplicate_of['legal_003_chunk_0'] == 'legal_001_chunk_0'
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the shared embedding service: remote encoding over a unix socket,
+micro-batching of concurrent requests, and in-process fallback.
+"""
+
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from src.embedding_server import EmbeddingServer, RemoteEncoder
+
+ROOT = Path(__file__).parent.parent
+
+class FakeModel:
+    """Deterministic 'embeddings' that record how texts were batched"""
+    
+    def __init__(self, dimension=16):
+        self.dimension = dimension
+        self.calls = []
+        self.lock = threading.Lock()
+    
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+    
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else sentences
+        with self.lock:
+            self.calls.append(len(texts))
+        vectors = np.stack([np.random.default_rng(sum(map(ord, t))).random(self.dimension)
+                            for t in texts]).astype(np.float32)
+        return vectors[0] if single else vectors
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / 'embed.sock')
+
+def test_remote_encoding_matches_local(socket_path):
+    model = FakeModel()
+    with EmbeddingServer(model, socket_path=socket_path):
+        remote = RemoteEncoder(socket_path)
+        
+        assert remote.get_sentence_embedding_dimension() == 16
+        assert np.array_equal(remote.encode("hello"), model.encode("hello"))
+        texts = ["alpha", "beta", "gamma"]
+        assert np.array_equal(remote.encode(texts), model.encode(texts))
+
+def test_concurrent_requests_share_batches(socket_path):
+    model = FakeModel()
+    with EmbeddingServer(model, socket_path=socket_path, max_batch=64, max_wait_ms=20) as server:
+        remote = RemoteEncoder(socket_path)
+        model.calls.clear()
+        
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda i: remote.encode(f"query {i}"), range(64)))
+        
+        assert all(np.array_equal(r, model.encode(f"query {i}")) for i, r in enumerate(results))
+        print(f"\n  64 concurrent requests -> {server.batcher.batches} model calls")
+        assert server.batcher.batches < 32
+
+def test_server_errors_are_reported(socket_path):
+    class Broken(FakeModel):
+        def encode(self, *args, **kwargs):
+            raise ValueError("out of memory")
+    
+    with EmbeddingServer(Broken(), socket_path=socket_path):
+        remote = RemoteEncoder(socket_path)
+        with pytest.raises(RuntimeError, match="out of memory"):
+            remote.encode("x")
+        # The connection stays usable after an error reply
+        assert remote.get_sentence_embedding_dimension() == 16
+
+def test_falls_back_to_local_model_when_service_down(socket_path):
+    local = FakeModel()
+    remote = RemoteEncoder(socket_path, fallback=lambda: local)
+    
+    assert np.array_equal(remote.encode("hello"), local.encode("hello"))
+    
+    with pytest.raises(OSError):
+        RemoteEncoder(socket_path)
+
+def test_remote_worker_does_not_load_torch(socket_path):
+    """A worker using the service never imports the model stack"""
+    with EmbeddingServer(FakeModel(), socket_path=socket_path):
+        code = ("import sys; from src.embeddings import EmbeddingGenerator; "
+                f"gen = EmbeddingGenerator(backend='remote', socket_path={socket_path!r}, fallback=False); "
+                "gen.generate_batch_embeddings(['a', 'b']); "
+                "print('torch' in sys.modules)")
+        out = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout
+    assert out.strip() == 'False'
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test the encryption key hierarchy: key-id tagging, derived data keys with
+a bounded cache lifetime, and reading records across a master key rotation.
+"""
+
+import base64
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+from Crypto.Cipher import AES
+
+from src.encryption import EncryptionManager, key_id
+
+VECTOR = np.arange(8, dtype=np.float32)
+
+def test_records_are_tagged_with_their_key_id():
+    enc = EncryptionManager(master_key=bytes(32))
+    record = enc.encrypt_vector(VECTOR)
+    
+    assert record['key_id'] == enc.key_id == key_id(bytes(32))
+    assert not enc.needs_reencryption(record)
+    assert np.array_equal(enc.decrypt_vector(record), VECTOR)
+    assert np.array_equal(enc.decrypt_vectors([record, record]), np.stack([VECTOR, VECTOR]))
+
+def test_untagged_legacy_records_still_decrypt():
+    # Records written before key ids: 16-byte PyCryptodome nonce, no key_id
+    cipher = AES.new(bytes(32), AES.MODE_GCM)
+    ciphertext, tag = cipher.encrypt_and_digest(VECTOR.tobytes())
+    legacy = {'ciphertext': base64.b64encode(ciphertext).decode(),
+              'nonce': base64.b64encode(cipher.nonce).decode(),
+              'tag': base64.b64encode(tag).decode(), 'shape': (8,), 'dtype': 'float32'}
+    
+    enc = EncryptionManager(master_key=bytes(32))
+    assert np.array_equal(enc.decrypt_vector(legacy), VECTOR)
+    assert enc.needs_reencryption(legacy)
+    assert enc.reencrypt(legacy)['key_id'] == enc.key_id
+
+def test_data_keys_are_derived_cached_and_expire():
+    enc = EncryptionManager(master_key=bytes(32), data_key_ttl=60)
+    docs = enc.for_collection('docs')
+    
+    assert enc.for_collection('docs') is docs
+    assert docs.master_key == enc.derive_key('collection:docs')
+    assert len({docs.key_id, enc.for_tenant('docs').key_id, enc.key_id}) == 3
+    
+    with pytest.raises(KeyError):
+        enc.decrypt_vector(docs.encrypt_vector(VECTOR))
+    
+    expiring = EncryptionManager(master_key=bytes(32), data_key_ttl=0)
+    first = expiring.for_collection('docs')
+    assert expiring.for_collection('docs') is not first
+    assert expiring.for_collection('docs').key_id == first.key_id
+
+def test_collection_keys_read_records_sealed_with_the_master_key():
+    enc = EncryptionManager(master_key=bytes(32))
+    legacy = enc.encrypt_vector(VECTOR)
+    enc.master_key = bytes(range(32))
+    docs = enc.for_collection('docs')
+    
+    assert np.array_equal(docs.decrypt_vector(legacy), VECTOR)
+    assert docs.needs_reencryption(legacy)
+    assert docs.reencrypt(legacy)['key_id'] == docs.key_id != enc.key_id
+    # Tenant keys never had master-sealed records to migrate
+    with pytest.raises(KeyError):
+        enc.for_tenant('hr').decrypt_vector(legacy)
+
+def test_rotation_keeps_old_records_readable():
+    enc = EncryptionManager(master_key=bytes(32))
+    old_record = enc.encrypt_vector(VECTOR)
+    old_tenant_record = enc.for_tenant('hr').encrypt_vector(VECTOR)
+    
+    enc.master_key = bytes(range(32))
+    
+    new_record = enc.encrypt_vector(VECTOR)
+    assert new_record['key_id'] != old_record['key_id']
+    assert np.array_equal(enc.decrypt_vector(old_record), VECTOR)
+    assert enc.needs_reencryption(old_record) and not enc.needs_reencryption(new_record)
+    
+    # Derived keys follow the new master but can still read what the old one sealed
+    hr = enc.for_tenant('hr')
+    assert hr.master_key == enc.derive_key('tenant:hr')
+    assert np.array_equal(hr.decrypt_vector(old_tenant_record), VECTOR)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test document-grouped search: per-document aggregation with bounded
+heaps, and RAG queries that return documents instead of chunks.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from src.encryption import EncryptionManager
+from src.grouping import chunk_result, group_by_document, group_scored
+from src.rag import RAGOrchestrator
+from src.vector_store import SimulatedStore
+
+def chunk(doc_id, index, similarity):
+    return {'id': f"{doc_id}_chunk_{index}", 'similarity': similarity,
+            'metadata': {'doc_id': doc_id, 'content': f"{doc_id} {index}"}}
+
+# 'manual' matches a little everywhere; 'memo' has the single best chunk
+RESULTS = ([chunk('manual', i, 0.80 - i * 0.01) for i in range(10)]
+           + [chunk('memo', 0, 0.95), chunk('faq', 0, 0.85), chunk('faq', 1, 0.84), chunk('faq', 2, 0.20)])
+
+def brute_force(results, k, score):
+    by_doc = {}
+    for result in results:
+        by_doc.setdefault(result['metadata']['doc_id'], []).append(result['similarity'])
+    return sorted(by_doc, key=lambda doc: -score(sorted(by_doc[doc], reverse=True)))[:k]
+
+@pytest.mark.parametrize('aggregate, score', [
+    ('max', lambda s: s[0]),
+    ('sum', sum),
+    ('mean_top_n', lambda s: sum(s[:3]) / len(s[:3])),
+])
+def test_aggregates_match_brute_force(aggregate, score):
+    grouped = group_by_document(reversed(RESULTS), k=2, aggregate=aggregate, chunks_per_doc=2)
+    
+    assert [g['doc_id'] for g in grouped] == brute_force(RESULTS, 2, score)
+    assert all(len(g['chunks']) <= 2 for g in grouped)
+    assert all(g['chunks'][0]['similarity'] >= g['chunks'][-1]['similarity'] for g in grouped)
+
+def test_long_document_no_longer_crowds_out_others():
+    chunk_level = sorted(RESULTS, key=lambda r: -r['similarity'])[:3]
+    grouped = group_by_document(RESULTS, k=3)
+    
+    assert [g['doc_id'] for g in grouped] == ['memo', 'faq', 'manual']
+    assert grouped[2]['matched_chunks'] == 10 and grouped[2]['id'] == 'manual_chunk_0'
+    assert len({r['metadata']['doc_id'] for r in chunk_level}) == 2
+    with pytest.raises(ValueError):
+        group_by_document(RESULTS, k=3, aggregate='median')
+
+def test_grouping_scales_like_a_top_k_pass():
+    rng = np.random.default_rng(0)
+    results = [chunk(f"doc{d}", i, s) for i, (d, s) in
+               enumerate(zip(rng.integers(0, 5000, 100_000), rng.random(100_000)))]
+    
+    start = time.perf_counter()
+    grouped = group_by_document(results, k=10, chunks_per_doc=3)
+    elapsed = time.perf_counter() - start
+    
+    print(f"\n  Grouped 100k chunks into 10 documents in {elapsed * 1000:.0f}ms")
+    assert len(grouped) == 10 and elapsed < 2.0
+
+def test_scored_stream_materializes_only_returned_chunks():
+    built = []
+    
+    def as_result(similarity, record):
+        built.append(record['id'])
+        return chunk_result(similarity, record)
+    
+    scored = ((r['similarity'], {'id': r['id'], 'metadata': r['metadata']}) for r in RESULTS)
+    grouped = group_scored(scored, k=2, chunks_per_doc=2, as_result=as_result)
+    
+    assert [g['doc_id'] for g in grouped] == ['memo', 'faq']
+    assert sorted(built) == ['faq_chunk_0', 'faq_chunk_1', 'memo_chunk_0']
+    assert grouped[1]['chunks'][0]['content'] == 'faq 0'
+
+class FakeEmbedder:
+    def generate_embedding(self, text):
+        return np.ones(4, dtype=np.float32)
+
+def test_rag_query_returns_documents(tmp_path):
+    enc = EncryptionManager(master_key=bytes(32))
+    store = SimulatedStore(storage_path=tmp_path)
+    store.create_collection(dimension=4)
+    rng = np.random.default_rng(1)
+    store.upsert([{'id': f"{doc}_chunk_{i}", 'vector': enc.encrypt_vector(rng.random(4).astype(np.float32)),
+                   'metadata': {'doc_id': doc, 'chunk_index': i, 'content': f"{doc} part {i}"}}
+                  for doc, n in [('handbook', 12), ('policy', 2), ('memo', 1)] for i in range(n)])
+    rag = RAGOrchestrator(enc, FakeEmbedder(), store)
+    
+    response = rag.query("anything", top_k=3, group_by_doc=True, chunks_per_doc=2)
+    
+    assert sorted(s['doc_id'] for s in response['sources']) == ['handbook', 'memo', 'policy']
+    assert all(1 <= len(s['chunks']) <= 2 for s in response['sources'])
+    assert 'group' in response['timings']
+    with pytest.raises(ValueError):
+        rag.query("anything", group_by_doc=True, aggregate='median')
+
+def test_grouped_candidates_are_the_closest_chunks(tmp_path):
+    enc = EncryptionManager(master_key=bytes(32))
+    store = SimulatedStore(storage_path=tmp_path)
+    store.create_collection(dimension=4)
+    # The one document along the query direction is inserted last, behind many far ones
+    far = np.array([1, -1, 0, 0], dtype=np.float32)
+    records = [{'id': f"far{d}_chunk_{i}", 'vector': enc.encrypt_vector(far + 0.01 * i),
+                'metadata': {'doc_id': f"far{d}", 'chunk_index': i}} for d in range(200) for i in range(5)]
+    records.append({'id': 'near_chunk_0', 'vector': enc.encrypt_vector(np.ones(4, dtype=np.float32)),
+                    'metadata': {'doc_id': 'near', 'chunk_index': 0}})
+    store.upsert(records)
+    rag = RAGOrchestrator(enc, FakeEmbedder(), store, candidate_k=10)
+    
+    response = rag.query("anything", top_k=1, group_by_doc=True, chunks_per_doc=1)
+    
+    assert [s['doc_id'] for s in response['sources']] == ['near']
+    assert response['sources'][0]['chunks'][0]['similarity'] == pytest.approx(1.0)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test two-level retrieval: ingestion stores each document's mean chunk
+vector, and hierarchical queries search only the selected documents' chunks.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from src.centroids import centroid_store, document_centroids
+from src.dedup import ChunkDeduplicator
+from src.encryption import EncryptionManager
+from src.ingest import DocumentIngestor
+from src.rag import RAGOrchestrator
+from src.vector_store import SimulatedStore
+
+DIM = 8
+ENC = EncryptionManager(master_key=bytes(32))
+
+class FakeEmbedder:
+    def generate_batch_embeddings(self, texts):
+        return np.stack([self.generate_embedding(t) for t in texts])
+    
+    def generate_embedding(self, text):
+        return np.random.default_rng(len(text)).standard_normal(DIM).astype(np.float32)
+
+def ingestor_for(tmp_path, dedup=None):
+    store = SimulatedStore(storage_path=tmp_path / 'store')
+    store.create_collection(dimension=DIM)
+    return DocumentIngestor(ENC, FakeEmbedder(), store, dedup=dedup, centroids=centroid_store(store))
+
+def test_document_centroids_are_chunk_means():
+    vectors = np.arange(12, dtype=np.float32).reshape(6, 2)
+    centroids = document_centroids(vectors, [1, 3, 2])
+    assert np.allclose(centroids, [vectors[0], vectors[1:4].mean(axis=0), vectors[4:].mean(axis=0)])
+
+def test_ingestion_stores_encrypted_centroids(tmp_path):
+    ingestor = ingestor_for(tmp_path, dedup=ChunkDeduplicator())
+    text = ' '.join(f"word{i}" for i in range(1200))
+    ingestor.ingest_text('report.txt', text)
+    # Every chunk of the copy is a duplicate: its centroid comes from the stored canonicals
+    ingestor.ingest_text('copy.txt', text)
+    
+    chunks = [ENC.decrypt_vector(r['vector']) for r in ingestor.db.get_many(
+        [f"report_chunk_{i}" for i in range(3)])]
+    report, copy = ingestor.centroids.get_many(['report', 'copy'])
+    assert report['metadata'] == {'doc_id': 'report', 'chunks': 3}
+    assert np.allclose(ENC.decrypt_vector(report['vector']), np.mean(chunks, axis=0), atol=1e-6)
+    assert np.allclose(ENC.decrypt_vector(copy['vector']), ENC.decrypt_vector(report['vector']), atol=1e-6)
+
+def test_deleted_chunks_refresh_or_drop_centroids(tmp_path):
+    ingestor = ingestor_for(tmp_path, dedup=ChunkDeduplicator())
+    text = ' '.join(f"word{i}" for i in range(1200))
+    ingestor.ingest_text('report.txt', text)
+    ingestor.ingest_text('copy.txt', text)
+    chunks = [ENC.decrypt_vector(r['vector']) for r in ingestor.db.get_many(
+        [f"report_chunk_{i}" for i in range(3)])]
+    
+    # The copy's remaining chunks are duplicates: they count with their canonical's vector
+    ingestor.delete_chunks(['copy_chunk_2'])
+    copy = ingestor.centroids.get_many(['copy'])[0]
+    assert np.allclose(ENC.decrypt_vector(copy['vector']), np.mean(chunks[:2], axis=0), atol=1e-6)
+    
+    ingestor.delete_chunks([f"report_chunk_{i}" for i in range(3)])
+    report, copy = ingestor.centroids.get_many(['report', 'copy'])
+    assert report is None
+    assert np.allclose(ENC.decrypt_vector(copy['vector']), np.mean(chunks[:2], axis=0), atol=1e-6)
+    ingestor.delete_chunks(['copy_chunk_0', 'copy_chunk_1'])
+    assert ingestor.centroids.get_many(['copy']) == [None]
+
+def test_hierarchical_query_searches_selected_documents_only(tmp_path):
+    ingestor = ingestor_for(tmp_path)
+    for i in range(4):
+        ingestor.ingest_text(f"doc_{i}.txt", ' '.join(f"w{i}x{j}" for j in range(1000 + i)))
+    
+    rag = RAGOrchestrator(ENC, FakeEmbedder(), ingestor.db, centroids=ingestor.centroids)
+    response = rag.query("leave policy", top_k=10, hierarchical=True, top_docs=1)
+    assert response['documents_searched'] == 1
+    assert len({source['metadata']['doc_id'] for source in response['sources']}) == 1
+    assert 'select_docs' in response['timings']
+    flat = rag.query("leave policy", top_k=10)
+    assert len({source['metadata']['doc_id'] for source in flat['sources']}) > 1
+    
+    with pytest.raises(ValueError):
+        RAGOrchestrator(ENC, FakeEmbedder(), ingestor.db).query("leave policy", hierarchical=True)
+
+class CountingMetadata(dict):
+    reads = 0
+    
+    def get(self, *args):
+        CountingMetadata.reads += 1
+        return super().get(*args)
+
+def test_document_filter_reads_only_those_documents_rows(tmp_path):
+    store = SimulatedStore(storage_path=tmp_path / 'store')
+    store.create_collection(dimension=DIM)
+    store.use_key(ENC)
+    rng = np.random.default_rng(0)
+    store.upsert([{'id': f"doc_{d}_chunk_{i}", 'vector': ENC.encrypt_vector(rng.standard_normal(DIM).astype(np.float32)),
+                   'metadata': CountingMetadata(doc_id=f"doc_{d}", chunk_index=i)}
+                  for d in range(200) for i in range(10)])
+    query = ENC.encrypt_vector(rng.standard_normal(DIM).astype(np.float32))
+    store.search(query, filters={'doc_id': ['doc_0']})  # maps doc_id -> rows for this version
+    
+    CountingMetadata.reads = 0
+    results = store.search(query, top_k=20, filters={'doc_id': ['doc_3', 'doc_7']})
+    assert sorted(r['id'] for r in results) == sorted(f"doc_{d}_chunk_{i}" for d in (3, 7) for i in range(10))
+    assert CountingMetadata.reads == 0
+    # Further filter keys are only checked on the selected documents' rows
+    results = store.search(query, top_k=20, filters={'doc_id': 'doc_3', 'chunk_index': [1, 2]})
+    assert sorted(r['id'] for r in results) == ['doc_3_chunk_1', 'doc_3_chunk_2']
+    assert CountingMetadata.reads == 2 * 10
+
+class TopicEmbedder(FakeEmbedder):
+    """Queries and 'leave' chunks point one way, every other chunk away from it"""
+    def generate_embedding(self, text):
+        if text == "leave policy" or 'leave' in text:
+            return np.ones(DIM, dtype=np.float32)
+        return -np.abs(super().generate_embedding(text))
+
+def test_closest_document_centroid_is_selected(tmp_path):
+    store = SimulatedStore(storage_path=tmp_path / 'store')
+    store.create_collection(dimension=DIM)
+    ingestor = DocumentIngestor(ENC, TopicEmbedder(), store, centroids=centroid_store(store))
+    # The matching document is stored last, after every unrelated one
+    for i in range(20):
+        ingestor.ingest_text(f"doc_{i}.txt", ' '.join(f"w{i}x{j}" for j in range(300 + i)))
+    ingestor.ingest_text('leave.txt', ' '.join(f"leave{j}" for j in range(300)))
+    
+    rag = RAGOrchestrator(ENC, TopicEmbedder(), ingestor.db, centroids=ingestor.centroids)
+    response = rag.query("leave policy", top_k=3, hierarchical=True, top_docs=1)
+    
+    assert response['documents_searched'] == 1
+    assert {source['metadata']['doc_id'] for source in response['sources']} == {'leave'}
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Test the ingestion job queue: durability across restarts, backpressure,
+and the POST /documents -> GET /jobs/{id} flow.
+"""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as api
+from src.centroids import centroid_store
+from src.dedup import ChunkDeduplicator
+from src.encryption import EncryptionManager
+from src.ingest import DocumentIngestor
+from src.jobs import JobQueue, QueueFull
+from src.logging_config import reset_logging
+from src.rag import RAGOrchestrator
+from src.tenancy import TenantRouter
+from src.vector_store import SimulatedStore
+
+DIM = 8
+
+class FakeEmbedder:
+    def generate_embedding(self, text):
+        return np.random.default_rng(len(text)).standard_normal(DIM).astype(np.float32)
+    
+    def generate_batch_embeddings(self, texts):
+        return np.stack([self.generate_embedding(text) for text in texts])
+    
+    def get_dimension(self):
+        return DIM
+
+HR_TOKEN = {'Authorization': 'Bearer hr-token'}
+
+@pytest.fixture
+def api_env(tmp_path, monkeypatch):
+    monkeypatch.setenv('INTELLIVAULT_JOBS_DB', str(tmp_path / 'jobs.db'))
+    (tmp_path / 'grants.json').write_text(json.dumps({'hr-token': ['hr'], 'fin-token': ['finance']}))
+    monkeypatch.setenv('INTELLIVAULT_TENANT_GRANTS', str(tmp_path / 'grants.json'))
+    monkeypatch.setattr(api, 'rag', None)
+    monkeypatch.setattr(api, 'warmup_error', None)
+    monkeypatch.setattr(api, 'ingestors', {})
+    yield tmp_path
+    reset_logging()
+
+def test_queued_work_survives_a_restart(tmp_path):
+    queue = JobQueue(tmp_path / 'jobs.db', lease=0.1)
+    job_id = queue.enqueue([('a.txt', b'alpha'), ('b.txt', b'beta')], tenant='hr')
+    interrupted = queue.claim()
+    assert interrupted['name'] == 'a.txt' and queue.get(job_id)['status'] == 'running'
+    
+    # A new process reclaims the document once the old one's lease lapsed
+    time.sleep(0.2)
+    queue = JobQueue(tmp_path / 'jobs.db', lease=0.1)
+    claimed = [queue.claim(), queue.claim()]
+    assert [(d['name'], d['content'], d['tenant']) for d in claimed] == [
+        ('a.txt', b'alpha', 'hr'), ('b.txt', b'beta', 'hr')]
+    assert queue.claim() is None
+    
+    queue.finish(claimed[0], chunks=3)
+    queue.finish(claimed[1], error="bad encoding")
+    job = queue.get(job_id)
+    assert (job['status'], job['done'], job['failed'], job['chunks']) == ('failed', 1, 1, 3)
+    assert job['errors'] == [{'name': 'b.txt', 'error': 'bad encoding'}]
+    assert queue.pending() == 0
+
+def test_live_lease_is_not_reclaimed_by_another_process(tmp_path):
+    worker = JobQueue(tmp_path / 'jobs.db', lease=0.5)
+    job_id = worker.enqueue([('a.txt', b'alpha')])
+    document = worker.claim()
+    
+    # A second process sharing the queue leaves the renewed lease alone
+    other = JobQueue(tmp_path / 'jobs.db', lease=0.5)
+    time.sleep(0.3)
+    assert worker.renew() == 1
+    time.sleep(0.3)
+    assert other.claim() is None
+    
+    # Once the lease lapses the document is reclaimed; the stale worker's result is dropped
+    time.sleep(0.5)
+    reclaimed = other.claim()
+    assert reclaimed['name'] == 'a.txt'
+    worker.finish(document, chunks=1)
+    assert other.get(job_id)['status'] == 'running'
+    other.finish(reclaimed, chunks=2)
+    assert (other.get(job_id)['status'], other.get(job_id)['chunks']) == ('done', 2)
+
+def test_full_queue_refuses_with_retry_after(tmp_path):
+    queue = JobQueue(tmp_path / 'jobs.db', max_pending=2)
+    queue.enqueue([('a.txt', b'a'), ('b.txt', b'b')])
+    
+    with pytest.raises(QueueFull) as refused:
+        queue.enqueue([('c.txt', b'c')])
+    assert refused.value.retry_after >= 1
+    
+    queue.finish(queue.claim())
+    queue.enqueue([('c.txt', b'c')])
+    assert queue.pending() == 2
+
+def test_upload_returns_before_ingestion_and_job_completes(api_env, monkeypatch):
+    enc = EncryptionManager(master_key=bytes(32))
+    db = SimulatedStore(storage_path=api_env / 'store')
+    db.create_collection(dimension=DIM)
+    release = threading.Event()
+    
+    def slow_build():
+        release.wait(10)
+        shards = lambda collection: SimulatedStore(collection=collection, db=db.db)
+        return RAGOrchestrator(enc, FakeEmbedder(), db, router=TenantRouter(enc, store_factory=shards))
+    
+    monkeypatch.setattr(api, 'build_rag', slow_build)
+    monkeypatch.setenv('INTELLIVAULT_INGEST_QUEUE_SIZE', '3')
+    
+    with TestClient(api.app) as client:
+        # Accepted while the model is still loading
+        single = client.post('/documents', json={'name': 'policy.txt', 'content': 'word ' * 700})
+        assert single.status_code == 202
+        bulk = client.post('/documents', data={'tenant': 'hr'}, headers=HR_TOKEN,
+                           files=[('files', ('hr_1.txt', b'leave policy')), ('files', ('hr_2.txt', b'pay'))])
+        assert bulk.status_code == 202 and bulk.json()['documents'] == 2
+        # A tenant's job status is only shown to tokens granted that tenant
+        assert client.get(bulk.json()['status']).status_code == 401
+        assert client.get(bulk.json()['status'], headers={'Authorization': 'Bearer fin-token'}).status_code == 403
+        
+        full = client.post('/documents', json={'name': 'late.txt', 'content': 'x'})
+        assert full.status_code == 429 and int(full.headers['retry-after']) >= 1
+        assert client.get(single.json()['status']).json()['status'] == 'queued'
+        
+        release.set()
+        for _ in range(500):
+            jobs = [client.get(r.json()['status'], headers=HR_TOKEN).json() for r in (single, bulk)]
+            if all(job['status'] == 'done' for job in jobs):
+                break
+            time.sleep(0.01)
+        assert [(job['status'], job['chunks']) for job in jobs] == [('done', 2), ('done', 2)]
+        
+        assert client.get('/jobs/nope').status_code == 404
+        assert client.post('/documents', json={'name': 'x.txt', 'content': 'x', 'tenant': '../hr'}).status_code == 400
+    
+    assert db.stats()['count'] == 2
+    assert api.rag.router.store('hr').stats()['count'] == 2
+
+def test_uploads_keep_the_dedup_index_in_step(api_env, monkeypatch):
+    enc = EncryptionManager(master_key=bytes(32))
+    db = SimulatedStore(storage_path=api_env / 'store')
+    db.create_collection(dimension=DIM)
+    index = api_env / 'dedup.jsonl'
+    text = ' '.join(f"clause{i} of the standard services agreement" for i in range(60))
+    # Collection first ingested with --dedup
+    DocumentIngestor(enc, FakeEmbedder(), db, dedup=ChunkDeduplicator(index)).ingest_text('msa.txt', text)
+    
+    monkeypatch.setenv('INTELLIVAULT_DEDUP_INDEX', str(index))
+    monkeypatch.setattr(api, 'build_rag', lambda: RAGOrchestrator(enc, FakeEmbedder(), db))
+    with TestClient(api.app) as client:
+        job = client.post('/documents', json={'name': 'copy.txt', 'content': text}).json()
+        for _ in range(500):
+            if client.get(job['status']).json()['status'] == 'done':
+                break
+            time.sleep(0.01)
+    
+    assert db.stats()['count'] == 1
+    canonical = db.get_many(['msa_chunk_0'])[0]
+    assert [ref['id'] for ref in canonical['metadata']['duplicates']] == ['copy_chunk_0']
+    assert ChunkDeduplicator(index).duplicate_of == {'copy_chunk_0': 'msa_chunk_0'}
+
+def test_first_upload_makes_hierarchical_queries_available(api_env, monkeypatch):
+    enc = EncryptionManager(master_key=bytes(32))
+    db = SimulatedStore(storage_path=api_env / 'store')
+    db.create_collection(dimension=DIM)
+    monkeypatch.setattr(api, 'build_rag', lambda: RAGOrchestrator(enc, FakeEmbedder(), db,
+                                                                  centroids=centroid_store(db)))
+    query = {'query': 'leave policy', 'hierarchical': True, 'top_docs': 1}
+    
+    with TestClient(api.app) as client:
+        for _ in range(500):
+            if client.get('/ready').status_code == 200:
+                break
+            time.sleep(0.01)
+        refused = client.post('/query', json=query)
+        assert refused.status_code == 400 and 'centroids' in refused.json()['detail']
+        
+        job = client.post('/documents', json={'name': 'policy.txt', 'content': 'leave ' * 50}).json()
+        for _ in range(500):
+            if client.get(job['status']).json()['status'] == 'done':
+                break
+            time.sleep(0.01)
+        response = client.post('/query', json=query)
+        assert response.status_code == 200 and response.json()['documents_searched'] == 1
+
+def test_tenant_uploads_need_a_token_granting_them(api_env, monkeypatch):
+    def offline():
+        raise RuntimeError("no model in this test")
+    
+    monkeypatch.setattr(api, 'build_rag', offline)
+    with TestClient(api.app) as client:
+        upload = {'name': 'x.txt', 'content': 'x', 'tenant': 'hr'}
+        assert client.post('/documents', json=upload).status_code == 401
+        assert client.post('/documents', json=upload,
+                           headers={'Authorization': 'Bearer fin-token'}).status_code == 403
+        assert client.post('/documents', json=upload, headers=HR_TOKEN).status_code == 202
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test the load-testing helpers used by benchmark.py.
+"""
+
+import sys
+import time
+from argparse import Namespace
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from benchmark import benchmark_inprocess
+from src.encryption import EncryptionManager
+from src.loadtest import SyntheticCorpus, run_open_loop, recall_at_k, latency_histogram
+
+def test_open_loop_keeps_arrival_rate_when_requests_are_slow():
+    # 4 concurrent 50ms requests per arrival interval: a closed loop would
+    # fall behind, the open loop keeps issuing at the target rate
+    result = run_open_loop(lambda i: time.sleep(0.05), qps=100, duration=0.5, max_workers=16)
+    
+    assert result['requests'] == 50
+    assert result['errors'] == 0
+    assert result['throughput_qps'] > 60
+    assert result['latency_ms']['p50'] >= 50
+    assert set(result['latency_ms']) >= {'p50', 'p95', 'p99', 'p999'}
+
+def test_errors_are_counted():
+    def flaky(i):
+        if i % 2:
+            raise RuntimeError("boom")
+    
+    result = run_open_loop(flaky, qps=200, duration=0.1)
+    assert result['errors'] == result['requests'] // 2
+
+def test_synthetic_corpus_exact_search_and_recall():
+    corpus = SyntheticCorpus(500, dimension=32, seed=3)
+    query = corpus.vectors[42]
+    
+    exact = corpus.exact_top_k(query, 5)
+    
+    assert exact[0] == corpus.ids[42]
+    assert np.allclose(np.linalg.norm(corpus.vectors, axis=1), 1.0, atol=1e-5)
+    assert recall_at_k(exact[:3] + ['other'], exact) == 0.6
+    assert sum(latency_histogram(np.array([0.5, 1.5, 120.0])).values()) == 3
+
+def test_inprocess_benchmark_retrieves_the_exact_neighbours(tmp_path):
+    args = Namespace(dimension=32, seed=0, num_queries=20, top_k=5, qps=20, duration=0.2,
+                     workers=4, recall_queries=20)
+    result = benchmark_inprocess(2000, args, EncryptionManager(master_key=bytes(32)), tmp_path)
+    
+    assert result['errors'] == 0
+    assert result['recall_at_5'] > 0.9
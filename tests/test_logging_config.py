@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the central logging setup: queued server logging, CLI output,
+query sampling and the progress bar threshold.
+"""
+
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src import logging_config
+from src.logging_config import (configure_logging, reset_logging, get_logger,
+                                should_log_query, show_progress)
+from src.encryption import EncryptionManager
+from src.rag import RAGOrchestrator
+
+class FakeEmbedder:
+    def generate_embedding(self, text):
+        return np.ones(8, dtype=np.float32)
+
+class FakeDB:
+    def encrypted_search(self, query_vector, top_k=5):
+        return []
+
+def teardown_function():
+    reset_logging()
+
+def test_cli_mode_prints_plain_messages(capsys):
+    configure_logging('cli', level='INFO')
+    logger = get_logger('src.example')
+    
+    logger.info("✓ Ready")
+    logger.warning("Disk almost full")
+    
+    out = capsys.readouterr().out
+    assert logger.name == 'intellivault.example'
+    assert "✓ Ready\n" in out
+    assert "⚠️  Disk almost full" in out
+
+def test_server_mode_writes_from_background_thread(tmp_path):
+    log_file = tmp_path / 'server.log'
+    configure_logging('server', level='INFO', log_file=str(log_file))
+    root = logging.getLogger(logging_config.ROOT_LOGGER)
+    assert isinstance(root.handlers[0], logging.handlers.QueueHandler)
+    
+    get_logger('src.rag').info("QUERY: %s", "hello")
+    logging_config._stop_listener()  # flushes the queue
+    
+    line = log_file.read_text().strip()
+    assert line.endswith("INFO intellivault.rag: QUERY: hello")
+
+def test_query_logs_are_sampled(capsys):
+    enc = EncryptionManager(master_key=bytes(32))
+    rag = RAGOrchestrator(enc, FakeEmbedder(), FakeDB())
+    
+    configure_logging('cli', level='INFO', query_sample_rate=0.0)
+    capsys.readouterr()
+    for _ in range(20):
+        rag.query("quiet")
+    assert "QUERY" not in capsys.readouterr().out
+    
+    configure_logging('cli', level='INFO', query_sample_rate=1.0)
+    rag.query("loud")
+    assert "QUERY: loud (0 sources" in capsys.readouterr().out
+    
+    configure_logging('cli', query_sample_rate=0.25)
+    hits = sum(should_log_query() for _ in range(4000))
+    assert 800 < hits < 1200
+
+def test_progress_bar_only_for_large_batches():
+    assert not show_progress(3)
+    assert show_progress(logging_config.PROGRESS_BAR_MIN_ITEMS)
+
+def test_queued_logging_does_not_block_callers(tmp_path):
+    """Callers pay for enqueueing a record, not for the write itself"""
+    configure_logging('server', level='INFO', log_file=str(tmp_path / 'load.log'))
+    logger = get_logger('src.load')
+    
+    start = time.perf_counter()
+    for i in range(5000):
+        logger.info("request %d done", i)
+    per_call = (time.perf_counter() - start) / 5000
+    logging_config._stop_listener()
+    
+    print(f"\n  Queued log call: {per_call * 1e6:.1f}µs")
+    assert per_call < 200e-6
+    assert len((tmp_path / 'load.log').read_text().splitlines()) == 5000
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the ONNX embedding backend: pooling and batching against a fake
+session, and agreement with PyTorch when the runtime and model are available.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from src.onnx_embeddings import OnnxEncoder, MIN_COSINE
+
+class FakeInput:
+    def __init__(self, name):
+        self.name = name
+
+class FakeTokenizer:
+    """Word-level ids, padded with 0 to the longest text in the batch"""
+    
+    def __call__(self, texts, padding, truncation, max_length, return_tensors):
+        ids = [[hash(w) % 97 + 1 for w in t.split()][:max_length] for t in texts]
+        width = max(len(row) for row in ids)
+        return {
+            'input_ids': np.array([row + [0] * (width - len(row)) for row in ids]),
+            'attention_mask': np.array([[1] * len(row) + [0] * (width - len(row)) for row in ids]),
+        }
+
+class FakeSession:
+    """Each token's hidden state depends only on its id; padding is garbage"""
+    
+    def __init__(self, dimension=8):
+        self.table = np.random.default_rng(0).standard_normal((98, dimension)).astype(np.float32)
+        self.batch_widths = []
+    
+    def get_inputs(self):
+        return [FakeInput('input_ids'), FakeInput('attention_mask'), FakeInput('token_type_ids')]
+    
+    def run(self, outputs, feed):
+        assert set(feed) == {'input_ids', 'attention_mask', 'token_type_ids'}
+        self.batch_widths.append(feed['input_ids'].shape[1])
+        hidden = self.table[feed['input_ids']]
+        hidden[feed['attention_mask'] == 0] = 1e3
+        return [hidden]
+
+def test_pooling_ignores_padding_and_keeps_order():
+    session = FakeSession()
+    encoder = OnnxEncoder(session, FakeTokenizer(), dimension=8)
+    texts = ["a b", "one two three four five six", "x", "short text here"]
+    
+    batched = encoder.encode(texts, batch_size=2)
+    alone = np.stack([encoder.encode(t) for t in texts])
+    
+    assert batched.shape == (4, 8)
+    assert encoder.encode("x").shape == (8,)
+    assert np.allclose(batched, alone, atol=1e-6)
+    assert np.allclose(np.linalg.norm(batched, axis=1), 1.0)
+    
+    # Sorted by length: the long texts share a batch, the short ones a narrow one
+    assert session.batch_widths[:2] == [6, 2]
+
+def test_cls_pooling_without_normalization():
+    session = FakeSession()
+    encoder = OnnxEncoder(session, FakeTokenizer(), pooling='cls', normalize=False)
+    
+    embedding = encoder.encode("first second")
+    
+    assert np.allclose(embedding, session.table[hash('first') % 97 + 1])
+
+def test_onnx_matches_torch_within_tolerance(tmp_path):
+    pytest.importorskip('onnxruntime')
+    from src.embeddings import EmbeddingGenerator
+    try:
+        torch_gen = EmbeddingGenerator(backend='torch')
+    except Exception as e:
+        pytest.skip(f"model unavailable: {e}")
+    
+    texts = ["The company's confidential financial report",
+             "Employee benefits and remote work policy",
+             "Software license terms"]
+    reference = torch_gen.generate_batch_embeddings(texts)
+    
+    for quantize, key in ((False, 'fp32'), (True, 'int8')):
+        onnx_gen = EmbeddingGenerator(backend='onnx', quantize=quantize, onnx_dir=tmp_path)
+        embeddings = onnx_gen.generate_batch_embeddings(texts)
+        cosine = (embeddings * reference).sum(axis=1) / (
+            np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1))
+        assert cosine.min() >= MIN_COSINE[key]
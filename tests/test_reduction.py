@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test PCA dimensionality reduction: ranking quality on low-rank data,
+encrypted storage with the collection, and the ingest -> query path.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.encryption import EncryptionManager
+from src.ingest import DocumentIngestor
+from src.rag import RAGOrchestrator
+from src.reduction import PCAReducer
+from src.vector_store import SimulatedStore
+
+ENC = EncryptionManager(master_key=bytes(32))
+BASIS = np.random.default_rng(0).standard_normal((12, 64)).astype(np.float32)
+
+def embed(text):
+    """64-dim embeddings that really live in a 12-dim subspace"""
+    rng = np.random.default_rng(sum(map(ord, text)))
+    vector = rng.standard_normal(12).astype(np.float32) @ BASIS
+    return vector + 0.01 * rng.standard_normal(64).astype(np.float32)
+
+class FakeEmbedder:
+    def generate_embedding(self, text):
+        return embed(text)
+    
+    def generate_batch_embeddings(self, texts):
+        return np.stack([embed(t) for t in texts])
+    
+    def get_dimension(self):
+        return 64
+
+def test_reduction_preserves_ranking_on_low_rank_data():
+    vectors = np.stack([embed(f"chunk {i}") for i in range(500)])
+    queries = np.stack([embed(f"query {i}") for i in range(20)])
+    reducer = PCAReducer.fit(vectors, 16)
+    
+    reduced, reduced_queries = reducer.transform(vectors), reducer.transform(queries)
+    
+    assert reduced.shape == (500, 16) and reduced.dtype == np.float32
+    assert np.allclose(np.linalg.norm(reduced, axis=1), 1.0, atol=1e-5)
+    assert reducer.transform(queries[0]).shape == (16,)
+    assert reducer.retained_variance > 0.99
+    
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    full = np.argsort(-(queries @ unit.T), axis=1)[:, :5]
+    small = np.argsort(-(reduced_queries @ reduced.T), axis=1)[:, :5]
+    assert np.mean([len(set(a) & set(b)) / 5 for a, b in zip(full, small)]) > 0.9
+    
+    # Smaller vectors mean smaller encrypted payloads
+    assert len(ENC.encrypt_vector(reduced[0])['ciphertext']) < len(ENC.encrypt_vector(vectors[0])['ciphertext']) / 3
+
+def test_reducer_is_stored_encrypted_and_used_for_queries(tmp_path):
+    docs = tmp_path / 'raw'
+    docs.mkdir()
+    for i in range(40):
+        (docs / f"doc_{i}.txt").write_text(" ".join(f"word{i}_{j}" for j in range(120)))
+    
+    store = SimulatedStore(storage_path=tmp_path / 'storage')
+    store.create_collection(dimension=16)
+    ingestor = DocumentIngestor(ENC, FakeEmbedder(), store)
+    ingestor.ingest_directory(str(docs), reduce_to=16)
+    
+    # Reducer file holds ciphertext, not the plaintext projection
+    record = json.loads((tmp_path / 'storage' / 'intellivault_vectors.reducer.json').read_text())
+    assert record['dimension'] == 16 and 'ciphertext' in record['components']
+    
+    stored = next(iter(store.scan()))[0]
+    assert ENC.decrypt_vector(stored['vector']).shape == (16,)
+    
+    # A new orchestrator (and ingestor) pick the reducer up from the collection
+    rag = RAGOrchestrator(ENC, FakeEmbedder(), store)
+    assert rag.reducer.dimension == 16
+    assert DocumentIngestor(ENC, FakeEmbedder(), store).reducer.dimension == 16
+    
+    response = rag.query("word3_0 word3_1", top_k=3)
+    assert response['num_sources'] == 3
+    assert 'reduce' in response['timings']
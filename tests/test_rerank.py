@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test two-stage retrieval with cross-encoder reranking.
+Uses stand-in embedding/cross-encoder models so no downloads are needed.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.encryption import EncryptionManager
+from src.rag import RAGOrchestrator
+from src.rerank import CrossEncoderReranker
+
+class FakeEmbedder:
+    def generate_embedding(self, text):
+        return np.ones(8, dtype=np.float32)
+
+class FakeCrossEncoder:
+    """Scores a pair by how often the query's first word appears in the chunk"""
+    def __init__(self):
+        self.batches = []
+    
+    def predict(self, pairs, batch_size=32, show_progress_bar=False, convert_to_numpy=True):
+        self.batches.append(len(pairs))
+        return np.array([c.count(q.split()[0]) for q, c in pairs], dtype=np.float32)
+
+class FakeDB:
+    def __init__(self, enc, n=60):
+        rng = np.random.default_rng(0)
+        self.entries = []
+        for i in range(n):
+            content = "license " * (i % 7) + f"chunk {i}"
+            self.entries.append({
+                'id': f"doc_{i}_chunk_0",
+                'vector': enc.encrypt_vector(rng.random(8).astype(np.float32)),
+                'metadata': {'doc_id': f"doc_{i}", 'content': content}
+            })
+        self.requested = []
+    
+    def encrypted_search(self, query_vector, top_k=5):
+        self.requested.append(top_k)
+        return self.entries[:top_k]
+
+def build(reranker):
+    enc = EncryptionManager(master_key=bytes(32))
+    db = FakeDB(enc)
+    return RAGOrchestrator(enc, FakeEmbedder(), db, reranker=reranker, candidate_k=50), db
+
+def test_rerank_uses_wide_candidate_pool_in_one_batch():
+    model = FakeCrossEncoder()
+    rag, db = build(CrossEncoderReranker(model=model))
+    
+    response = rag.query("license terms", top_k=3)
+    
+    assert db.requested == [50]
+    assert model.batches == [50]
+    assert response['num_sources'] == 3
+    assert all(s['content'].count('license') == 6 for s in response['sources'])
+    assert response['rerank']['candidates'] == 50
+    assert response['rerank']['reranked'] == 50
+    for stage in ('embed', 'encrypt', 'search', 'decrypt_rank', 'rerank', 'answer', 'total'):
+        assert stage in response['timings']
+
+def test_tight_budget_truncates_candidates():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model=model, initial_ms_per_pair=1.0, min_candidates=5)
+    
+    assert reranker.candidates_for_budget(50, None) == 50
+    assert reranker.candidates_for_budget(50, 20.0) == 20
+    assert reranker.candidates_for_budget(50, 0.5) == 5
+    assert reranker.candidates_for_budget(3, 0.5) == 3
+    
+    reranked, info = reranker.rerank("license", [{'content': 'x'}] * 40, top_k=3, budget_ms=12.0)
+    assert info['reranked'] == 12 and info['truncated']
+    assert len(reranked) == 3
+
+def test_truncated_rerank_fills_top_k_in_first_stage_order():
+    reranker = CrossEncoderReranker(model=FakeCrossEncoder(), initial_ms_per_pair=1.0, min_candidates=2)
+    candidates = [{'id': i, 'content': 'license ' * (i % 2)} for i in range(10)]
+    
+    reranked, info = reranker.rerank("license", candidates, top_k=5, budget_ms=2.0)
+    assert info['reranked'] == 2
+    assert [c['id'] for c in reranked] == [1, 0, 2, 3, 4]
+    assert 'rerank_score' not in reranked[2]
+
+def test_rerank_disabled_per_query():
+    rag, db = build(CrossEncoderReranker(model=FakeCrossEncoder()))
+    
+    response = rag.query("license terms", top_k=3, rerank=False)
+    
+    assert db.requested == [3]
+    assert 'rerank' not in response
+    assert 'rerank' not in response['timings']
+
+if __name__ == "__main__":
+    test_rerank_uses_wide_candidate_pool_in_one_batch()
+    test_tight_budget_truncates_candidates()
+    test_truncated_rerank_fills_top_k_in_first_stage_order()
+    test_rerank_disabled_per_query()
+    print("✓ Rerank tests passed")
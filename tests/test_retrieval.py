@@ -15,7 +15,7 @@ os.chdir(Path(__file__).parent.parent)
 
 from src.encryption import EncryptionManager
 from src.embeddings import EmbeddingGenerator
-from src.cyborgdb_sim import CyborgDBClient
+from src.vector_store import create_store
 
 def test_retrieval():
     print("="*60)
@@ -27,7 +27,7 @@ def test_retrieval():
     print("\n[1/3] Initializing components...")
     enc_manager = EncryptionManager()
     emb_generator = EmbeddingGenerator()
-    db_client = CyborgDBClient(use_simulated=True)
+    db_client = create_store()
     
     # Check database
     print("\n[2/3] Checking database...")
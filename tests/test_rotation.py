@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test online key rotation: resumable batched re-encryption, searches over
+mixed-key data, throttling and the persisted key file.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.encryption import EncryptionManager
+from src.reduction import PCAReducer
+from src.rotation import KeyRotationJob
+from src.vector_store import SimulatedStore
+
+VECTORS = np.random.default_rng(0).standard_normal((1000, 8)).astype(np.float32)
+
+def populated_store(tmp_path, enc):
+    store = SimulatedStore(storage_path=tmp_path / 'storage')
+    store.create_collection(dimension=8)
+    store.upsert([{'id': f"doc_{i}", 'vector': enc.encrypt_vector(v), 'metadata': {'i': i}}
+                  for i, v in enumerate(VECTORS)])
+    return store
+
+def stored_vectors(store, enc):
+    records = [record for batch in store.scan() for record in batch]
+    order = np.argsort([record['metadata']['i'] for record in records])
+    return enc.decrypt_vectors([records[i]['vector'] for i in order]), records
+
+def test_rotation_is_resumable_and_reads_work_throughout(tmp_path):
+    enc = EncryptionManager(master_key=bytes(32))
+    store = populated_store(tmp_path, enc)
+    old_key = enc.key_id
+    enc.rotate_master_key()
+    checkpoint = tmp_path / 'checkpoint.json'
+    
+    progress = KeyRotationJob(store, enc, batch_size=100, checkpoint_path=checkpoint).run(max_batches=3)
+    assert progress['position'] == 300 and progress['reencrypted'] == 300 and not progress['complete']
+    
+    # Mid-rotation the collection holds both keys and still decrypts in full
+    vectors, records = stored_vectors(store, enc)
+    assert {record['vector']['key_id'] for record in records} == {old_key, enc.key_id}
+    assert np.array_equal(vectors, VECTORS)
+    
+    # A fresh job picks up at the checkpoint
+    progress = KeyRotationJob(store, enc, batch_size=100, checkpoint_path=checkpoint).run()
+    assert progress['complete'] and progress['reencrypted'] == 1000
+    
+    vectors, records = stored_vectors(store, enc)
+    assert {record['vector']['key_id'] for record in records} == {enc.key_id}
+    assert np.array_equal(vectors, VECTORS)
+    assert KeyRotationJob(store, enc, checkpoint_path=checkpoint).run()['reencrypted'] == 1000
+
+def test_rotation_rewrites_the_collection_once_per_flush(tmp_path):
+    enc = EncryptionManager(master_key=bytes(32))
+    store = populated_store(tmp_path, enc)
+    enc.rotate_master_key()
+    generation = lambda: store.db.collections[store.collection]['generation']
+    
+    before = generation()
+    KeyRotationJob(store, enc, batch_size=100, checkpoint_path=None).run()
+    assert generation() == before + 1
+    
+    enc.rotate_master_key()
+    before = generation()
+    progress = KeyRotationJob(store, enc, batch_size=100, checkpoint_path=None, flush_records=300).run()
+    assert progress['reencrypted'] == 1000 and generation() == before + 4
+    assert np.array_equal(stored_vectors(store, enc)[0], VECTORS)
+
+def test_rotation_leaves_records_rewritten_since_the_scan(tmp_path):
+    enc = EncryptionManager(master_key=bytes(32))
+    store = populated_store(tmp_path, enc)
+    enc.rotate_master_key()
+    fresh = enc.encrypt_vector(np.zeros(8, dtype=np.float32))
+    bulk_upsert = store.bulk_upsert
+    
+    def rewrite_then_bulk_upsert(records, batch_size=1000):
+        store.upsert([{'id': 'doc_0', 'vector': fresh, 'metadata': {'i': 0}}])
+        store.delete(['doc_1'])
+        return bulk_upsert(records, batch_size=batch_size)
+    
+    store.bulk_upsert = rewrite_then_bulk_upsert
+    assert KeyRotationJob(store, enc, checkpoint_path=None).run()['reencrypted'] == 998
+    doc_0, doc_1 = store.get_many(['doc_0', 'doc_1'])
+    assert doc_0['vector']['nonce'] == fresh['nonce'] and doc_1 is None
+
+def test_rotation_is_throttled_and_rotates_the_reducer(tmp_path):
+    enc = EncryptionManager(master_key=bytes(32))
+    store = populated_store(tmp_path, enc)
+    store.save_reducer(PCAReducer.fit(VECTORS, 4).to_encrypted(enc))
+    enc.rotate_master_key()
+    
+    start = time.perf_counter()
+    KeyRotationJob(store, enc, batch_size=100, max_records_per_sec=4000, checkpoint_path=None).run()
+    assert time.perf_counter() - start >= 0.2
+    
+    assert not enc.needs_reencryption(store.load_reducer()['components'])
+
+def test_rotation_moves_master_sealed_records_to_the_collection_key(tmp_path):
+    enc = EncryptionManager(master_key=bytes(32))
+    store = populated_store(tmp_path, enc)
+    keys = enc.for_collection(store.collection)
+    
+    progress = KeyRotationJob(store, keys, batch_size=300, checkpoint_path=None).run()
+    assert progress['complete'] and progress['reencrypted'] == 1000
+    
+    vectors, records = stored_vectors(store, keys)
+    assert {record['vector']['key_id'] for record in records} == {keys.key_id}
+    assert np.array_equal(vectors, VECTORS)
+
+def test_rotated_key_file_keeps_the_retired_key(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    enc = EncryptionManager()
+    old_record = enc.encrypt_vector(VECTORS[0])
+    
+    new_key_id = enc.rotate_master_key()
+    
+    reloaded = EncryptionManager()
+    assert reloaded.key_id == new_key_id
+    assert np.array_equal(reloaded.decrypt_vector(old_record), VECTORS[0])
+    assert reloaded.needs_reencryption(old_record)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test and benchmark CyborgDBServiceClient hot paths against a fake index.
+"""
+
+import sys
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.encryption import EncryptionManager
+from src.cyborgdb_service_client import CyborgDBServiceClient
+from fake_cyborgdb_index import FakeIndex
+
+def make_documents(enc, n, dimension=384):
+    rng = np.random.default_rng(1)
+    vectors = rng.random((n, dimension), dtype=np.float32)
+    documents = [{
+        'id': f"doc_{i}_chunk_0",
+        'vector': enc.encrypt_vector(vectors[i]),
+        'metadata': {'doc_id': f"doc_{i}"}
+    } for i in range(n)]
+    return vectors, documents
+
+def test_batch_insert_decrypts_into_one_matrix():
+    enc = EncryptionManager(master_key=bytes(32))
+    index = FakeIndex()
+    client = CyborgDBServiceClient(api_key='test', encryption_manager=enc, index=index)
+    vectors, documents = make_documents(enc, 50)
+    
+    assert client.batch_insert(documents)
+    
+    assert isinstance(index.last_upsert, np.ndarray)
+    assert index.last_upsert.shape == (50, 384)
+    assert np.array_equal(index.last_upsert, vectors)
+
+def test_search_overhead_vs_per_call_key_loading(tmp_path):
+    """Old path: new EncryptionManager (reads key file) + tolist() on every query"""
+    enc = EncryptionManager(master_key=bytes(32))
+    (tmp_path / 'config').mkdir()
+    (tmp_path / 'config' / 'encryption_key.json').write_text(
+        '{"key": "%s"}' % enc.get_key_base64()
+    )
+    
+    index = FakeIndex()
+    client = CyborgDBServiceClient(api_key='test', encryption_manager=enc, index=index)
+    _, documents = make_documents(enc, 20)
+    client.batch_insert(documents)
+    query = documents[0]['vector']
+    rounds = 300
+    
+    def old_search():
+        per_call = EncryptionManager()
+        vector = per_call.decrypt_vector(query)
+        return index.query(vector=vector.tolist(), top_k=5)
+    
+    def measure(search):
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            search()
+        elapsed = (time.perf_counter() - start) / rounds
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak
+    
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    try:
+        old_time, old_peak = measure(old_search)
+    finally:
+        os.chdir(cwd)
+    new_time, new_peak = measure(lambda: client.encrypted_search(query, top_k=5))
+    
+    print(f"\n  Search overhead: {old_time * 1e6:.0f}µs -> {new_time * 1e6:.0f}µs per query, "
+          f"peak alloc {old_peak / 1024:.1f}KB -> {new_peak / 1024:.1f}KB")
+    assert len(client.encrypted_search(query, top_k=5)) == 5
+    assert new_time < old_time
+    assert new_peak < old_peak
+
+if __name__ == "__main__":
+    import tempfile
+    test_batch_insert_decrypts_into_one_matrix()
+    test_search_overhead_vs_per_call_key_loading(Path(tempfile.mkdtemp()))
+    print("✓ Service client tests passed")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test snapshot-isolated reads in SimulatedCyborgDB: atomic publication,
+pinned versions and their cleanup, and readers that never wait on writers
+(in this process or another one).
+"""
+
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.cyborgdb_sim import SimulatedCyborgDB
+
+ROOT = Path(__file__).parent.parent
+
+def docs(start, count):
+    return [{'id': f"doc_{i}", 'vector': {'ciphertext': 'x' * 64}, 'metadata': {'i': i}}
+            for i in range(start, start + count)]
+
+def test_pinned_snapshot_is_stable_and_released(tmp_path):
+    db = SimulatedCyborgDB(storage_path=tmp_path)
+    db.create_collection('c', dimension=4)
+    db.upsert('c', docs(0, 10))
+    
+    with db.snapshot('c') as pinned:
+        db.upsert('c', docs(10, 10))
+        db.delete('c', ['doc_0'])
+        
+        assert len(pinned.data) == 10 and pinned.data[0]['id'] == 'doc_0'
+        assert len(db._read('c')) == 19
+        # The delete only wrote a tombstone, so one new version was published
+        assert db.versions('c') == [pinned.generation, pinned.generation + 1]
+    
+    # Unpinned and replaced: only the current version is kept
+    assert db.versions('c') == [pinned.generation + 1]
+    assert json.loads((tmp_path / 'manifest.json').read_text())['c']['count'] == 20
+    assert db.get_collection_stats('c')['live'] == 19
+    assert not list(tmp_path.glob('*.tmp-*'))
+
+def test_readers_do_not_wait_for_writers(tmp_path):
+    db = SimulatedCyborgDB(storage_path=tmp_path)
+    db.create_collection('c', dimension=4)
+    db.upsert('c', docs(0, 10))
+    
+    writing, release = threading.Event(), threading.Event()
+    def slow_writer():
+        with db._writing('c'):
+            writing.set()
+            release.wait(5)
+    writer = threading.Thread(target=slow_writer)
+    writer.start()
+    writing.wait(5)
+    
+    start = time.perf_counter()
+    assert len(db.search('c', {}, top_k=100)) == 10
+    assert time.perf_counter() - start < 0.5
+    release.set()
+    writer.join()
+    
+    # A reader also keeps serving the old version while another thread reloads
+    other = SimulatedCyborgDB(storage_path=tmp_path)
+    other._read('c')
+    db.upsert('c', docs(10, 5))
+    with other._load_lock:
+        assert len(other._read('c')) == 10
+    assert len(other._read('c')) == 15
+
+def test_reads_stay_consistent_during_ingest_in_another_process(tmp_path):
+    db = SimulatedCyborgDB(storage_path=tmp_path)
+    db.create_collection('c', dimension=4)
+    
+    writer = subprocess.Popen([sys.executable, '-c', f"""
+import sys
+sys.path.insert(0, {str(ROOT)!r})
+from src.cyborgdb_sim import SimulatedCyborgDB
+db = SimulatedCyborgDB(storage_path={str(tmp_path)!r})
+for batch in range(40):
+    db.upsert('c', [{{'id': f"doc_{{batch}}_{{i}}", 'vector': {{}}, 'metadata': {{}}}} for i in range(200)])
+"""])
+    
+    counts = []
+    while writer.poll() is None:
+        counts.append(len(db.search('c', {}, top_k=10**6)))
+    assert writer.wait() == 0
+    
+    counts.append(len(db.search('c', {}, top_k=10**6)))
+    assert all(count % 200 == 0 for count in counts)
+    assert counts == sorted(counts) and counts[-1] == 8000
+    assert SimulatedCyborgDB(storage_path=tmp_path).get_collection_stats('c')['count'] == 8000
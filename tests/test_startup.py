@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test fast startup: lazy heavy imports, manifest-only collection discovery,
+and an API that answers /health while the model warms up.
+"""
+
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as api
+from src import cyborgdb_sim
+from src.cyborgdb_sim import SimulatedCyborgDB
+from src.logging_config import reset_logging
+
+ROOT = Path(__file__).parent.parent
+
+@pytest.fixture(autouse=True)
+def job_queue_in_tmp(tmp_path, monkeypatch):
+    # The API startup opens the ingestion queue
+    monkeypatch.setenv('INTELLIVAULT_JOBS_DB', str(tmp_path / 'jobs.db'))
+
+def teardown_function():
+    # The API startup configures server logging
+    reset_logging()
+
+def test_heavy_modules_are_not_imported_eagerly():
+    code = ("import sys, api.main, src.embeddings; "
+            "print('sentence_transformers' in sys.modules or 'torch' in sys.modules)")
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == 'False'
+
+def test_collections_discovered_without_unpickling(tmp_path, monkeypatch):
+    with open(tmp_path / 'orphan.pkl', 'wb') as f:
+        pickle.dump([{'id': str(i)} for i in range(3)], f)
+    
+    def no_unpickling(*args):
+        raise AssertionError("collection unpickled at startup")
+    
+    with monkeypatch.context() as m:
+        m.setattr(cyborgdb_sim.pickle, 'load', no_unpickling)
+        db = SimulatedCyborgDB(storage_path=tmp_path)
+    
+    assert db.collections['orphan']['count'] is None
+    assert db.get_collection_stats('orphan')['count'] == 3
+    assert SimulatedCyborgDB(storage_path=tmp_path).collections['orphan']['count'] == 3
+
+class FakeRAG:
+    class emb:
+        @staticmethod
+        def generate_embedding(text):
+            return np.zeros(4, dtype=np.float32)
+    
+    def query(self, query_text, top_k=5, tenants=None, **grouping):
+        return {'query': query_text, 'answer': 'ok', 'sources': [], 'timings': {'total': 1.0}}
+
+def test_health_answers_while_model_loads(monkeypatch):
+    release = threading.Event()
+    
+    def slow_build():
+        release.wait(10)
+        return FakeRAG()
+    
+    monkeypatch.setattr(api, 'build_rag', slow_build)
+    monkeypatch.setattr(api, 'rag', None)
+    monkeypatch.setattr(api, 'warmup_error', None)
+    
+    start = time.perf_counter()
+    with TestClient(api.app) as client:
+        assert client.get('/health').status_code == 200
+        first_health = time.perf_counter() - start
+        
+        assert client.get('/ready').json() == {'status': 'warming_up'}
+        busy = client.post('/query', json={'query': 'hi'})
+        assert busy.status_code == 503
+        assert busy.headers['retry-after'] == '5'
+        
+        release.set()
+        for _ in range(100):
+            if client.get('/ready').status_code == 200:
+                break
+            time.sleep(0.01)
+        assert client.get('/ready').json() == {'status': 'ready'}
+        assert client.post('/query', json={'query': 'hi'}).json()['answer'] == 'ok'
+    
+    print(f"\n  Time to first /health: {first_health * 1000:.0f}ms")
+    assert first_health < 1.0
+
+def test_ready_reports_failed_warm_up(monkeypatch):
+    def broken_build():
+        raise RuntimeError("model download failed")
+    
+    monkeypatch.setattr(api, 'build_rag', broken_build)
+    monkeypatch.setattr(api, 'rag', None)
+    monkeypatch.setattr(api, 'warmup_error', None)
+    
+    with TestClient(api.app) as client:
+        for _ in range(100):
+            if client.get('/ready').json()['status'] != 'warming_up':
+                break
+            time.sleep(0.01)
+        response = client.get('/ready')
+        assert response.status_code == 503
+        assert response.json() == {'status': 'failed', 'error': 'model download failed'}
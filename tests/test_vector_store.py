@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Conformance and performance suite shared by every VectorStore backend.
+Each backend runs the same correctness checks and workload, and the
+measured throughput/latency is printed side by side.
+"""
+
+import subprocess
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from src.encryption import EncryptionManager
+from src.vector_store import (SimulatedStore, RestServiceStore, ServiceStore,
+                              create_store, measure_store)
+from src.cyborgdb_service_client import CyborgDBServiceClient
+from mock_cyborgdb_service import MockCyborgDBService
+from fake_cyborgdb_index import FakeIndex
+
+ROOT = Path(__file__).parent.parent
+ENC = EncryptionManager(master_key=bytes(32))
+DEPARTMENTS = ['finance', 'hr', 'legal']
+
+@contextmanager
+def open_store(backend, tmp_path):
+    if backend == 'simulated':
+        yield SimulatedStore(storage_path=tmp_path / 'storage')
+    elif backend == 'rest':
+        with MockCyborgDBService() as service:
+            yield RestServiceStore(port=service.port, max_batch_docs=50)
+    elif backend == 'service':
+        client = CyborgDBServiceClient(api_key='test', encryption_manager=ENC, index=FakeIndex())
+        yield ServiceStore(client=client)
+
+def make_documents(n, dimension=32, seed=0):
+    vectors = np.random.default_rng(seed).random((n, dimension), dtype=np.float32)
+    return vectors, [{
+        'id': f"doc_{i}_chunk_0",
+        'vector': ENC.encrypt_vector(vectors[i]),
+        'metadata': {'doc_id': f"doc_{i}", 'department': DEPARTMENTS[i % 3]}
+    } for i in range(n)]
+
+BACKENDS = ['simulated', 'rest', 'service']
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_conformance(backend, tmp_path):
+    vectors, documents = make_documents(30)
+    
+    with open_store(backend, tmp_path) as store:
+        store.create_collection(dimension=32)
+        assert store.upsert(documents) == 30
+        assert store.stats()['count'] == 30
+        
+        # Upsert replaces by id
+        replacement = dict(documents[0], metadata={'doc_id': 'doc_0', 'department': 'hr', 'v': 2})
+        store.upsert([replacement])
+        assert store.stats()['count'] == 30
+        assert store.get_by_id('doc_0_chunk_0')['metadata']['v'] == 2
+        
+        # Bulk get keeps request order and round-trips the encrypted vector
+        records = store.get_many(['doc_5_chunk_0', 'missing', 'doc_2_chunk_0'])
+        assert records[1] is None
+        assert [r['id'] for r in (records[0], records[2])] == ['doc_5_chunk_0', 'doc_2_chunk_0']
+        assert np.allclose(ENC.decrypt_vector(records[0]['vector']), vectors[5])
+        
+        # Search respects top_k and filters
+        results = store.search(documents[3]['vector'], top_k=4)
+        assert len(results) == 4
+        legal = store.search(documents[3]['vector'], top_k=50, filters={'department': 'legal'})
+        assert len(legal) == 10
+        assert all(r['metadata']['department'] == 'legal' for r in legal)
+        either = store.encrypted_search(documents[3]['vector'], top_k=50,
+                                        filters={'department': ['legal', 'finance']})
+        assert len(either) == 19
+        
+        # Delete hides records everywhere
+        assert store.delete(['doc_7_chunk_0', 'doc_8_chunk_0']) == 2
+        assert store.get_many(['doc_7_chunk_0'])[0] is None
+        assert store.stats()['count'] == 28
+        
+        # Scan streams every remaining record exactly once
+        scanned = [r['id'] for batch in store.scan(batch_size=8) for r in batch]
+        assert len(scanned) == len(set(scanned)) == 28
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_performance(backend, tmp_path):
+    _, documents = make_documents(500, dimension=384, seed=1)
+    queries = [doc['vector'] for doc in documents[:20]]
+    
+    with open_store(backend, tmp_path) as store:
+        store.create_collection(dimension=384)
+        results = measure_store(store, documents, queries)
+    
+    print(f"\n  [{results['backend']:>9}] upsert {results['upsert_docs_per_sec']:8.0f} docs/s | "
+          f"search p50 {results['search_p50_ms']:6.2f}ms p95 {results['search_p95_ms']:6.2f}ms | "
+          f"get_many {results['get_many_ms']:6.2f}ms | scan {results['scan_docs_per_sec']:8.0f} docs/s")
+    assert results['documents'] == 500
+
+def test_filter_deletes_do_not_load_the_simulator():
+    checked = subprocess.run([sys.executable, '-c', f"""
+import sys
+sys.path.insert(0, {str(ROOT)!r})
+from src.vector_store import VectorStore
+
+class ListStore(VectorStore):
+    records = [{{'id': 'a', 'metadata': {{'dept': 'hr'}}}}, {{'id': 'b', 'metadata': {{'dept': 'legal'}}}}]
+    upsert = search = get_many = stats = None
+    def scan(self, batch_size=1000):
+        yield self.records
+    def delete(self, ids):
+        return len(ids)
+
+assert ListStore().delete_by_filter({{'dept': ['hr']}}) == 1
+assert 'src.cyborgdb_sim' not in sys.modules
+"""])
+    assert checked.returncode == 0
+
+def test_create_store_reads_backend_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv('INTELLIVAULT_BACKEND', 'simulated')
+    monkeypatch.setenv('INTELLIVAULT_STORAGE', str(tmp_path / 'env_storage'))
+    
+    store = create_store()
+    
+    assert isinstance(store, SimulatedStore)
+    assert (tmp_path / 'env_storage').exists()
+    with pytest.raises(ValueError):
+        create_store('nonexistent')
+    # The placeholder client lacks delete/get/scan: not offered as a backend
+    with pytest.raises(ValueError):
+        create_store('real')
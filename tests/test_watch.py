@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test watch mode: bursts of new files are debounced into one batched
+ingestion run, with inotify and with the polling fallback.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from src.encryption import EncryptionManager
+from src.ingest import DocumentIngestor
+from src.metrics import REGISTRY
+from src.vector_store import SimulatedStore
+from src.watch import DirectoryWatcher, FRESHNESS_METRIC, InotifySource
+
+DIM = 8
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = 0
+    
+    def generate_batch_embeddings(self, texts):
+        self.calls += 1
+        return np.stack([np.random.default_rng(len(t)).standard_normal(DIM).astype(np.float32)
+                         for t in texts])
+
+def has_inotify(path):
+    try:
+        InotifySource(path).close()
+        return True
+    except OSError:
+        return False
+
+@pytest.fixture
+def ingestor(tmp_path):
+    store = SimulatedStore(storage_path=tmp_path / 'store')
+    store.create_collection(dimension=DIM)
+    return DocumentIngestor(EncryptionManager(master_key=bytes(32)), FakeEmbedder(), store)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_burst_is_ingested_as_one_batch(tmp_path, ingestor, use_inotify):
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    if use_inotify and not has_inotify(raw):
+        pytest.skip("no inotify here")
+    (raw / 'old.txt').write_text("already there")
+    REGISTRY.reset()
+    
+    watcher = DirectoryWatcher(ingestor, raw, debounce=0.2, poll_interval=0.05,
+                               use_inotify=use_inotify).start()
+    try:
+        for i in range(5):
+            (raw / f"hr_{i}.txt").write_text(f"policy {i}")
+            time.sleep(0.01)
+        (raw / 'ignored.md').write_text("not a .txt")
+        
+        assert wait_for(lambda: ingestor.db.stats()['count'] == 5)
+        assert watcher.batches == 1 and ingestor.emb.calls == 1
+        assert ingestor.db.get_many(['old_chunk_0']) == [None]
+        
+        lag = REGISTRY.histograms[FRESHNESS_METRIC][()]
+        assert lag.count == 5 and lag.sum / lag.count < 2.0
+    finally:
+        watcher.stop()
+
+def test_stop_flushes_pending_files(tmp_path, ingestor):
+    watcher = DirectoryWatcher(ingestor, tmp_path, debounce=60, poll_interval=0.05).start()
+    (tmp_path / 'late.txt').write_text("written just before shutdown")
+    time.sleep(0.2)
+    
+    watcher.stop()
+    
+    assert ingestor.db.stats()['count'] == 1